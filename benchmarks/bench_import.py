@@ -0,0 +1,94 @@
+# benchmarks/bench_import.py
+"""Import-time benchmark for the package.
+
+Imports each target module in fresh interpreters and reports the wall time of the whole interpreter run, the import
+time Python attributes to the module itself (`python -X importtime`), the modules that take the most time of their
+own, and whether any of the optional heavy dependencies (matplotlib, ruamel.yaml) were loaded. Process-pool workers
+and short-lived jobs pay this on every start.
+
+Usage:
+    python benchmarks/bench_import.py --output bench_import.json
+    python benchmarks/bench_import.py --repeat 20 --top 15
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+TARGETS = ["npa_howtopay", "npa_howtopay.model", "npa_howtopay.params"]
+HEAVY_MODULES = ["matplotlib", "ruamel.yaml"]
+
+
+def import_once(target: str) -> dict[str, Any]:
+    """Import `target` in a fresh interpreter and return its timings and the modules it loaded."""
+    code = f"import sys, {target}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    start = time.perf_counter()
+    proc = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+    )
+    wall_s = time.perf_counter() - start
+
+    # lines look like "import time:  self [us] | cumulative | imported package", nested names are indented
+    self_us: dict[str, int] = {}
+    cumulative_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_part, cumulative_part, name = line[len("import time:") :].split("|")
+        self_us[name.strip()] = int(self_part)
+        if name.strip() == target:
+            cumulative_us = int(cumulative_part)
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return {"wall_s": wall_s, "import_s": cumulative_us / 1e6, "self_us": self_us, "heavy_modules": heavy}
+
+
+def bench_target(target: str, repeat: int, top: int) -> dict[str, Any]:
+    runs = [import_once(target) for _ in range(repeat)]
+    slowest = sorted(runs[-1]["self_us"].items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "target": target,
+        "repeat": repeat,
+        "wall_min_s": min(run["wall_s"] for run in runs),
+        "wall_median_s": statistics.median(run["wall_s"] for run in runs),
+        "import_min_s": min(run["import_s"] for run in runs),
+        "import_median_s": statistics.median(run["import_s"] for run in runs),
+        "heavy_modules": runs[-1]["heavy_modules"],
+        "slowest_self_us": dict(slowest),
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench_import.json", help="Path of the JSON results file")
+    parser.add_argument("--repeat", type=int, default=10, help="Fresh interpreters per target")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest modules to report per target")
+    args = parser.parse_args(argv)
+
+    results = []
+    for target in TARGETS:
+        result = bench_target(target, args.repeat, args.top)
+        results.append(result)
+        heavy = ", ".join(result["heavy_modules"]) or "none"
+        print(
+            f"{target:24s} wall {result['wall_median_s'] * 1e3:8.1f} ms  "
+            f"import {result['import_median_s'] * 1e3:8.1f} ms  heavy modules: {heavy}",
+            flush=True,
+        )
+
+    report = {
+        "metadata": {"timestamp": datetime.now(timezone.utc).isoformat(), "python": sys.version.split()[0]},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
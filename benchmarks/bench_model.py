@@ -0,0 +1,333 @@
+# benchmarks/bench_model.py
+"""Speed benchmarks for the model hot paths.
+
+Times `run_model` (both engines), `run_all_scenarios`, `compute_bill_costs`, `create_delta_df` (and its
+`ScenarioResultCube` counterpart), the capex ledger functions and `create_time_series_from_web_params` while sweeping
+the model horizon, the number of npa project rows and the number of scenarios. Results are written as JSON together
+with the local scaling exponent between consecutive sweep points (1 is linear, 2 is quadratic), which shows where
+super-linear behavior kicks in.
+
+Usage:
+    python benchmarks/bench_model.py --output bench.json
+    python benchmarks/bench_model.py --quick --only run_model
+    python benchmarks/bench_model.py --output new.json --compare old.json
+"""
+
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+import numpy as np
+import polars as pl
+
+import npa_howtopay
+from npa_howtopay import capex_project as cp
+from npa_howtopay.model import (
+    compute_bill_costs,
+    create_delta_df,
+    create_scenario_runs,
+    run_all_scenarios,
+    run_model,
+)
+from npa_howtopay.params import (
+    COMPARE_COLS,
+    TimeSeriesParams,
+    load_scenario_from_yaml,
+    load_time_series_params_from_web_params,
+)
+from npa_howtopay.results import ScenarioResultCube
+from npa_howtopay.web_params import WebParams, create_time_series_from_web_params
+
+START_YEAR = 2025
+
+WEB_PARAMS = {
+    "npa_num_projects": 10,
+    "num_converts": 100,
+    "pipe_value_per_user": 1000.0,
+    "pipe_decomm_cost_per_user": 100.0,
+    "peak_kw_winter_headroom": 10.0,
+    "peak_kw_summer_headroom": 10.0,
+    "aircon_percent_adoption_pre_npa": 0.8,
+    "scattershot_electrification_users_per_year": 5,
+    "gas_fixed_overhead_costs": 100.0,
+    "electric_fixed_overhead_costs": 100.0,
+    "gas_bau_lpp_costs_per_year": 100.0,
+    "is_scattershot": False,
+}
+
+SWEEPS = {
+    "full": {
+        "horizon": [25, 50, 100, 200],
+        "npa_rows": [10, 1_000, 100_000, 1_000_000],
+        "scenarios": [1, 7, 28],
+        "ledger_rows": [100, 10_000, 1_000_000],
+    },
+    "quick": {
+        "horizon": [25, 50],
+        "npa_rows": [10, 10_000],
+        "scenarios": [1, 7],
+        "ledger_rows": [100, 10_000],
+    },
+}
+
+Case = tuple[str, str, dict[str, Any], Callable[[], Any]]
+
+
+def make_ts_params(horizon: int, num_npa_rows: Optional[int] = None, seed: int = 0) -> TimeSeriesParams:
+    """Time series covering `horizon` years, optionally with `num_npa_rows` random npa projects."""
+    end_year = START_YEAR + horizon
+    ts_params = load_time_series_params_from_web_params(WEB_PARAMS, START_YEAR, end_year, cost_inflation_rate=0.02)
+    if num_npa_rows is None:
+        return ts_params
+    rng = np.random.default_rng(seed)
+    npa_projects = pl.DataFrame({
+        "project_year": rng.integers(START_YEAR, end_year, num_npa_rows),
+        "num_converts": rng.integers(10, 200, num_npa_rows),
+        "pipe_value_per_user": rng.uniform(500.0, 2000.0, num_npa_rows),
+        "pipe_decomm_cost_per_user": rng.uniform(50.0, 200.0, num_npa_rows),
+        "peak_kw_winter_headroom": rng.uniform(0.0, 100.0, num_npa_rows),
+        "peak_kw_summer_headroom": rng.uniform(0.0, 100.0, num_npa_rows),
+        "aircon_percent_adoption_pre_npa": rng.uniform(0.0, 1.0, num_npa_rows),
+        "is_scattershot": np.zeros(num_npa_rows, dtype=bool),
+    })
+    return TimeSeriesParams(
+        npa_projects=npa_projects,
+        scattershot_electrification=ts_params.scattershot_electrification,
+        gas_fixed_overhead_costs=ts_params.gas_fixed_overhead_costs,
+        electric_fixed_overhead_costs=ts_params.electric_fixed_overhead_costs,
+        gas_bau_lpp_costs_per_year=ts_params.gas_bau_lpp_costs_per_year,
+    )
+
+
+def make_scenario_runs(horizon: int, num_scenarios: int) -> dict[str, Any]:
+    """`num_scenarios` scenarios cycling through the standard set, which starts with bau so deltas can be taken."""
+    standard = create_scenario_runs(START_YEAR, START_YEAR + horizon, ["gas", "electric"], ["capex", "opex"])
+    names = list(standard)
+    scenario_runs = {}
+    for i in range(num_scenarios):
+        name = names[i % len(names)]
+        scenario_runs[name if i < len(names) else f"{name}_{i // len(names)}"] = standard[name]
+    return scenario_runs
+
+
+def make_capex_df(num_rows: int, seed: int = 0) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    project_year = rng.integers(START_YEAR - 50, START_YEAR + 25, num_rows)
+    depreciation_lifetime = rng.integers(5, 60, num_rows)
+    return pl.DataFrame({
+        "project_year": project_year,
+        "project_type": rng.choice(list(cp.PROJECT_TYPES), num_rows),
+        "original_cost": rng.uniform(1e3, 1e6, num_rows),
+        "depreciation_lifetime": depreciation_lifetime,
+        "retirement_year": project_year + depreciation_lifetime,
+    })
+
+
+def iter_cases(sweep: dict[str, list[int]]) -> Iterator[Case]:
+    """Yield (benchmark, swept parameter, parameters, function) for every benchmark case."""
+    input_params = load_scenario_from_yaml("sample")
+    web_params = WebParams(**WEB_PARAMS)
+
+    for horizon in sweep["horizon"]:
+        ts_params = make_ts_params(horizon)
+        scenario_params = make_scenario_runs(horizon, 7)["gas_capex"]
+        for engine in ("loop", "vectorized"):
+            yield (
+                "run_model",
+                "horizon",
+                {"engine": engine, "horizon": horizon},
+                lambda s=scenario_params, t=ts_params, e=engine: run_model(s, input_params, t, engine=e),
+            )
+        pre_bill_df = run_model(scenario_params, input_params, ts_params)
+        yield (
+            "compute_bill_costs",
+            "horizon",
+            {"horizon": horizon},
+            lambda df=pre_bill_df: compute_bill_costs(df, input_params),
+        )
+        yield (
+            "create_time_series_from_web_params",
+            "horizon",
+            {"horizon": horizon},
+            lambda h=horizon: create_time_series_from_web_params(web_params, START_YEAR, START_YEAR + h, 0.02),
+        )
+
+    horizon = sweep["horizon"][0]
+    for num_npa_rows in sweep["npa_rows"]:
+        ts_params = make_ts_params(horizon, num_npa_rows)
+        yield (
+            "time_series_params",
+            "npa_rows",
+            {"npa_rows": num_npa_rows},
+            lambda t=ts_params: TimeSeriesParams(
+                npa_projects=t.npa_projects.filter(~pl.col("is_scattershot")),
+                scattershot_electrification=t.scattershot_electrification,
+                gas_fixed_overhead_costs=t.gas_fixed_overhead_costs,
+                electric_fixed_overhead_costs=t.electric_fixed_overhead_costs,
+                gas_bau_lpp_costs_per_year=t.gas_bau_lpp_costs_per_year,
+            ),
+        )
+        scenario_params = make_scenario_runs(horizon, 7)["gas_capex"]
+        for engine in ("loop", "vectorized"):
+            yield (
+                "run_model",
+                "npa_rows",
+                {"engine": engine, "npa_rows": num_npa_rows},
+                lambda s=scenario_params, t=ts_params, e=engine: run_model(s, input_params, t, engine=e),
+            )
+
+    ts_params = make_ts_params(horizon)
+    for num_scenarios in sweep["scenarios"]:
+        scenario_runs = make_scenario_runs(horizon, num_scenarios)
+        yield (
+            "run_all_scenarios",
+            "scenarios",
+            {"scenarios": num_scenarios},
+            lambda r=scenario_runs: run_all_scenarios(r, input_params, ts_params),
+        )
+        results = run_all_scenarios(scenario_runs, input_params, ts_params)
+        if len(results) > 1:
+            yield (
+                "create_delta_df",
+                "scenarios",
+                {"scenarios": num_scenarios},
+                lambda r=results: create_delta_df(r, COMPARE_COLS),
+            )
+            cube = ScenarioResultCube.from_results(results, COMPARE_COLS)
+            yield (
+                "ScenarioResultCube.delta",
+                "scenarios",
+                {"scenarios": num_scenarios},
+                lambda c=cube: c.delta().to_polars(),
+            )
+
+    years = np.arange(START_YEAR, START_YEAR + horizon)
+    for num_rows in sweep["ledger_rows"]:
+        capex_df = make_capex_df(num_rows)
+        ledger = cp.CapexLedger.from_df(capex_df)
+        ledger_cases: dict[str, Callable[[], Any]] = {
+            "ledger_extend": lambda df=capex_df: cp.CapexLedger(capacity=df.height).extend(df),
+            "ledger_schedules": lambda lg=ledger: lg.schedules(years),
+            "accumulator_extend": lambda df=capex_df: cp.CapexAccumulator(year=START_YEAR).extend(df),
+            "compute_ratebase_from_capex_projects": lambda df=capex_df: cp.compute_ratebase_from_capex_projects(
+                START_YEAR, df
+            ),
+            "compute_depreciation_expense_from_capex_projects": (
+                lambda df=capex_df: cp.compute_depreciation_expense_from_capex_projects(START_YEAR, df)
+            ),
+            "compute_maintanence_costs": lambda df=capex_df: cp.compute_maintanence_costs(START_YEAR, df, 0.02),
+        }
+        for name, fn in ledger_cases.items():
+            yield (f"capex_project.{name}", "ledger_rows", {"ledger_rows": num_rows}, fn)
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"min_s": min(times), "median_s": statistics.median(times), "mean_s": statistics.fmean(times)}
+
+
+def scaling_exponents(results: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Local log-log slope of time against the swept parameter between consecutive sweep points."""
+    curves: dict[tuple[str, str, str], list[tuple[int, float]]] = defaultdict(list)
+    for result in results:
+        fixed = {k: v for k, v in result["params"].items() if k != result["sweep"]}
+        key = (result["benchmark"], result["sweep"], json.dumps(fixed, sort_keys=True))
+        curves[key].append((result["params"][result["sweep"]], result["min_s"]))
+
+    scaling = []
+    for (benchmark, sweep, fixed), points in curves.items():
+        points.sort()
+        exponents = [
+            math.log(t1 / t0) / math.log(n1 / n0) if t0 > 0 and t1 > 0 else None
+            for (n0, t0), (n1, t1) in zip(points, points[1:])
+        ]
+        scaling.append({
+            "benchmark": benchmark,
+            "sweep": sweep,
+            "fixed": json.loads(fixed),
+            "sizes": [n for n, _ in points],
+            "min_s": [t for _, t in points],
+            "exponents": exponents,
+        })
+    return scaling
+
+
+def compare(results: list[dict[str, Any]], baseline_path: str, threshold: float) -> list[str]:
+    """Return a line for every case that is more than `threshold` times slower than in the baseline file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    def key(result: dict[str, Any]) -> str:
+        return f"{result['benchmark']} {json.dumps(result['params'], sort_keys=True)}"
+
+    baseline_times = {key(result): result["min_s"] for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = baseline_times.get(key(result))
+        if old and result["min_s"] > threshold * old:
+            regressions.append(f"{key(result)}: {old:.4g}s -> {result['min_s']:.4g}s ({result['min_s'] / old:.2f}x)")
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench_results.json", help="Path of the JSON results file")
+    parser.add_argument("--quick", action="store_true", help="Run a reduced sweep (for CI or a smoke test)")
+    parser.add_argument("--repeat", type=int, default=None, help="Timed repetitions per case (default 5, quick 1)")
+    parser.add_argument("--only", default=None, help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--compare", default=None, help="Baseline JSON file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.5, help="Slowdown factor reported as a regression")
+    args = parser.parse_args(argv)
+
+    sweep_name = "quick" if args.quick else "full"
+    repeat = args.repeat or (1 if args.quick else 5)
+    results = []
+    for benchmark, swept, params, fn in iter_cases(SWEEPS[sweep_name]):
+        if args.only is not None and args.only not in benchmark:
+            continue
+        timing = measure(fn, repeat)
+        results.append({"benchmark": benchmark, "sweep": swept, "params": params, "repeat": repeat, **timing})
+        print(f"{benchmark:52s} {json.dumps(params):45s} {timing['min_s'] * 1e3:10.2f} ms", flush=True)
+
+    report = {
+        "metadata": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "sweep": sweep_name,
+            "npa_howtopay": npa_howtopay.__version__,
+            "python": sys.version.split()[0],
+            "polars": pl.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+        "scaling": scaling_exponents(results),
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.compare is not None:
+        regressions = compare(results, args.compare, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
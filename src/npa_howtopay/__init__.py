@@ -4,35 +4,54 @@ __version__ = "0.0.1"
 __author__ = "Switchbox"
 __email__ = "hello@switch.box"
 
+from typing import Any
+
 # Import and expose the main classes and functions
 from . import capex_project as cp
 from . import npa_project as npa
-from . import utils
 from .model import run_model
 from .params import (
     COMPARE_COLS,
     KWH_PER_THERM,
+    AllocationScenarioParams,
+    AllocationShares,
     ElectricParams,
     GasParams,
     InputParams,
     ScenarioParams,
     SharedParams,
     TimeSeriesParams,
+    load_run_from_yaml,
     load_scenario_from_yaml,
 )
+from .results import ScenarioResultCube
 
 __all__ = [
     "COMPARE_COLS",
     "KWH_PER_THERM",
+    "AllocationScenarioParams",
+    "AllocationShares",
     "ElectricParams",
     "GasParams",
     "InputParams",
     "ScenarioParams",
+    "ScenarioResultCube",
     "SharedParams",
     "TimeSeriesParams",
     "cp",
+    "load_run_from_yaml",
     "load_scenario_from_yaml",
     "npa",
     "run_model",
     "utils",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    # the plotting helpers pull in matplotlib, so `utils` is only imported on first access
+    if name == "utils":
+        import importlib
+
+        return importlib.import_module(".utils", __name__)
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
@@ -0,0 +1,184 @@
+"""Content-addressed memoization of `run_model` results.
+
+Results are keyed on a hash of every attrs field of the scenario and input parameters plus the contents of the time
+series dataframes, so identical runs are only computed once. Entries live in a bounded in-memory LRU and, optionally,
+in a directory of Parquet files that can be shared by every process on the host.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import attrs
+import polars as pl
+from attrs import define, field, validators
+
+from . import __version__
+from .model import run_model, run_model_pre_bill
+from .params import InputParams, ScenarioParams, TimeSeriesParams
+
+logger = logging.getLogger(__name__)
+
+
+def _df_bytes(df: pl.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    df.write_ipc(buffer, compression="uncompressed")
+    return buffer.getvalue()
+
+
+def run_key(scenario_params: ScenarioParams, input_params: InputParams, ts_params: TimeSeriesParams) -> str:
+    """Stable hash of everything `run_model` depends on, including the package version.
+
+    The key is the same across processes and sessions for identical inputs, and changes whenever any parameter,
+    any time series value or the package version changes.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(__version__.encode())
+    for params in (scenario_params, input_params):
+        hasher.update(json.dumps(attrs.asdict(params), sort_keys=True, default=repr).encode())
+    for ts_field in attrs.fields(TimeSeriesParams):
+        # the time series frames; the npa summary built from them isn't part of the params' value
+        if ts_field.init and ts_field.eq:
+            hasher.update(ts_field.name.encode())
+            hasher.update(_df_bytes(getattr(ts_params, ts_field.name)))
+    return hasher.hexdigest()
+
+
+@define
+class ResultCache:
+    """Two-tier cache of model results.
+
+    Args:
+        max_entries: Maximum number of results held in memory; the least recently used result is evicted first.
+        cache_dir: Optional directory for the on-disk Parquet tier. Results are stored under a subdirectory per
+            package version, so upgrading the package never serves stale results. Files are written atomically,
+            so several processes can share one directory.
+    """
+
+    max_entries: int = field(default=128, validator=validators.ge(1))
+    cache_dir: Optional[str] = field(default=None)
+    hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+    _entries: "OrderedDict[str, pl.DataFrame]" = field(init=False, factory=OrderedDict)
+    _lock: threading.Lock = field(init=False, factory=threading.Lock)
+
+    @property
+    def version_dir(self) -> Optional[str]:
+        return None if self.cache_dir is None else os.path.join(self.cache_dir, __version__)
+
+    def _path(self, key: str) -> Optional[str]:
+        version_dir = self.version_dir
+        return None if version_dir is None else os.path.join(version_dir, f"{key}.parquet")
+
+    def _remember(self, key: str, df: pl.DataFrame) -> None:
+        with self._lock:
+            self._entries[key] = df
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[pl.DataFrame]:
+        """Return the cached result for `key`, or None if it isn't cached in memory or on disk."""
+        with self._lock:
+            df = self._entries.get(key)
+            if df is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return df.clone()
+
+        path = self._path(key)
+        if path is not None and os.path.exists(path):
+            try:
+                df = pl.read_parquet(path)
+            except Exception:
+                # another process may be clearing the directory; treat anything unreadable as a miss
+                logger.warning(f"Ignoring unreadable cache entry {path}")
+            else:
+                self._remember(key, df)
+                with self._lock:
+                    self.hits += 1
+                return df.clone()
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, df: pl.DataFrame) -> None:
+        """Store a result in memory and, if configured, on disk."""
+        self._remember(key, df)
+        version_dir = self.version_dir
+        if version_dir is None:
+            return
+        os.makedirs(version_dir, exist_ok=True)
+        # write to a temporary file and rename it into place so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=version_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                df.write_parquet(f)
+            os.replace(tmp_path, os.path.join(version_dir, f"{key}.parquet"))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def clear(self, disk: bool = False) -> None:
+        """Drop every in-memory entry, and the on-disk entries for this package version if `disk` is True."""
+        with self._lock:
+            self._entries.clear()
+        version_dir = self.version_dir
+        if disk and version_dir is not None:
+            shutil.rmtree(version_dir, ignore_errors=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def run_model(
+        self, scenario_params: ScenarioParams, input_params: InputParams, ts_params: TimeSeriesParams
+    ) -> pl.DataFrame:
+        """Memoized `run_model`."""
+        key = run_key(scenario_params, input_params, ts_params)
+        df = self.get(key)
+        if df is None:
+            df = run_model(scenario_params, input_params, ts_params)
+            self.put(key, df)
+        return df
+
+    def run_model_pre_bill(
+        self, scenario_params: ScenarioParams, input_params: InputParams, ts_params: TimeSeriesParams
+    ) -> pl.DataFrame:
+        """Memoized `run_model_pre_bill`, stored alongside (but separately from) the full results."""
+        key = f"{run_key(scenario_params, input_params, ts_params)}-pre-bill"
+        df = self.get(key)
+        if df is None:
+            df = run_model_pre_bill(scenario_params, input_params, ts_params)
+            self.put(key, df)
+        return df
+
+
+default_cache = ResultCache()
+
+
+def run_model_cached(
+    scenario_params: ScenarioParams,
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    cache: Optional[ResultCache] = None,
+) -> pl.DataFrame:
+    """Memoized `run_model` using `cache`, or the module's in-memory `default_cache` if none is given."""
+    return (default_cache if cache is None else cache).run_model(scenario_params, input_params, ts_params)
+
+
+def run_model_pre_bill_cached(
+    scenario_params: ScenarioParams,
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    cache: Optional[ResultCache] = None,
+) -> pl.DataFrame:
+    """Memoized `run_model_pre_bill` using `cache`, or the module's in-memory `default_cache` if none is given."""
+    return (default_cache if cache is None else cache).run_model_pre_bill(scenario_params, input_params, ts_params)
@@ -1,8 +1,11 @@
+from typing import Optional
+
 import numpy as np
 import polars as pl
 from attrs import define, field, validators
 
 from .npa_project import (
+    NpaProjects,
     compute_hp_converts_from_df,
     compute_npa_pipe_cost_avoided_from_df,
     compute_peak_kw_increase_from_df,
@@ -15,13 +18,13 @@ from .npa_project import (
 # depreciation_lifetime: int
 ## (someday)depreciation_schedule: str # "straight line" or "accelerated"
 
+PROJECT_TYPES = ("synthetic_initial", "misc", "pipeline", "grid_upgrade", "npa")
+
 
 @define
 class CapexProject:
     project_year: int = field()
-    project_type: str = field(
-        validator=validators.in_(["synthetic_initial", "misc", "pipeline", "grid_upgrade", "npa"])
-    )
+    project_type: str = field(validator=validators.in_(PROJECT_TYPES))
     original_cost: float = field(validator=validators.ge(0.0))
     depreciation_lifetime: int = field(validator=validators.ge(1))
 
@@ -52,6 +55,432 @@ class NpvSavingsProject:
         })
 
 
+@define(frozen=True)
+class SyntheticBlock:
+    """The synthetic projects that make up the initial ratebase, held as a single closed-form entry.
+
+    The block stands for `depreciation_lifetime` projects of equal `original_cost`, one in each year up to and
+    including `start_year` (see `get_synthetic_initial_capex_projects`). Their combined ratebase, depreciation
+    expense and maintenance base follow from arithmetic series, so `schedules` evaluates any year in O(1) instead of
+    scanning one row per project.
+    """
+
+    start_year: int
+    original_cost: float = field(validator=validators.ge(0.0))
+    depreciation_lifetime: int = field(validator=validators.ge(1))
+
+    @classmethod
+    def from_initial_ratebase(
+        cls, start_year: int, initial_ratebase: float, depreciation_lifetime: int
+    ) -> "SyntheticBlock":
+        """The block whose ratebase in `start_year` is `initial_ratebase`."""
+        total_weight = (depreciation_lifetime * (depreciation_lifetime + 1) / 2) / depreciation_lifetime
+        return cls(start_year, initial_ratebase / total_weight, depreciation_lifetime)
+
+    @property
+    def project_years(self) -> range:
+        return range(self.start_year - self.depreciation_lifetime + 1, self.start_year + 1)
+
+    def schedules(self, years: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Ratebase, depreciation expense and maintenance base of the block in each of `years`.
+
+        Agrees with `CapexLedger.schedules` over the expanded projects of `to_df`.
+        """
+        years = np.asarray(years, dtype=np.int64)
+        lifetime = self.depreciation_lifetime
+        first_year, last_year = self.start_year - lifetime + 1, self.start_year
+
+        # ratebase: each project in service contributes (lifetime - age) / lifetime of its cost, so sum that
+        # arithmetic series over the ages of the projects started by `years`
+        min_age = np.maximum(years - last_year, 0)
+        max_age = np.minimum(years - first_year, lifetime)
+        num_ages = np.maximum(max_age - min_age + 1, 0)
+        ratebase = self.original_cost * num_ages * (lifetime - (min_age + max_age) / 2) / lifetime
+
+        # depreciation is charged by projects with year - lifetime <= project_year < year, maintenance by those
+        # with year - lifetime <= project_year <= year
+        oldest = np.maximum(first_year, years - lifetime)
+        num_depreciating = np.maximum(np.minimum(last_year, years - 1) - oldest + 1, 0)
+        num_in_service = np.maximum(np.minimum(last_year, years) - oldest + 1, 0)
+        return (
+            ratebase,
+            self.original_cost / lifetime * num_depreciating,
+            self.original_cost * num_in_service.astype(np.float64),
+        )
+
+    def to_df(self) -> pl.DataFrame:
+        """Expand the block into one capex project row per year."""
+        project_years = self.project_years
+        lifetime = self.depreciation_lifetime
+        return pl.DataFrame({
+            "project_year": project_years,
+            "project_type": ["synthetic_initial"] * lifetime,
+            "original_cost": self.original_cost,
+            "depreciation_lifetime": pl.Series([lifetime] * lifetime, dtype=pl.Int64),
+            "retirement_year": pl.Series([year + lifetime for year in project_years], dtype=pl.Int64),
+        })
+
+
+@define
+class CapexAccumulator:
+    """Running ratebase, depreciation and maintenance totals for a stream of capex projects.
+
+    Rather than rescanning every project each year, the accumulator keeps the totals for the current `year` plus a
+    schedule of future changes (vintages entering the ratebase, depreciation starting and stopping, projects retiring)
+    keyed by year. Adding a project and advancing one year are both O(1) amortized. The totals agree with
+    `compute_ratebase_from_capex_projects`, `compute_depreciation_expense_from_capex_projects` and
+    `compute_maintanence_costs`, which remain the reference implementation.
+
+    Args:
+        year: The year the totals currently describe. Projects may be added for any year, before or after it.
+    """
+
+    year: int
+    ratebase: float = field(init=False, default=0.0)
+    depreciation_expense: float = field(init=False, default=0.0)
+    maintenance_base: float = field(init=False, default=0.0)  # original cost of non-npa projects in service
+    _ratebase_additions: dict[int, float] = field(init=False, factory=dict)
+    _depreciation_changes: dict[int, float] = field(init=False, factory=dict)
+    _maintenance_changes: dict[int, float] = field(init=False, factory=dict)
+
+    @staticmethod
+    def _schedule(events: dict[int, float], year: int, amount: float) -> None:
+        events[year] = events.get(year, 0.0) + amount
+
+    def add(self, project_year: int, project_type: str, original_cost: float, depreciation_lifetime: int) -> None:
+        """Add a single capex project to the running totals."""
+        year = self.year
+        retirement_year = project_year + depreciation_lifetime
+        annual_depreciation = original_cost / depreciation_lifetime
+
+        # ratebase: full cost in the project year, declining linearly to zero at retirement
+        if project_year <= year:
+            self.ratebase += original_cost * max(0.0, 1 - (year - project_year) / depreciation_lifetime)
+        else:
+            self._schedule(self._ratebase_additions, project_year, original_cost)
+
+        # depreciation: charged in project_year < year <= retirement_year
+        if project_year < year <= retirement_year:
+            self.depreciation_expense += annual_depreciation
+        if project_year >= year:
+            self._schedule(self._depreciation_changes, project_year + 1, annual_depreciation)
+        if retirement_year >= year:
+            self._schedule(self._depreciation_changes, retirement_year + 1, -annual_depreciation)
+
+        # maintenance: non-npa projects in project_year <= year <= retirement_year
+        if project_type != "npa":
+            if project_year <= year <= retirement_year:
+                self.maintenance_base += original_cost
+            if project_year > year:
+                self._schedule(self._maintenance_changes, project_year, original_cost)
+            if retirement_year >= year:
+                self._schedule(self._maintenance_changes, retirement_year + 1, -original_cost)
+
+    def extend(self, df: pl.DataFrame) -> None:
+        """Add every row of a capex project dataframe to the running totals."""
+        for project_year, project_type, original_cost, depreciation_lifetime in df.select(
+            "project_year", "project_type", "original_cost", "depreciation_lifetime"
+        ).iter_rows():
+            self.add(project_year, project_type, original_cost, depreciation_lifetime)
+
+    def advance_to(self, year: int) -> None:
+        """Roll the totals forward one year at a time until they describe `year`."""
+        if year < self.year:
+            msg = f"Cannot move accumulator back from {self.year} to {year}"
+            raise ValueError(msg)
+        while self.year < year:
+            self.year += 1
+            self.depreciation_expense += self._depreciation_changes.pop(self.year, 0.0)
+            self.maintenance_base += self._maintenance_changes.pop(self.year, 0.0)
+            self.ratebase += self._ratebase_additions.pop(self.year, 0.0) - self.depreciation_expense
+
+    def maintenance_costs(self, maintenance_cost_pct: float) -> float:
+        """Annual maintenance costs for the current year, matching `compute_maintanence_costs`."""
+        return self.maintenance_base * maintenance_cost_pct
+
+    def copy(self) -> "CapexAccumulator":
+        """Independent copy of the totals and their schedule of future changes."""
+        other = CapexAccumulator(year=self.year)
+        other.ratebase = self.ratebase
+        other.depreciation_expense = self.depreciation_expense
+        other.maintenance_base = self.maintenance_base
+        other._ratebase_additions = dict(self._ratebase_additions)
+        other._depreciation_changes = dict(self._depreciation_changes)
+        other._maintenance_changes = dict(self._maintenance_changes)
+        return other
+
+
+@define
+class CapexLedger:
+    """Append-only, column-oriented store of capex projects.
+
+    Each column is a preallocated numpy array that doubles in size when full, so appending a vintage is amortized
+    O(1) instead of reallocating the whole frame as repeated `pl.concat` calls do. `to_df` returns the same schema
+    as the project dataframes produced by the functions in this module, so the ledger can be passed anywhere a capex
+    project dataframe is expected.
+
+    For long horizons the ledger can also keep its size bounded: with `merge_cohorts`, projects that share a
+    project year, project type and depreciation lifetime are merged into one cohort row as they are added, and
+    `prune_retired` drops rows that are fully retired. Ratebase, depreciation and maintenance are linear
+    in the original cost, so neither changes any schedule for the years the ledger still describes.
+
+    Args:
+        capacity: Number of rows to preallocate. Size this to the model horizon to avoid any regrowth.
+        totals: Optional running totals that are updated with every project appended to the ledger.
+        merge_cohorts: Merge projects into cohort rows at insert time. Cohorts never mix project types, so `to_df`
+            still reports the total original cost of each type.
+    """
+
+    capacity: int = field(default=64, validator=validators.ge(1))
+    totals: Optional[CapexAccumulator] = field(default=None)
+    merge_cohorts: bool = field(default=False)
+    _size: int = field(init=False, default=0)
+    # row of each (project_year, depreciation_lifetime, project type index) cohort when merging
+    _cohorts: dict[tuple[int, int, int], int] = field(init=False, factory=dict)
+    _synthetic_blocks: list[SyntheticBlock] = field(init=False, factory=list)
+    _project_year: np.ndarray = field(init=False)
+    _project_type: np.ndarray = field(init=False)
+    _original_cost: np.ndarray = field(init=False)
+    _depreciation_lifetime: np.ndarray = field(init=False)
+
+    def __attrs_post_init__(self) -> None:
+        self._project_year = np.empty(self.capacity, dtype=np.int64)
+        self._project_type = np.empty(self.capacity, dtype=np.int8)  # index into PROJECT_TYPES
+        self._original_cost = np.empty(self.capacity, dtype=np.float64)
+        self._depreciation_lifetime = np.empty(self.capacity, dtype=np.int64)
+
+    @classmethod
+    def from_df(cls, df: pl.DataFrame, capacity: int = 64, totals: Optional[CapexAccumulator] = None) -> "CapexLedger":
+        ledger = cls(capacity=max(capacity, df.height, 1), totals=totals)
+        ledger.extend(df)
+        return ledger
+
+    def __len__(self) -> int:
+        return self._size + sum(block.depreciation_lifetime for block in self._synthetic_blocks)
+
+    def _reserve(self, num_rows: int) -> None:
+        required = self._size + num_rows
+        if required <= self.capacity:
+            return
+        new_capacity = max(required, 2 * self.capacity)
+        for name in ("_project_year", "_project_type", "_original_cost", "_depreciation_lifetime"):
+            old = getattr(self, name)
+            new = np.empty(new_capacity, dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, name, new)
+        self.capacity = new_capacity
+
+    def append(self, project_year: int, project_type: str, original_cost: float, depreciation_lifetime: int) -> None:
+        """Append a single capex project to the ledger, or add it to its cohort when merging cohorts."""
+        type_index = PROJECT_TYPES.index(project_type)
+        cohort = (project_year, depreciation_lifetime, type_index)
+        row = self._cohorts.get(cohort) if self.merge_cohorts else None
+        if row is not None:
+            self._original_cost[row] += original_cost
+        else:
+            self._reserve(1)
+            i = self._size
+            self._project_year[i] = project_year
+            self._project_type[i] = type_index
+            self._original_cost[i] = original_cost
+            self._depreciation_lifetime[i] = depreciation_lifetime
+            self._size += 1
+            if self.merge_cohorts:
+                self._cohorts[cohort] = i
+        if self.totals is not None:
+            self.totals.add(project_year, project_type, original_cost, depreciation_lifetime)
+
+    def extend(self, df: pl.DataFrame) -> None:
+        """Append every row of a capex project dataframe (e.g. the output of `get_npa_capex_projects`)."""
+        if df.height == 0:
+            return
+        if self.merge_cohorts:
+            for row in df.select("project_year", "project_type", "original_cost", "depreciation_lifetime").iter_rows():
+                self.append(*row)
+            return
+        self._reserve(df.height)
+        rows = slice(self._size, self._size + df.height)
+        self._project_year[rows] = df["project_year"].to_numpy()
+        self._project_type[rows] = (
+            df["project_type"]
+            .replace_strict(PROJECT_TYPES, list(range(len(PROJECT_TYPES))), return_dtype=pl.Int8)
+            .to_numpy()
+        )
+        self._original_cost[rows] = df["original_cost"].to_numpy()
+        self._depreciation_lifetime[rows] = df["depreciation_lifetime"].to_numpy()
+        self._size += df.height
+        if self.totals is not None:
+            self.totals.extend(df)
+
+    def add_synthetic_block(self, block: SyntheticBlock) -> None:
+        """Add the synthetic initial projects as one closed-form entry rather than a row per project."""
+        self._synthetic_blocks.append(block)
+        if self.totals is not None:
+            for project_year in block.project_years:
+                self.totals.add(project_year, "synthetic_initial", block.original_cost, block.depreciation_lifetime)
+
+    def extend_arrays(
+        self, project_year: np.ndarray, project_type: str, original_cost: np.ndarray, depreciation_lifetime: int
+    ) -> None:
+        """Append one project of `project_type` per entry of `project_year` and `original_cost`."""
+        if self.merge_cohorts:
+            for year, cost in zip(np.asarray(project_year).tolist(), np.asarray(original_cost).tolist()):
+                self.append(year, project_type, cost, depreciation_lifetime)
+            return
+        num_rows = len(project_year)
+        self._reserve(num_rows)
+        rows = slice(self._size, self._size + num_rows)
+        self._project_year[rows] = project_year
+        self._project_type[rows] = PROJECT_TYPES.index(project_type)
+        self._original_cost[rows] = original_cost
+        self._depreciation_lifetime[rows] = depreciation_lifetime
+        self._size += num_rows
+        if self.totals is not None:
+            for year, cost in zip(np.asarray(project_year).tolist(), np.asarray(original_cost).tolist()):
+                self.totals.add(year, project_type, cost, depreciation_lifetime)
+
+    def copy(self) -> "CapexLedger":
+        """Independent copy of the ledger, including a copy of its running totals."""
+        other = CapexLedger(
+            capacity=self.capacity,
+            totals=None if self.totals is None else self.totals.copy(),
+            merge_cohorts=self.merge_cohorts,
+        )
+        other._size = self._size
+        other._cohorts = dict(self._cohorts)
+        other._synthetic_blocks = list(self._synthetic_blocks)
+        for name in ("_project_year", "_project_type", "_original_cost", "_depreciation_lifetime"):
+            setattr(other, name, getattr(self, name).copy())
+        return other
+
+    def prune_retired(self, year: int) -> int:
+        """Drop every project retired before `year`, returning the number of rows dropped.
+
+        A project contributes nothing to the ratebase, depreciation or maintenance after its retirement year, so the
+        schedules of `year` and later are unchanged, but the ledger no longer describes earlier years.
+        """
+        self._synthetic_blocks = [
+            block for block in self._synthetic_blocks if block.start_year + block.depreciation_lifetime >= year
+        ]
+        n = self._size
+        active = np.flatnonzero(self._project_year[:n] + self._depreciation_lifetime[:n] >= year)
+        num_dropped = n - len(active)
+        if num_dropped == 0:
+            return 0
+        for name in ("_project_year", "_project_type", "_original_cost", "_depreciation_lifetime"):
+            column = getattr(self, name)
+            column[: len(active)] = column[active]
+        self._size = len(active)
+        if self.merge_cohorts:
+            self._cohorts = {
+                cohort: i
+                for i, cohort in enumerate(
+                    zip(
+                        self._project_year[: self._size].tolist(),
+                        self._depreciation_lifetime[: self._size].tolist(),
+                        self._project_type[: self._size].tolist(),
+                    )
+                )
+            }
+        return num_dropped
+
+    def schedules(self, years: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Ratebase, depreciation expense and maintenance base of the whole ledger in each of `years`.
+
+        Evaluates every vintage against every year at once, agreeing with `compute_ratebase_from_capex_projects`,
+        `compute_depreciation_expense_from_capex_projects` and `compute_maintanence_costs` (before multiplying by the
+        maintenance percentage) year by year.
+        """
+        n = self._size
+        original_cost = self._original_cost[:n]
+        ratebase_fraction, depreciation_fraction, in_service = _vintage_fractions(
+            years, self._project_year[:n], self._depreciation_lifetime[:n]
+        )
+        maintained_cost = np.where(self._project_type[:n] == PROJECT_TYPES.index("npa"), 0.0, original_cost)
+        ratebase = original_cost @ ratebase_fraction
+        depreciation_expense = original_cost @ depreciation_fraction
+        maintenance_base = maintained_cost @ in_service
+        for block in self._synthetic_blocks:
+            block_ratebase, block_depreciation_expense, block_maintenance_base = block.schedules(years)
+            ratebase = ratebase + block_ratebase
+            depreciation_expense = depreciation_expense + block_depreciation_expense
+            maintenance_base = maintenance_base + block_maintenance_base
+        return ratebase, depreciation_expense, maintenance_base
+
+    def to_df(self) -> pl.DataFrame:
+        """Return the ledger as a capex project dataframe, with any synthetic blocks expanded into the first rows."""
+        n = self._size
+        project_year = self._project_year[:n]
+        depreciation_lifetime = self._depreciation_lifetime[:n]
+        return pl.concat([
+            *(block.to_df() for block in self._synthetic_blocks),
+            pl.DataFrame({
+                "project_year": pl.Series(project_year, dtype=pl.Int64),
+                "project_type": pl.Series(
+                    np.asarray(PROJECT_TYPES, dtype=object)[self._project_type[:n]], dtype=pl.Utf8
+                ),
+                "original_cost": pl.Series(self._original_cost[:n], dtype=pl.Float64),
+                "depreciation_lifetime": pl.Series(depreciation_lifetime, dtype=pl.Int64),
+                "retirement_year": pl.Series(project_year + depreciation_lifetime, dtype=pl.Int64),
+            }),
+        ])
+
+
+def _vintage_fractions(
+    years: np.ndarray, project_year: np.ndarray, depreciation_lifetime: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vintage x year matrices of the straight-line depreciation schedule.
+
+    Returns the fraction of each project's original cost in the ratebase, the fraction charged as depreciation
+    expense, and whether the project is in service (project_year <= year <= retirement_year), for each year.
+    """
+    age = np.asarray(years)[None, :] - np.asarray(project_year)[:, None]
+    lifetime = np.asarray(depreciation_lifetime)[:, None]
+    ratebase_fraction = np.where(age >= 0, np.clip(1 - age / lifetime, 0, None), 0.0)
+    depreciation_fraction = np.where((age > 0) & (age <= lifetime), 1 / lifetime, 0.0)
+    in_service = ((age >= 0) & (age <= lifetime)).astype(np.float64)
+    return ratebase_fraction, depreciation_fraction, in_service
+
+
+def solve_misc_capex_costs(
+    years: np.ndarray,
+    exogenous_ratebase: np.ndarray,
+    ratebase_init: float,
+    baseline_ratebase_growth: float,
+    depreciation_lifetime: int,
+    construction_inflation_rate: float,
+) -> np.ndarray:
+    """Solve for the misc capex of every year of the model horizon at once.
+
+    Each year's misc project costs the previous year's ratebase times the baseline growth and construction inflation
+    (see `get_non_lpp_gas_capex_projects` and `get_non_npa_electric_capex_projects`), and every misc project then adds
+    to later ratebases. The ratebase is linear in the project costs, so with r = E + W m (E the ratebase of all other
+    projects, W the depreciation schedule of the misc vintages) the costs satisfy the lower triangular system
+    (I - g S W) m = g (S E + r_init e_0), where S shifts a series back one year and g is the growth factor.
+
+    Args:
+        years: Consecutive model years
+        exogenous_ratebase: Ratebase from every project except misc capex in each of `years`
+        ratebase_init: Ratebase used for the first year's misc project
+        baseline_ratebase_growth: Annual growth rate of misc capex as fraction of ratebase
+        depreciation_lifetime: Depreciation lifetime in years for misc projects
+        construction_inflation_rate: Annual inflation rate for construction costs
+
+    Returns:
+        np.ndarray: Original cost of the misc project in each of `years`
+    """
+    num_years = len(years)
+    if num_years == 0:
+        return np.zeros(0, dtype=np.float64)
+    growth = baseline_ratebase_growth * (1 + construction_inflation_rate)
+    ratebase_fraction, _, _ = _vintage_fractions(years, years, np.full(num_years, depreciation_lifetime))
+    shift = np.eye(num_years, k=-1)
+    system = np.eye(num_years) - growth * shift @ ratebase_fraction.T
+    rhs = growth * (shift @ exogenous_ratebase)
+    rhs[0] += growth * ratebase_init
+    return np.asarray(np.linalg.solve(system, rhs))
+
+
 def get_synthetic_initial_capex_projects(
     start_year: int, initial_ratebase: float, depreciation_lifetime: int
 ) -> pl.DataFrame:
@@ -73,16 +502,7 @@ def get_synthetic_initial_capex_projects(
             - depreciation_lifetime: Depreciation lifetime in years
             - retirement_year: Year the project is fully depreciated
     """
-    total_weight = (depreciation_lifetime * (depreciation_lifetime + 1) / 2) / depreciation_lifetime
-    est_original_cost_per_year = initial_ratebase / total_weight
-    project_years = range(start_year - depreciation_lifetime + 1, start_year + 1)
-    return pl.DataFrame({
-        "project_year": project_years,
-        "project_type": ["synthetic_initial"] * depreciation_lifetime,
-        "original_cost": est_original_cost_per_year,
-        "depreciation_lifetime": pl.Series([depreciation_lifetime] * depreciation_lifetime, dtype=pl.Int64),
-        "retirement_year": pl.Series([year + depreciation_lifetime for year in project_years], dtype=pl.Int64),
-    })
+    return SyntheticBlock.from_initial_ratebase(start_year, initial_ratebase, depreciation_lifetime).to_df()
 
 
 def get_non_lpp_gas_capex_projects(
@@ -125,7 +545,7 @@ def get_non_lpp_gas_capex_projects(
 def get_lpp_gas_capex_projects(
     year: int,
     gas_bau_lpp_costs_per_year: pl.DataFrame,
-    npa_projects: pl.DataFrame,
+    npa_projects: NpaProjects,
     depreciation_lifetime: int,
 ) -> pl.DataFrame:
     """
@@ -142,7 +562,7 @@ def get_lpp_gas_capex_projects(
             - year: Year of planned replacement
             - cost: Cost of planned replacement
             Note: Multiple entries may exist per year
-        npa_projects: DataFrame containing NPA project details, used to calculate avoided pipe costs
+        npa_projects: DataFrame containing NPA project details, or its NpaYearSummary, used to calculate avoided pipe costs
         depreciation_lifetime: Depreciation lifetime in years for pipe replacement projects
 
     Returns:
@@ -153,8 +573,7 @@ def get_lpp_gas_capex_projects(
             - depreciation_lifetime: Depreciation lifetime in years
             - retirement_year: Year the project is fully depreciated
     """
-    npas_this_year = npa_projects.filter(pl.col("project_year") == year)
-    npa_pipe_costs_avoided = compute_npa_pipe_cost_avoided_from_df(year, npas_this_year)
+    npa_pipe_costs_avoided = compute_npa_pipe_cost_avoided_from_df(year, npa_projects)
     bau_pipe_replacement_costs = (
         gas_bau_lpp_costs_per_year.filter(pl.col("year") == year).select(pl.col("cost")).sum().item()
     )
@@ -208,7 +627,7 @@ def get_non_npa_electric_capex_projects(
 
 def get_grid_upgrade_capex_projects(
     year: int,
-    npa_projects: pl.DataFrame,
+    npa_projects: NpaProjects,
     peak_hp_kw: float,
     peak_aircon_kw: float,
     distribution_cost_per_peak_kw_increase: float,
@@ -223,7 +642,7 @@ def get_grid_upgrade_capex_projects(
 
     Args:
         year: The year to generate projects for
-        npa_projects: DataFrame containing NPA project details
+        npa_projects: DataFrame containing NPA project details, or its NpaYearSummary
         peak_hp_kw: Peak power draw in kW for a heat pump
         peak_aircon_kw: Peak power draw in kW for an air conditioner
         distribution_cost_per_peak_kw_increase: Cost per kW of increasing grid capacity in year of project
@@ -236,8 +655,7 @@ def get_grid_upgrade_capex_projects(
             - original_cost: Total cost of grid upgrades
             - depreciation_lifetime: Depreciation lifetime in years
     """
-    npas_this_year = npa_projects.filter(pl.col("project_year") == year)
-    peak_kw_increase = compute_peak_kw_increase_from_df(year, npas_this_year, peak_hp_kw, peak_aircon_kw)
+    peak_kw_increase = compute_peak_kw_increase_from_df(year, npa_projects, peak_hp_kw, peak_aircon_kw)
     if peak_kw_increase > 0:
         return CapexProject(
             project_year=year,
@@ -250,7 +668,7 @@ def get_grid_upgrade_capex_projects(
 
 
 def get_npa_capex_projects(
-    year: int, npa_projects: pl.DataFrame, npa_install_cost: float, npa_lifetime: int
+    year: int, npa_projects: NpaProjects, npa_install_cost: float, npa_lifetime: int
 ) -> pl.DataFrame:
     """
     Generate capex projects for NPA (non-pipe alternative) installations.
@@ -260,7 +678,7 @@ def get_npa_capex_projects(
 
     Args:
         year: The year to generate projects for
-        npa_projects: DataFrame containing NPA project details
+        npa_projects: DataFrame containing NPA project details, or its NpaYearSummary
         npa_install_cost: Cost per household of installing an NPA
         npa_lifetime: Expected lifetime in years of an NPA installation
 
@@ -271,10 +689,7 @@ def get_npa_capex_projects(
             - original_cost: Total cost of NPA installations
             - depreciation_lifetime: Depreciation lifetime in years
     """
-    npas_this_year = npa_projects.filter(pl.col("project_year") == year)
-    npa_total_cost = npa_install_cost * compute_hp_converts_from_df(
-        year, npas_this_year, cumulative=False, npa_only=True
-    )
+    npa_total_cost = npa_install_cost * compute_hp_converts_from_df(year, npa_projects, cumulative=False, npa_only=True)
     if npa_total_cost > 0:
         return CapexProject(
             project_year=year, project_type="npa", original_cost=npa_total_cost, depreciation_lifetime=npa_lifetime
@@ -400,7 +815,7 @@ def compute_npv_of_capex_investment(
 
 def compute_npv_savings_from_npa_projects(
     year: int,
-    npa_projects: pl.DataFrame,
+    npa_projects: NpaProjects,
     npa_install_cost: float,
     npa_lifetime: int,
     pipeline_depreciation_lifetime: int,
@@ -416,7 +831,7 @@ def compute_npv_savings_from_npa_projects(
 
     Args:
         year: The year to generate NPV savings projects for
-        npa_projects: DataFrame containing NPA project details
+        npa_projects: DataFrame containing NPA project details, or its NpaYearSummary
         npa_install_cost: Cost per household of installing an NPA
         npa_lifetime: Expected lifetime in years of an NPA installation
         pipeline_depreciation_lifetime: Depreciation lifetime for avoided pipe projects
@@ -430,15 +845,13 @@ def compute_npv_savings_from_npa_projects(
             - payback_period: Number of years to pay incentives
             - end_year: Year the incentive payments end
     """
-    npas_this_year = npa_projects.filter(pl.col("project_year") == year)
-
-    if npas_this_year.height == 0:
-        return return_empty_npv_savings_df()
-
     # Calculate costs
-    num_converts = compute_hp_converts_from_df(year, npas_this_year, cumulative=False, npa_only=True)
+    num_converts = compute_hp_converts_from_df(year, npa_projects, cumulative=False, npa_only=True)
     npa_investment_cost = npa_install_cost * num_converts
-    avoided_lpp_cost = compute_npa_pipe_cost_avoided_from_df(year, npas_this_year)
+    avoided_lpp_cost = compute_npa_pipe_cost_avoided_from_df(year, npa_projects)
+
+    if num_converts == 0 and avoided_lpp_cost == 0:
+        return return_empty_npv_savings_df()
 
     # Calculate NPVs
     npa_npv = npa_investment_cost  # npa investment is opex so costs are recouped in the same year with no ror
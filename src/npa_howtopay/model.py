@@ -1,5 +1,6 @@
 import polars as pl
 from .params import (
+    AllocationScenarioParams,
     InputParams,
     ScenarioParams,
     load_scenario_from_yaml,
@@ -11,28 +12,76 @@ from .params import (
 )
 from . import npa_project as npa
 from . import capex_project as cp
-from attrs import evolve
+from . import profiling
+from .parallel import spawn_process_pool
+from .results import SELF_BASELINES
+from attrs import define, evolve, field, fields
+from collections import deque
+from concurrent.futures import Future
+from contextlib import nullcontext
 from dataclasses import dataclass
-from typing import Literal, Optional
+from typing import Callable, Iterable, Iterator, Literal, Optional, TypeVar, Union
 import logging
+import os
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 
 @dataclass
 class YearContext:
-    """Context for all values needed in a given year"""
+    """Context for all values needed in a given year.
 
-    year: int
-    gas_ratebase: float
-    electric_ratebase: float
-    gas_depreciation_expense: float
-    electric_depreciation_expense: float
-    gas_maintenance_cost: float
-    electric_maintenance_cost: float
-    gas_npa_opex: float
-    electric_npa_opex: float
-    gas_performance_incentive: float
+    The vectorized engine fills every field with an array holding one value per year instead.
+    """
+
+    year: Union[int, np.ndarray]
+    gas_ratebase: Union[float, np.ndarray]
+    electric_ratebase: Union[float, np.ndarray]
+    gas_depreciation_expense: Union[float, np.ndarray]
+    electric_depreciation_expense: Union[float, np.ndarray]
+    gas_maintenance_cost: Union[float, np.ndarray]
+    electric_maintenance_cost: Union[float, np.ndarray]
+    gas_npa_opex: Union[float, np.ndarray]
+    electric_npa_opex: Union[float, np.ndarray]
+    gas_performance_incentive: Union[float, np.ndarray]
+
+
+_CONTEXT_VALUES = [name for name in YearContext.__dataclass_fields__ if name != "year"]
+
+
+@define
+class YearBuffer:
+    """Struct-of-arrays store of the YearContext of every year of a run.
+
+    One preallocated array per context field is filled in as the years are stepped through, and `context` returns
+    a single YearContext holding every year's values as arrays, so the output columns are built in one pass instead
+    of from one-row dataframes per year.
+    """
+
+    start_year: int
+    num_years: int
+    _columns: dict[str, np.ndarray] = field(init=False)
+
+    def __attrs_post_init__(self) -> None:
+        self._columns = {name: np.zeros(self.num_years, dtype=np.float64) for name in _CONTEXT_VALUES}
+
+    def write(self, context: YearContext) -> None:
+        """Store the values of a single year's context."""
+        i = int(context.year) - self.start_year
+        for name in _CONTEXT_VALUES:
+            self._columns[name][i] = getattr(context, name)
+
+    def copy(self) -> "YearBuffer":
+        other = YearBuffer(start_year=self.start_year, num_years=self.num_years)
+        other._columns = {name: column.copy() for name, column in self._columns.items()}
+        return other
+
+    def context(self) -> YearContext:
+        """Return a YearContext whose fields are arrays with one value per year."""
+        return YearContext(
+            year=np.arange(self.start_year, self.start_year + self.num_years, dtype=np.int64), **self._columns
+        )
 
 
 def create_scenario_runs(
@@ -76,6 +125,24 @@ def create_scenario_runs(
     return scenarios
 
 
+def _costs_by_year(df: pl.DataFrame, years: np.ndarray) -> np.ndarray:
+    """Total of the `cost` column of a time series dataframe in each of `years` (zero for years without rows)."""
+    totals = df.group_by("year").agg(pl.col("cost").sum()).with_columns(pl.col("year").cast(pl.Int64))
+    return (
+        pl.DataFrame({"year": pl.Series(years, dtype=pl.Int64)})
+        .join(totals, on="year", how="left", maintain_order="left")["cost"]
+        .fill_null(0)
+        .cast(pl.Float64)
+        .to_numpy()
+    )
+
+
+def _per_year(value_in_year: Callable[[int], float], years: np.ndarray) -> np.ndarray:
+    """Evaluate a per-year parameter method (e.g. `GasParams.gas_generation_cost_per_therm`) for each of `years`."""
+    unique_years, index = np.unique(years, return_inverse=True)
+    return np.array([value_in_year(year) for year in unique_years.tolist()], dtype=np.float64)[index.reshape(-1)]
+
+
 def compute_intermediate_cols_gas(
     context: YearContext, input_params: InputParams, ts_params: TimeSeriesParams
 ) -> pl.DataFrame:
@@ -93,16 +160,15 @@ def compute_intermediate_cols_gas(
         ts_params: Time series parameters with NPA projects and overhead costs
 
     Returns:
-        DataFrame with calculated gas utility metrics for the given year
+        DataFrame with calculated gas utility metrics for the given year, or one row per year for an array context
     """
-    gas_fixed_overhead_costs = (
-        ts_params.gas_fixed_overhead_costs.filter(pl.col("year") == context.year).select(pl.col("cost")).sum().item()
-    )
-    gas_num_users = input_params.gas.num_users_init - npa.compute_hp_converts_from_df(
-        context.year, ts_params.npa_projects, cumulative=True, npa_only=False
+    years = np.atleast_1d(context.year)
+    gas_fixed_overhead_costs = _costs_by_year(ts_params.gas_fixed_overhead_costs, years)
+    gas_num_users = input_params.gas.num_users_init - ts_params.npa_summary.hp_converts_by_year(
+        years, cumulative=True, npa_only=False
     )
     total_usage = gas_num_users * input_params.gas.per_user_heating_need_therms
-    costs_volumetric = total_usage * input_params.gas.gas_generation_cost_per_therm(context.year)
+    costs_volumetric = total_usage * _per_year(input_params.gas.gas_generation_cost_per_therm, years)
     costs_fixed = gas_fixed_overhead_costs + context.gas_maintenance_cost + context.gas_npa_opex
     opex_costs = costs_fixed + costs_volumetric
     revenue_requirement = (
@@ -116,14 +182,14 @@ def compute_intermediate_cols_gas(
     ) / revenue_requirement  # Return on Rate Base as % of Revenue Requirement
 
     return pl.DataFrame({
-        "year": [context.year],
-        "gas_num_users": [gas_num_users],
-        "total_gas_usage_therms": [total_usage],
-        "gas_costs_volumetric": [costs_volumetric],
-        "gas_costs_fixed": [costs_fixed],
-        "gas_opex_costs": [opex_costs],
-        "gas_revenue_requirement": [revenue_requirement],
-        "gas_return_on_ratebase_pct": [return_on_ratebase_pct],
+        "year": years,
+        "gas_num_users": gas_num_users,
+        "total_gas_usage_therms": total_usage,
+        "gas_costs_volumetric": costs_volumetric,
+        "gas_costs_fixed": costs_fixed,
+        "gas_opex_costs": opex_costs,
+        "gas_revenue_requirement": revenue_requirement,
+        "gas_return_on_ratebase_pct": return_on_ratebase_pct,
     })
 
 
@@ -144,18 +210,12 @@ def compute_intermediate_cols_electric(
         ts_params: Time series parameters with NPA projects and overhead costs
 
     Returns:
-        DataFrame with calculated electric utility metrics for the given year
+        DataFrame with calculated electric utility metrics for the given year, or one row per year for an array context
     """
-    electric_fixed_overhead_costs = (
-        ts_params.electric_fixed_overhead_costs.filter(pl.col("year") == context.year)
-        .select(pl.col("cost"))
-        .sum()
-        .item()
-    )
-    total_converts_cumul = npa.compute_hp_converts_from_df(
-        context.year, ts_params.npa_projects, cumulative=True, npa_only=False
-    )
-    electric_num_users = input_params.electric.num_users_init
+    years = np.atleast_1d(context.year)
+    electric_fixed_overhead_costs = _costs_by_year(ts_params.electric_fixed_overhead_costs, years)
+    total_converts_cumul = ts_params.npa_summary.hp_converts_by_year(years, cumulative=True, npa_only=False)
+    electric_num_users = np.full(len(years), input_params.electric.num_users_init)
     added_usage = (
         total_converts_cumul
         * input_params.gas.per_user_heating_need_therms
@@ -167,7 +227,7 @@ def compute_intermediate_cols_electric(
         / input_params.electric.water_heater_efficiency
     )
     total_usage = input_params.electric.num_users_init * input_params.electric.per_user_electric_need_kwh + added_usage
-    costs_volumetric = total_usage * input_params.electric.electricity_generation_cost_per_kwh(context.year)
+    costs_volumetric = total_usage * _per_year(input_params.electric.electricity_generation_cost_per_kwh, years)
     costs_fixed = electric_fixed_overhead_costs + context.electric_maintenance_cost + context.electric_npa_opex
     opex_costs = costs_fixed + costs_volumetric
     revenue_requirement = (
@@ -178,16 +238,16 @@ def compute_intermediate_cols_electric(
     ) / revenue_requirement  # Return on Rate Base as % of Revenue Requirement
 
     return pl.DataFrame({
-        "year": [context.year],
-        "electric_num_users": [electric_num_users],
-        "total_converts_cumul": [total_converts_cumul],
-        "electric_added_usage_kwh": [added_usage],
-        "total_electric_usage_kwh": [total_usage],
-        "electric_costs_volumetric": [costs_volumetric],
-        "electric_costs_fixed": [costs_fixed],
-        "electric_opex_costs": [opex_costs],
-        "electric_revenue_requirement": [revenue_requirement],
-        "electric_return_on_ratebase_pct": [return_on_ratebase_pct],
+        "year": years,
+        "electric_num_users": electric_num_users,
+        "total_converts_cumul": total_converts_cumul,
+        "electric_added_usage_kwh": added_usage,
+        "total_electric_usage_kwh": total_usage,
+        "electric_costs_volumetric": costs_volumetric,
+        "electric_costs_fixed": costs_fixed,
+        "electric_opex_costs": opex_costs,
+        "electric_revenue_requirement": revenue_requirement,
+        "electric_return_on_ratebase_pct": return_on_ratebase_pct,
     })
 
 
@@ -201,8 +261,13 @@ def inflation_adjust_revenue_requirement(
     return revenue_req / ((1 + real_dollar_discount_rate) ** (year - start_year))
 
 
+# The bill helpers below take plain numbers for a single year, or polars expressions when `_bill_cost_stages` builds
+# whole columns with them
+FloatOrExpr = TypeVar("FloatOrExpr", float, pl.Expr)
+
+
 # Average bill per user
-def calculate_avg_bill_per_user(inflation_adjusted_revenue: float, num_users: int) -> float:
+def calculate_avg_bill_per_user(inflation_adjusted_revenue: FloatOrExpr, num_users: FloatOrExpr) -> FloatOrExpr:
     """Calculate the average bill per user by dividing total revenue by number of users.
 
     Args:
@@ -217,15 +282,18 @@ def calculate_avg_bill_per_user(inflation_adjusted_revenue: float, num_users: in
 
 # Electric bills
 # Fixed charge per user
-def calculate_electric_fixed_charge_per_user(fixed_charge: float) -> float:
+def calculate_electric_fixed_charge_per_user(fixed_charge: FloatOrExpr) -> FloatOrExpr:
     """Return electric fixed charge per user. Currently a user defined constant"""
     return fixed_charge
 
 
 # Volumetric bill per user
 def calculate_electric_variable_tariff_per_kwh(
-    electric_infl_adj_revenue: float, total_electric_usage_kwh: float, fixed_charge: float, num_users: int
-) -> float:
+    electric_infl_adj_revenue: FloatOrExpr,
+    total_electric_usage_kwh: FloatOrExpr,
+    fixed_charge: FloatOrExpr,
+    num_users: FloatOrExpr,
+) -> FloatOrExpr:
     """Calculate electric variable cost per kWh.
 
     Args:
@@ -241,17 +309,17 @@ def calculate_electric_variable_tariff_per_kwh(
     return (electric_infl_adj_revenue - num_users * fixed_charge) / total_electric_usage_kwh
 
 
-def calculate_gas_fixed_charge_per_user(fixed_charge: float) -> float:
+def calculate_gas_fixed_charge_per_user(fixed_charge: FloatOrExpr) -> FloatOrExpr:
     """Return gas fixed cost per user. Currently a user defined constant"""
     return fixed_charge
 
 
 def calculate_gas_variable_tariff_per_therm(
-    gas_infl_adj_revenue: float,
-    total_gas_usage_therms: float,
-    fixed_charge: float,
-    num_users: int,
-) -> float:
+    gas_infl_adj_revenue: FloatOrExpr,
+    total_gas_usage_therms: FloatOrExpr,
+    fixed_charge: FloatOrExpr,
+    num_users: FloatOrExpr,
+) -> FloatOrExpr:
     """Calculate gas variable cost per therm.
 
     Args:
@@ -268,8 +336,8 @@ def calculate_gas_variable_tariff_per_therm(
 
 
 def calculate_nonconverts_gas_bill_per_user(
-    gas_fixed_charge: float, gas_variable_tariff: float, per_user_heating_need: float
-) -> float:
+    gas_fixed_charge: FloatOrExpr, gas_variable_tariff: FloatOrExpr, per_user_heating_need: FloatOrExpr
+) -> FloatOrExpr:
     """Calculate gas bill per user for nonconverts.
 
     Args:
@@ -284,14 +352,14 @@ def calculate_nonconverts_gas_bill_per_user(
 
 
 def calculate_converts_electric_bill_per_user(
-    electric_fixed_charge: float,
-    electric_variable_tariff: float,
-    per_user_electric_need: float,
-    per_user_heating_need: float,
-    per_user_water_heating_need: float,
-    hp_efficiency: float,
-    water_heater_efficiency: float,
-) -> float:
+    electric_fixed_charge: FloatOrExpr,
+    electric_variable_tariff: FloatOrExpr,
+    per_user_electric_need: FloatOrExpr,
+    per_user_heating_need: FloatOrExpr,
+    per_user_water_heating_need: FloatOrExpr,
+    hp_efficiency: FloatOrExpr,
+    water_heater_efficiency: FloatOrExpr,
+) -> FloatOrExpr:
     """Calculate electric bill per user for converts (includes heating).
 
     Args:
@@ -314,8 +382,8 @@ def calculate_converts_electric_bill_per_user(
 
 
 def calculate_nonconverts_electric_bill_per_user(
-    electric_fixed_charge: float, electric_variable_tariff: float, per_user_electric_need: float
-) -> float:
+    electric_fixed_charge: FloatOrExpr, electric_variable_tariff: FloatOrExpr, per_user_electric_need: FloatOrExpr
+) -> FloatOrExpr:
     """Calculate electric bill per user for nonconverts (no heating).
 
     Args:
@@ -330,7 +398,9 @@ def calculate_nonconverts_electric_bill_per_user(
 
 
 # Total Energy bills
-def calculate_converts_total_bill_per_user(converts_gas_bill: float, converts_electric_bill: float) -> float:
+def calculate_converts_total_bill_per_user(
+    converts_gas_bill: FloatOrExpr, converts_electric_bill: FloatOrExpr
+) -> FloatOrExpr:
     """Calculate total bill per user for converts (gas + electric).
 
     Args:
@@ -343,7 +413,9 @@ def calculate_converts_total_bill_per_user(converts_gas_bill: float, converts_el
     return converts_gas_bill + converts_electric_bill
 
 
-def calculate_nonconverts_total_bill_per_user(nonconverts_gas_bill: float, nonconverts_electric_bill: float) -> float:
+def calculate_nonconverts_total_bill_per_user(
+    nonconverts_gas_bill: FloatOrExpr, nonconverts_electric_bill: FloatOrExpr
+) -> FloatOrExpr:
     """Calculate total bill per user for nonconverts (gas + electric).
 
     Args:
@@ -356,9 +428,185 @@ def calculate_nonconverts_total_bill_per_user(nonconverts_gas_bill: float, nonco
     return nonconverts_gas_bill + nonconverts_electric_bill
 
 
+def _bill_cost_params(input_params: InputParams) -> dict[str, float]:
+    """Return the input parameters used by the bill stage, keyed by name."""
+    return {
+        "real_dollar_discount_rate": input_params.shared.real_dollar_discount_rate,
+        "gas_user_bill_fixed_charge": input_params.gas.user_bill_fixed_charge,
+        "gas_num_users_init": input_params.gas.num_users_init,
+        "per_user_heating_need_therms": input_params.gas.per_user_heating_need_therms,
+        "per_user_water_heating_need_therms": input_params.gas.per_user_water_heating_need_therms,
+        "electric_user_bill_fixed_charge": input_params.electric.user_bill_fixed_charge,
+        "electric_num_users_init": input_params.electric.num_users_init,
+        "per_user_electric_need_kwh": input_params.electric.per_user_electric_need_kwh,
+        "hp_efficiency": input_params.electric.hp_efficiency,
+        "water_heater_efficiency": input_params.electric.water_heater_efficiency,
+    }
+
+
+def _parameter_values(value: Union[float, list[float], np.ndarray]) -> np.ndarray:
+    return np.atleast_1d(np.asarray(value, dtype=np.float64))
+
+
+@define
+class BillStageParams:
+    """A batch of bill-stage parameter sets, one value per variant in each field (scalars are broadcast).
+
+    These are the inputs `compute_bill_costs` reads besides the pre-bill output. None of them feed the capex
+    ledgers, but the user counts, per-user needs and efficiencies also set each year's usage, so
+    `compute_bill_costs_variants` recomputes the usage, volumetric costs and revenue requirements of every variant
+    before its bills.
+    """
+
+    real_dollar_discount_rate: np.ndarray = field(converter=_parameter_values)
+    gas_user_bill_fixed_charge: np.ndarray = field(converter=_parameter_values)
+    gas_num_users_init: np.ndarray = field(converter=_parameter_values)
+    per_user_heating_need_therms: np.ndarray = field(converter=_parameter_values)
+    per_user_water_heating_need_therms: np.ndarray = field(converter=_parameter_values)
+    electric_user_bill_fixed_charge: np.ndarray = field(converter=_parameter_values)
+    electric_num_users_init: np.ndarray = field(converter=_parameter_values)
+    per_user_electric_need_kwh: np.ndarray = field(converter=_parameter_values)
+    hp_efficiency: np.ndarray = field(converter=_parameter_values)
+    water_heater_efficiency: np.ndarray = field(converter=_parameter_values)
+
+    def __attrs_post_init__(self) -> None:
+        names = [f.name for f in fields(BillStageParams)]
+        for name, values in zip(names, np.broadcast_arrays(*(getattr(self, name) for name in names))):
+            setattr(self, name, values.copy())
+
+    @classmethod
+    def from_input_params(
+        cls, input_params: InputParams, **variants: Union[float, list[float], np.ndarray]
+    ) -> "BillStageParams":
+        """The bill-stage parameters of `input_params`, with any field replaced by `variants`.
+
+        For example `BillStageParams.from_input_params(input_params, gas_user_bill_fixed_charge=np.arange(0, 50, 5))`
+        gives ten variants that differ only in the gas fixed charge.
+        """
+        return cls(**{**_bill_cost_params(input_params), **variants})
+
+    def __len__(self) -> int:
+        return len(self.real_dollar_discount_rate)
+
+    def to_df(self) -> pl.DataFrame:
+        return pl.DataFrame({f.name: getattr(self, f.name) for f in fields(BillStageParams)})
+
+
+def _bill_cost_stages(start_year: pl.Expr, params: dict[str, pl.Expr]) -> list[list[pl.Expr]]:
+    """Build the native polars expressions for the bill stage, grouped into dependent `with_columns` stages.
+
+    The scalar helper functions above are reused on expressions so the formulas live in one place.
+    `start_year` and each parameter may be a literal or a per-row expression (for stacked scenarios).
+    """
+    discount_factor = (1 + params["real_dollar_discount_rate"]).pow(pl.col("year") - start_year)
+    return [
+        # inflation-adjusted revenue requirements and ratebases
+        [
+            (pl.col("gas_revenue_requirement") / discount_factor).alias("gas_inflation_adjusted_revenue_requirement"),
+            (pl.col("electric_revenue_requirement") / discount_factor).alias(
+                "electric_inflation_adjusted_revenue_requirement"
+            ),
+            (pl.col("gas_revenue_requirement") + pl.col("electric_revenue_requirement")).alias(
+                "total_revenue_requirement"
+            ),
+            (pl.col("gas_ratebase") / discount_factor).alias("gas_inflation_adjusted_ratebase"),
+            (pl.col("electric_ratebase") / discount_factor).alias("electric_inflation_adjusted_ratebase"),
+        ],
+        # gas and electric tariffs (and total inflation adjusted revenue requirement)
+        [
+            (
+                pl.col("gas_inflation_adjusted_revenue_requirement")
+                + pl.col("electric_inflation_adjusted_revenue_requirement")
+            ).alias("total_inflation_adjusted_revenue_requirement"),
+            calculate_gas_variable_tariff_per_therm(
+                pl.col("gas_inflation_adjusted_revenue_requirement"),
+                pl.col("total_gas_usage_therms"),
+                params["gas_user_bill_fixed_charge"],
+                params["gas_num_users_init"],
+            ).alias("gas_variable_tariff_per_therm"),
+            calculate_electric_variable_tariff_per_kwh(
+                pl.col("electric_inflation_adjusted_revenue_requirement"),
+                pl.col("total_electric_usage_kwh"),
+                params["electric_user_bill_fixed_charge"],
+                params["electric_num_users_init"],
+            ).alias("electric_variable_tariff_per_kwh"),
+            calculate_electric_fixed_charge_per_user(params["electric_user_bill_fixed_charge"]).alias(
+                "electric_fixed_charge_per_user"
+            ),
+            calculate_gas_fixed_charge_per_user(params["gas_user_bill_fixed_charge"]).alias(
+                "gas_fixed_charge_per_user"
+            ),
+        ],
+        # per-user gas bills
+        [
+            calculate_avg_bill_per_user(
+                pl.col("gas_inflation_adjusted_revenue_requirement"), pl.col("gas_num_users")
+            ).alias("gas_avg_bill_per_user"),
+            calculate_nonconverts_gas_bill_per_user(
+                pl.col("gas_fixed_charge_per_user"),
+                pl.col("gas_variable_tariff_per_therm"),
+                params["per_user_heating_need_therms"],
+            ).alias("gas_nonconverts_bill_per_user"),
+            pl.lit(0.0).alias("gas_converts_bill_per_user"),
+        ],
+        # converts and nonconverts electric bills
+        [
+            calculate_avg_bill_per_user(
+                pl.col("electric_inflation_adjusted_revenue_requirement"), pl.col("electric_num_users")
+            ).alias("electric_avg_bill_per_user"),
+            calculate_converts_electric_bill_per_user(
+                pl.col("electric_fixed_charge_per_user"),
+                pl.col("electric_variable_tariff_per_kwh"),
+                params["per_user_electric_need_kwh"],
+                params["per_user_heating_need_therms"],
+                params["per_user_water_heating_need_therms"],
+                params["hp_efficiency"],
+                params["water_heater_efficiency"],
+            ).alias("electric_converts_bill_per_user"),
+            calculate_nonconverts_electric_bill_per_user(
+                pl.col("electric_fixed_charge_per_user"),
+                pl.col("electric_variable_tariff_per_kwh"),
+                params["per_user_electric_need_kwh"],
+            ).alias("electric_nonconverts_bill_per_user"),
+        ],
+        # total bills for converts and nonconverts
+        [
+            calculate_converts_total_bill_per_user(
+                pl.col("gas_converts_bill_per_user"), pl.col("electric_converts_bill_per_user")
+            ).alias("converts_total_bill_per_user"),
+            calculate_nonconverts_total_bill_per_user(
+                pl.col("gas_nonconverts_bill_per_user"), pl.col("electric_nonconverts_bill_per_user")
+            ).alias("nonconverts_total_bill_per_user"),
+        ],
+    ]
+
+
+def _prune_bill_stages(stages: list[list[pl.Expr]], columns: list[str]) -> tuple[list[list[pl.Expr]], set[str]]:
+    """Drop the bill expressions `columns` don't depend on.
+
+    Returns the remaining stages and every column they or `columns` read, walking the stages backwards so a column
+    is kept when any later kept expression reads it.
+    """
+    needed = set(columns)
+    kept = []
+    for stage in reversed(stages):
+        stage_exprs = [expr for expr in stage if expr.meta.output_name() in needed]
+        for expr in stage_exprs:
+            needed.update(expr.meta.root_names())
+        if stage_exprs:
+            kept.append(stage_exprs)
+    return kept[::-1], needed
+
+
+def _output_columns(columns: list[str]) -> list[str]:
+    """year followed by the requested columns, in the requested order and without repeats."""
+    return ["year", *(name for name in dict.fromkeys(columns) if name != "year")]
+
+
 def compute_bill_costs(
     df: pl.DataFrame,
     input_params: InputParams,
+    columns: Optional[list[str]] = None,
 ) -> pl.DataFrame:
     """Compute bill costs and tariffs for gas and electric utilities.
 
@@ -368,372 +616,1174 @@ def compute_bill_costs(
     - Utility bills per user for converts and nonconverts
     - Total bills per user for converts and nonconverts
 
+    All columns are built with native polars expressions in a single lazy query plan.
+
     Args:
         df: DataFrame containing revenue requirements and usage data
         input_params: Input parameters containing utility rates and user counts
+        columns: Only build the bill columns these columns depend on and return just year and these columns.
+            Defaults to every column of `df` plus every bill column.
 
     Returns:
         DataFrame with added columns for adjusted revenue requirements and tariffs
     """
     start_year = df.select(pl.col("year")).min().item()
+    params = {name: pl.lit(value) for name, value in _bill_cost_params(input_params).items()}
+    stages = _bill_cost_stages(pl.lit(start_year), params)
+    if columns is not None:
+        stages, _ = _prune_bill_stages(stages, columns)
+
+    lf = df.lazy()
+    for stage in stages:
+        lf = lf.with_columns(stage)
+    if columns is not None:
+        lf = lf.select(_output_columns(columns))
+    return lf.collect()
+
+
+def compute_bill_costs_batch(
+    df: pl.DataFrame,
+    input_params: Union[InputParams, dict[str, InputParams]],
+    scenario_col: str = "scenario_id",
+) -> pl.DataFrame:
+    """Compute bill costs for many scenarios stacked in one DataFrame in a single pass.
+
+    Equivalent to calling `compute_bill_costs` on each scenario separately and concatenating the results. The
+    inflation adjustment uses the first year of each scenario as its start year.
+
+    Args:
+        df: Stacked DataFrame of revenue requirements and usage data with a `scenario_col` column
+        input_params: Input parameters shared by every scenario, or a mapping of scenario id to input parameters
+        scenario_col: Name of the column identifying the scenario of each row
+
+    Returns:
+        DataFrame with the same rows as `df` and the bill cost columns added
+    """
+    if isinstance(input_params, InputParams):
+        params = {name: pl.lit(value) for name, value in _bill_cost_params(input_params).items()}
+    else:
+        if not input_params:
+            raise ValueError("input_params must name at least one scenario")
+        missing = set(df[scenario_col].unique().to_list()) - set(input_params)
+        if missing:
+            raise ValueError(f"No input params given for scenarios: {sorted(missing)}")
+        per_scenario = {scenario_id: _bill_cost_params(p) for scenario_id, p in input_params.items()}
+        params = {
+            name: pl.col(scenario_col).replace_strict(
+                {scenario_id: values[name] for scenario_id, values in per_scenario.items()},
+                return_dtype=pl.Float64,
+            )
+            for name in _bill_cost_params(next(iter(input_params.values())))
+        }
+
+    lf = df.lazy()
+    for stage in _bill_cost_stages(pl.col("year").min().over(scenario_col), params):
+        lf = lf.with_columns(stage)
+    return lf.collect()
+
 
-    # Create inflation-adjusted revenue requirement columns
-    df = df.with_columns([
-        pl.struct(["gas_revenue_requirement", "year"])
-        .map_elements(
-            lambda x: inflation_adjust_revenue_requirement(
-                x["gas_revenue_requirement"], x["year"], start_year, input_params.shared.real_dollar_discount_rate
+def _usage_cost_stages(params: dict[str, pl.Expr], input_params: InputParams) -> list[list[pl.Expr]]:
+    """Polars expressions recomputing the pre-bill columns that depend on bill-stage parameters.
+
+    Mirrors `compute_intermediate_cols_gas` and `compute_intermediate_cols_electric` on a pre-bill output whose
+    capex-driven columns (ratebase, depreciation, fixed costs, cumulative converts) are kept as they are. The
+    per-year generation costs are read from the `_gas_generation_cost` and `_electric_generation_cost` columns.
+    """
+    gas_ror, electric_ror = input_params.gas.ror, input_params.electric.ror
+    return [
+        # the gas performance incentive isn't an output column, so it is recovered from the original revenue
+        # requirement (exactly zero in scenarios without one)
+        [
+            (
+                pl.col("gas_revenue_requirement")
+                - (pl.col("gas_ratebase") * gas_ror + pl.col("gas_opex_costs") + pl.col("gas_depreciation_expense"))
+            ).alias("_gas_performance_incentive"),
+            (params["gas_num_users_init"] - pl.col("total_converts_cumul")).alias("gas_num_users"),
+            params["electric_num_users_init"].alias("electric_num_users"),
+            (
+                pl.col("total_converts_cumul")
+                * params["per_user_heating_need_therms"]
+                * KWH_PER_THERM
+                / params["hp_efficiency"]
+                + pl.col("total_converts_cumul")
+                * params["per_user_water_heating_need_therms"]
+                * KWH_PER_THERM
+                / params["water_heater_efficiency"]
+            ).alias("electric_added_usage_kwh"),
+        ],
+        [
+            (pl.col("gas_num_users") * params["per_user_heating_need_therms"]).alias("total_gas_usage_therms"),
+            (
+                params["electric_num_users_init"] * params["per_user_electric_need_kwh"]
+                + pl.col("electric_added_usage_kwh")
+            ).alias("total_electric_usage_kwh"),
+        ],
+        [
+            (pl.col("total_gas_usage_therms") * pl.col("_gas_generation_cost")).alias("gas_costs_volumetric"),
+            (pl.col("total_electric_usage_kwh") * pl.col("_electric_generation_cost")).alias(
+                "electric_costs_volumetric"
             ),
-            return_dtype=pl.Float64,
-        )
-        .alias("gas_inflation_adjusted_revenue_requirement"),
-        pl.struct(["electric_revenue_requirement", "year"])
-        .map_elements(
-            lambda x: inflation_adjust_revenue_requirement(
-                x["electric_revenue_requirement"], x["year"], start_year, input_params.shared.real_dollar_discount_rate
+        ],
+        [
+            (pl.col("gas_costs_fixed") + pl.col("gas_costs_volumetric")).alias("gas_opex_costs"),
+            (pl.col("electric_costs_fixed") + pl.col("electric_costs_volumetric")).alias("electric_opex_costs"),
+        ],
+        [
+            (
+                pl.col("gas_ratebase") * gas_ror
+                + pl.col("gas_opex_costs")
+                + pl.col("gas_depreciation_expense")
+                + pl.col("_gas_performance_incentive")
+            ).alias("gas_revenue_requirement"),
+            (
+                pl.col("electric_ratebase") * electric_ror
+                + pl.col("electric_opex_costs")
+                + pl.col("electric_depreciation_expense")
+            ).alias("electric_revenue_requirement"),
+        ],
+        [
+            (pl.col("gas_ratebase") * gas_ror / pl.col("gas_revenue_requirement")).alias("gas_return_on_ratebase_pct"),
+            (pl.col("electric_ratebase") * electric_ror / pl.col("electric_revenue_requirement")).alias(
+                "electric_return_on_ratebase_pct"
             ),
-            return_dtype=pl.Float64,
+        ],
+    ]
+
+
+def compute_bill_costs_variants(
+    df: pl.DataFrame, bill_params: BillStageParams, input_params: InputParams, variant_col: str = "variant_id"
+) -> pl.DataFrame:
+    """Compute the results of one pre-bill output under every parameter set of `bill_params` in a single pass.
+
+    Equivalent to `run_model` with each variant's parameters substituted into `input_params` (except that
+    parameters are always floats, so user counts and fixed charges come out as float columns), but the pre-bill
+    output (e.g. from `run_model_pre_bill`) is reused, so the capex ledgers are never rerun. Each variant's usage,
+    volumetric costs and revenue requirements are recomputed from its parameters before its bills, so hundreds of
+    variants cost one query.
+
+    Args:
+        df: Pre-bill output of a single scenario, run with `input_params`
+        bill_params: Bill-stage parameter sets to evaluate
+        input_params: Input parameters the pre-bill output was run with, for the rates of return and generation
+            costs
+        variant_col: Name of the column identifying each row's variant (its position in `bill_params`)
+
+    Returns:
+        DataFrame with one row per variant and row of `df`: the variant column, the variant's bill-stage parameters,
+        the columns of `df` (recomputed for the variant) and the bill cost columns
+    """
+    start_year = df.select(pl.col("year")).min().item()
+    years = df["year"].to_numpy()
+    generation_costs = df.with_columns(
+        pl.Series("_gas_generation_cost", _per_year(input_params.gas.gas_generation_cost_per_therm, years)),
+        pl.Series(
+            "_electric_generation_cost", _per_year(input_params.electric.electricity_generation_cost_per_kwh, years)
+        ),
+    )
+    variants = bill_params.to_df().with_row_index(variant_col).with_columns(pl.col(variant_col).cast(pl.Int64))
+    lf = variants.lazy().join(generation_costs.lazy(), how="cross")
+    params = {name: pl.col(name) for name in variants.columns if name != variant_col}
+    for stage in [*_usage_cost_stages(params, input_params), *_bill_cost_stages(pl.lit(start_year), params)]:
+        lf = lf.with_columns(stage)
+    return lf.drop("_gas_generation_cost", "_electric_generation_cost", "_gas_performance_incentive").collect()
+
+
+# pre-bill output columns built from each utility's capex ledger, directly or through its intermediate columns
+_PRE_BILL_COLUMNS = {
+    "gas": [
+        "gas_ratebase",
+        "gas_depreciation_expense",
+        "gas_maintenance_costs",
+        "gas_num_users",
+        "total_gas_usage_therms",
+        "gas_costs_volumetric",
+        "gas_costs_fixed",
+        "gas_opex_costs",
+        "gas_revenue_requirement",
+        "gas_return_on_ratebase_pct",
+    ],
+    "electric": [
+        "electric_ratebase",
+        "electric_depreciation_expense",
+        "electric_maintenance_costs",
+        "electric_num_users",
+        "total_converts_cumul",
+        "electric_added_usage_kwh",
+        "total_electric_usage_kwh",
+        "electric_costs_volumetric",
+        "electric_costs_fixed",
+        "electric_opex_costs",
+        "electric_revenue_requirement",
+        "electric_return_on_ratebase_pct",
+    ],
+}
+
+
+def _required_utilities(columns: list[str]) -> list[Literal["gas", "electric"]]:
+    """The utilities whose capex ledgers the output `columns` depend on.
+
+    Raises:
+        ValueError: If a column isn't one the model outputs
+    """
+    placeholders = {f.name: pl.lit(0.0) for f in fields(BillStageParams)}
+    stages = _bill_cost_stages(pl.lit(0), placeholders)
+    bill_columns = {expr.meta.output_name() for stage in stages for expr in stage}
+    known = {"year", *bill_columns, *(name for names in _PRE_BILL_COLUMNS.values() for name in names)}
+    unknown = [name for name in columns if name not in known]
+    if unknown:
+        raise ValueError(f"Unknown output columns: {unknown}")
+    _, needed = _prune_bill_stages(stages, columns)
+    utilities: list[Literal["gas", "electric"]] = ["gas", "electric"]
+    return [utility for utility in utilities if needed.intersection(_PRE_BILL_COLUMNS[utility])]
+
+
+def _compute_output_df(
+    context: YearContext,
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    utilities: Optional[list[str]] = None,
+) -> pl.DataFrame:
+    """Build the pre-bill output dataframe, one row per year, from a context holding arrays of yearly values.
+
+    With `utilities`, only the year and those utilities' columns are built.
+    """
+    if utilities is not None:
+        intermediate_cols = {"gas": compute_intermediate_cols_gas, "electric": compute_intermediate_cols_electric}
+        frames = [pl.DataFrame({"year": context.year})]
+        for utility in utilities:
+            frames.append(
+                pl.DataFrame({
+                    f"{utility}_ratebase": getattr(context, f"{utility}_ratebase"),
+                    f"{utility}_depreciation_expense": getattr(context, f"{utility}_depreciation_expense"),
+                    f"{utility}_maintenance_costs": getattr(context, f"{utility}_maintenance_cost"),
+                })
+            )
+            frames.append(intermediate_cols[utility](context, input_params, ts_params).drop("year"))
+        return pl.concat(frames, how="horizontal")
+    return pl.concat(
+        [
+            pl.DataFrame({
+                "year": context.year,
+                "gas_ratebase": context.gas_ratebase,
+                "electric_ratebase": context.electric_ratebase,
+                "gas_depreciation_expense": context.gas_depreciation_expense,
+                "electric_depreciation_expense": context.electric_depreciation_expense,
+                "gas_maintenance_costs": context.gas_maintenance_cost,
+                "electric_maintenance_costs": context.electric_maintenance_cost,
+            }),
+            compute_intermediate_cols_gas(context, input_params, ts_params).drop("year"),
+            compute_intermediate_cols_electric(context, input_params, ts_params).drop("year"),
+        ],
+        how="horizontal",
+    )
+
+
+@define
+class UtilityTrajectory:
+    """Ratebase, depreciation expense and maintenance cost of one utility's capex ledger in every year of a run."""
+
+    ratebase: np.ndarray
+    depreciation_expense: np.ndarray
+    maintenance_cost: np.ndarray
+
+
+def _npa_capex_utility(scenario_params: ScenarioParams) -> Optional[str]:
+    """The utility whose ledger takes the npa capex, if npas are funded as capex."""
+    return scenario_params.gas_electric if scenario_params.capex_opex == "capex" else None
+
+
+def _utility_fingerprint(utility: Literal["gas", "electric"], scenario_params: ScenarioParams) -> tuple:
+    """Everything about a scenario that a utility's capex ledger depends on.
+
+    Scenarios with the same fingerprint have the same trajectory for `utility`, given the same input and time series
+    parameters. NPA opex and the performance incentive don't enter the capex ledgers.
+    """
+    return (
+        utility,
+        scenario_params.start_year,
+        scenario_params.end_year,
+        scenario_params.bau,
+        _npa_capex_utility(scenario_params) == utility,
+    )
+
+
+def _initial_ledger(
+    utility: Literal["gas", "electric"], start_year: int, input_params: InputParams, merge_cohorts: bool = False
+) -> cp.CapexLedger:
+    """Capex ledger holding a utility's synthetic initial projects, keeping running totals from `start_year`."""
+    utility_params = input_params.gas if utility == "gas" else input_params.electric
+    # With merge_cohorts, vintages are merged into cohorts and `_close_year` prunes retired rows every year, so the
+    # ledger stays bounded by the depreciation lifetimes however long the horizon is.
+    ledger = cp.CapexLedger(totals=cp.CapexAccumulator(year=start_year), merge_cohorts=merge_cohorts)
+    # synthetic initial capex projects, held as one closed-form block
+    if utility_params.ratebase_init > 0:
+        ledger.add_synthetic_block(
+            cp.SyntheticBlock.from_initial_ratebase(
+                start_year=input_params.shared.start_year,
+                initial_ratebase=utility_params.ratebase_init,
+                depreciation_lifetime=utility_params.default_depreciation_lifetime,
+            )
         )
-        .alias("electric_inflation_adjusted_revenue_requirement"),
-        (pl.col("gas_revenue_requirement") + pl.col("electric_revenue_requirement")).alias("total_revenue_requirement"),
-    ])
-
-    # Create inflation-adjusted ratebase columns
-    df = df.with_columns([
-        pl.struct(["gas_ratebase", "year"])
-        .map_elements(
-            lambda x: inflation_adjust_revenue_requirement(
-                x["gas_ratebase"], x["year"], start_year, input_params.shared.real_dollar_discount_rate
-            ),
-            return_dtype=pl.Float64,
+    return ledger
+
+
+def _add_yearly_capex(
+    utility: Literal["gas", "electric"],
+    ledger: cp.CapexLedger,
+    year: int,
+    current_ratebase: float,
+    npa_capex: bool,
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+) -> None:
+    """Add a utility's capex vintages for `year`, including the npa capex if `npa_capex`."""
+    if utility == "gas":
+        ledger.extend(
+            cp.get_non_lpp_gas_capex_projects(
+                year=year,
+                current_ratebase=current_ratebase,
+                baseline_non_lpp_gas_ratebase_growth=input_params.gas.baseline_non_lpp_ratebase_growth,
+                depreciation_lifetime=input_params.gas.non_lpp_depreciation_lifetime,
+                construction_inflation_rate=input_params.shared.construction_inflation_rate,
+            )
         )
-        .alias("gas_inflation_adjusted_ratebase"),
-        pl.struct(["electric_ratebase", "year"])
-        .map_elements(
-            lambda x: inflation_adjust_revenue_requirement(
-                x["electric_ratebase"], x["year"], start_year, input_params.shared.real_dollar_discount_rate
-            ),
-            return_dtype=pl.Float64,
+        ledger.extend(
+            cp.get_lpp_gas_capex_projects(
+                year=year,
+                gas_bau_lpp_costs_per_year=ts_params.gas_bau_lpp_costs_per_year,
+                npa_projects=ts_params.npa_summary,
+                depreciation_lifetime=input_params.gas.pipeline_depreciation_lifetime,
+            )
         )
-        .alias("electric_inflation_adjusted_ratebase"),
-    ])
-
-    # Create gas and electric tariffs columns (and total inflation adjusted revenue requirement)
-    df = df.with_columns([
-        (
-            pl.col("gas_inflation_adjusted_revenue_requirement")
-            + pl.col("electric_inflation_adjusted_revenue_requirement")
-        ).alias("total_inflation_adjusted_revenue_requirement"),
-        pl.struct(["gas_inflation_adjusted_revenue_requirement", "total_gas_usage_therms"])
-        .map_elements(
-            lambda x: calculate_gas_variable_tariff_per_therm(
-                x["gas_inflation_adjusted_revenue_requirement"],
-                x["total_gas_usage_therms"],
-                input_params.gas.user_bill_fixed_charge,
-                input_params.gas.num_users_init,
-            ),
-            return_dtype=pl.Float64,
+    else:
+        ledger.extend(
+            cp.get_non_npa_electric_capex_projects(
+                year=year,
+                current_ratebase=current_ratebase,
+                baseline_electric_ratebase_growth=input_params.electric.baseline_non_npa_ratebase_growth,
+                depreciation_lifetime=input_params.electric.default_depreciation_lifetime,
+                construction_inflation_rate=input_params.shared.construction_inflation_rate,
+            )
         )
-        .alias("gas_variable_tariff_per_therm"),
-        pl.struct(["electric_inflation_adjusted_revenue_requirement", "total_electric_usage_kwh"])
-        .map_elements(
-            lambda x: calculate_electric_variable_tariff_per_kwh(
-                x["electric_inflation_adjusted_revenue_requirement"],
-                x["total_electric_usage_kwh"],
-                input_params.electric.user_bill_fixed_charge,
-                input_params.electric.num_users_init,
-            ),
-            return_dtype=pl.Float64,
+        ledger.extend(
+            cp.get_grid_upgrade_capex_projects(
+                year=year,
+                npa_projects=ts_params.npa_summary,
+                peak_hp_kw=input_params.electric.hp_peak_kw,
+                peak_aircon_kw=input_params.electric.aircon_peak_kw,
+                distribution_cost_per_peak_kw_increase=input_params.electric.distribution_cost_per_peak_kw_increase(
+                    year
+                ),
+                grid_upgrade_depreciation_lifetime=input_params.electric.grid_upgrade_depreciation_lifetime,
+            )
         )
-        .alias("electric_variable_tariff_per_kwh"),
-        pl.lit(
-            calculate_electric_fixed_charge_per_user(
-                input_params.electric.user_bill_fixed_charge,
+    if npa_capex:
+        ledger.extend(
+            cp.get_npa_capex_projects(
+                year,
+                ts_params.npa_summary,
+                input_params.shared.npa_install_costs(year),
+                int(input_params.shared.npa_lifetime),
             )
-        ).alias("electric_fixed_charge_per_user"),
-        pl.lit(
-            calculate_gas_fixed_charge_per_user(
-                input_params.gas.user_bill_fixed_charge,
+        )
+
+
+def _close_year(
+    utility: Literal["gas", "electric"], ledger: cp.CapexLedger, year: int, input_params: InputParams
+) -> tuple[float, float, float]:
+    """Advance a ledger's running totals to `year`; return its ratebase, depreciation expense and maintenance cost."""
+    totals = ledger.totals
+    if totals is None:
+        raise ValueError("Capex ledgers stepped year by year must keep running totals")
+    totals.advance_to(year)
+    if ledger.merge_cohorts:
+        ledger.prune_retired(year)
+    maintenance_cost_pct = (
+        input_params.gas.pipeline_maintenance_cost_pct
+        if utility == "gas"
+        else input_params.electric.electric_maintenance_cost_pct
+    )
+    return totals.ratebase, totals.depreciation_expense, totals.maintenance_costs(maintenance_cost_pct)
+
+
+def _fund_npas_this_year(
+    year: int,
+    scenario_params: ScenarioParams,
+    gas_npa_savings: pl.DataFrame,
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+) -> tuple[float, float, pl.DataFrame]:
+    """Gas and electric npa opex for `year`, and the NPV savings ledger with `year`'s savings added.
+
+    NPA opex is only incurred in years whose scenario funds npas as opex, and NPV savings only accrue in years with a
+    performance incentive.
+    """
+    gas_npa_opex = 0.0
+    electric_npa_opex = 0.0
+    if scenario_params.capex_opex == "opex":
+        if scenario_params.gas_electric == "gas":
+            gas_npa_opex = npa.compute_npa_install_costs_from_df(
+                year, ts_params.npa_summary, input_params.shared.npa_install_costs(year)
+            )
+        elif scenario_params.gas_electric == "electric":
+            electric_npa_opex = npa.compute_npa_install_costs_from_df(
+                year, ts_params.npa_summary, input_params.shared.npa_install_costs(year)
             )
-        ).alias("gas_fixed_charge_per_user"),
-    ])
-
-    # Create per-user gas bill columns and total inflation adjusted revenue requirement
-    df = df.with_columns([
-        pl.struct(["gas_inflation_adjusted_revenue_requirement", "gas_num_users"])
-        .map_elements(
-            lambda x: calculate_avg_bill_per_user(x["gas_inflation_adjusted_revenue_requirement"], x["gas_num_users"]),
-            return_dtype=pl.Float64,
+    # calculate performance incentive
+    if scenario_params.performance_incentive:
+        gas_npa_savings = pl.concat(
+            [
+                gas_npa_savings,
+                cp.compute_npv_savings_from_npa_projects(
+                    year,
+                    ts_params.npa_summary,
+                    input_params.shared.npa_install_costs(year),
+                    input_params.shared.npa_lifetime,
+                    input_params.gas.pipeline_depreciation_lifetime,
+                    input_params.gas.ror,
+                    input_params.shared.npv_discount_rate,
+                    input_params.shared.performance_incentive_pct,
+                    input_params.shared.incentive_payback_period,
+                ),
+            ],
+            how="vertical",
         )
-        .alias("gas_avg_bill_per_user"),
-        pl.struct(["gas_fixed_charge_per_user", "gas_variable_tariff_per_therm"])
-        .map_elements(
-            lambda x: calculate_nonconverts_gas_bill_per_user(
-                x["gas_fixed_charge_per_user"],
-                x["gas_variable_tariff_per_therm"],
-                input_params.gas.per_user_heating_need_therms,
+    return gas_npa_opex, electric_npa_opex, gas_npa_savings
+
+
+def _utility_trajectory_loop(
+    utility: Literal["gas", "electric"],
+    scenario_params: ScenarioParams,
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+) -> UtilityTrajectory:
+    """A utility's trajectory, stepping its ledger through the years as `ModelState.step` does."""
+    num_years = max(scenario_params.end_year - scenario_params.start_year, 0)
+    trajectory = UtilityTrajectory(np.zeros(num_years), np.zeros(num_years), np.zeros(num_years))
+    ledger = _initial_ledger(utility, scenario_params.start_year, input_params)
+    ratebase = (input_params.gas if utility == "gas" else input_params.electric).ratebase_init
+    npa_capex = _npa_capex_utility(scenario_params) == utility
+    for i, year in enumerate(range(scenario_params.start_year, scenario_params.end_year)):
+        with profiling.stage("capex_generation"):
+            _add_yearly_capex(utility, ledger, year, ratebase, npa_capex, input_params, ts_params)
+        with profiling.stage("ratebase"):
+            ratebase, depreciation_expense, maintenance_cost = _close_year(utility, ledger, year, input_params)
+        trajectory.ratebase[i] = ratebase
+        trajectory.depreciation_expense[i] = depreciation_expense
+        trajectory.maintenance_cost[i] = maintenance_cost
+    return trajectory
+
+
+def _utility_trajectory_vectorized(
+    utility: Literal["gas", "electric"],
+    scenario_params: ScenarioParams,
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+) -> UtilityTrajectory:
+    """Whole-horizon equivalent of `_utility_trajectory_loop`.
+
+    Every exogenous capex vintage (synthetic initial, pipeline, grid upgrade and npa projects) is known up front, so
+    they are all added to the ledger at once. The misc capex, which feeds back on the ratebase, is solved for the
+    full horizon with `cp.solve_misc_capex_costs`, and the ledger schedules then give the ratebase, depreciation and
+    maintenance of every year in array operations.
+    """
+    years = np.arange(scenario_params.start_year, scenario_params.end_year, dtype=np.int64)
+    summary = ts_params.npa_summary
+    shared = input_params.shared
+    utility_params = input_params.gas if utility == "gas" else input_params.electric
+
+    with profiling.stage("capex_generation"):
+        ledger = cp.CapexLedger(capacity=max(3 * len(years), 1))
+        if utility_params.ratebase_init > 0:
+            ledger.add_synthetic_block(
+                cp.SyntheticBlock.from_initial_ratebase(
+                    shared.start_year, utility_params.ratebase_init, utility_params.default_depreciation_lifetime
+                )
+            )
+
+        if utility == "gas":
+            # leak prone pipe replacement net of the pipe costs avoided by npas
+            pipeline_costs = np.maximum(
+                0,
+                _costs_by_year(ts_params.gas_bau_lpp_costs_per_year, years) - summary.pipe_cost_avoided_by_year(years),
+            )
+            ledger.extend_arrays(
+                years[pipeline_costs > 0],
+                "pipeline",
+                pipeline_costs[pipeline_costs > 0],
+                input_params.gas.pipeline_depreciation_lifetime,
+            )
+            misc_growth = input_params.gas.baseline_non_lpp_ratebase_growth
+            misc_lifetime = input_params.gas.non_lpp_depreciation_lifetime
+        else:
+            # grid upgrades for the peak load added by npas
+            grid_upgrade_costs = summary.peak_kw_increase_by_year(
+                years, input_params.electric.hp_peak_kw, input_params.electric.aircon_peak_kw
+            ) * _per_year(input_params.electric.distribution_cost_per_peak_kw_increase, years)
+            ledger.extend_arrays(
+                years[grid_upgrade_costs > 0],
+                "grid_upgrade",
+                grid_upgrade_costs[grid_upgrade_costs > 0],
+                input_params.electric.grid_upgrade_depreciation_lifetime,
+            )
+            misc_growth = input_params.electric.baseline_non_npa_ratebase_growth
+            misc_lifetime = input_params.electric.default_depreciation_lifetime
+
+        if _npa_capex_utility(scenario_params) == utility:
+            npa_install_costs = _npa_install_costs_by_year(years, input_params, ts_params)
+            ledger.extend_arrays(
+                years[npa_install_costs > 0], "npa", npa_install_costs[npa_install_costs > 0], int(shared.npa_lifetime)
+            )
+
+    with profiling.stage("misc_capex_solve"):
+        # misc capex feeds back on the ratebase, so it is solved for last
+        ledger.extend_arrays(
+            years,
+            "misc",
+            cp.solve_misc_capex_costs(
+                years,
+                ledger.schedules(years)[0],
+                utility_params.ratebase_init,
+                misc_growth,
+                misc_lifetime,
+                shared.construction_inflation_rate,
             ),
-            return_dtype=pl.Float64,
+            misc_lifetime,
         )
-        .alias("gas_nonconverts_bill_per_user"),
-        pl.lit(0.0).alias("gas_converts_bill_per_user"),
-    ])
-
-    # Create converts and nonconverts electric bills
-    df = df.with_columns([
-        pl.struct(["electric_inflation_adjusted_revenue_requirement", "electric_num_users"])
-        .map_elements(
-            lambda x: calculate_avg_bill_per_user(
-                x["electric_inflation_adjusted_revenue_requirement"], x["electric_num_users"]
-            ),
-            return_dtype=pl.Float64,
+
+    with profiling.stage("ratebase"):
+        ratebase, depreciation_expense, maintenance_base = ledger.schedules(years)
+    maintenance_cost_pct = (
+        input_params.gas.pipeline_maintenance_cost_pct
+        if utility == "gas"
+        else input_params.electric.electric_maintenance_cost_pct
+    )
+    return UtilityTrajectory(ratebase, depreciation_expense, maintenance_base * maintenance_cost_pct)
+
+
+def _utility_trajectory(
+    utility: Literal["gas", "electric"],
+    scenario_params: ScenarioParams,
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    engine: Literal["loop", "vectorized"],
+) -> UtilityTrajectory:
+    if engine == "vectorized":
+        return _utility_trajectory_vectorized(utility, scenario_params, input_params, ts_params)
+    return _utility_trajectory_loop(utility, scenario_params, input_params, ts_params)
+
+
+def _npa_install_costs_by_year(years: np.ndarray, input_params: InputParams, ts_params: TimeSeriesParams) -> np.ndarray:
+    npa_converts = ts_params.npa_summary.hp_converts_by_year(years, cumulative=False, npa_only=True)
+    install_costs: np.ndarray = _per_year(input_params.shared.npa_install_costs, years) * npa_converts
+    return install_costs
+
+
+def _npa_funding_loop(
+    scenario_params: ScenarioParams, input_params: InputParams, ts_params: TimeSeriesParams
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Gas npa opex, electric npa opex and gas performance incentive in every year, year by year."""
+    num_years = max(scenario_params.end_year - scenario_params.start_year, 0)
+    gas_npa_opex, electric_npa_opex, gas_performance_incentive = np.zeros((3, num_years))
+    gas_npa_savings = cp.return_empty_npv_savings_df()
+    for i, year in enumerate(range(scenario_params.start_year, scenario_params.end_year)):
+        gas_npa_opex[i], electric_npa_opex[i], gas_npa_savings = _fund_npas_this_year(
+            year, scenario_params, gas_npa_savings, input_params, ts_params
         )
-        .alias("electric_avg_bill_per_user"),
-        pl.struct(["electric_fixed_charge_per_user", "electric_variable_tariff_per_kwh"])
-        .map_elements(
-            lambda x: calculate_converts_electric_bill_per_user(
-                x["electric_fixed_charge_per_user"],
-                x["electric_variable_tariff_per_kwh"],
-                input_params.electric.per_user_electric_need_kwh,
-                input_params.gas.per_user_heating_need_therms,
-                input_params.gas.per_user_water_heating_need_therms,
-                input_params.electric.hp_efficiency,
-                input_params.electric.water_heater_efficiency,
-            ),
-            return_dtype=pl.Float64,
+        gas_performance_incentive[i] = cp.compute_performance_incentive_this_year(year, gas_npa_savings)
+    return gas_npa_opex, electric_npa_opex, gas_performance_incentive
+
+
+def _npa_funding_vectorized(
+    scenario_params: ScenarioParams, input_params: InputParams, ts_params: TimeSeriesParams
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Whole-horizon equivalent of `_npa_funding_loop`."""
+    years = np.arange(scenario_params.start_year, scenario_params.end_year, dtype=np.int64)
+    shared = input_params.shared
+    npa_install_costs = _npa_install_costs_by_year(years, input_params, ts_params)
+
+    gas_npa_opex = np.zeros(len(years))
+    electric_npa_opex = np.zeros(len(years))
+    if scenario_params.capex_opex == "opex":
+        if scenario_params.gas_electric == "gas":
+            gas_npa_opex = npa_install_costs
+        elif scenario_params.gas_electric == "electric":
+            electric_npa_opex = npa_install_costs
+
+    # performance incentive: npv savings paid out evenly over the payback period, see compute_npv_savings_from_npa_projects
+    gas_performance_incentive = np.zeros(len(years))
+    if scenario_params.performance_incentive:
+        # the npv of a capex investment is linear in its cost
+        npv_per_dollar_avoided = cp.compute_npv_of_capex_investment(
+            1.0, input_params.gas.pipeline_depreciation_lifetime, input_params.gas.ror, shared.npv_discount_rate, 0
         )
-        .alias("electric_converts_bill_per_user"),
-        pl.struct(["electric_fixed_charge_per_user", "electric_variable_tariff_per_kwh"])
-        .map_elements(
-            lambda x: calculate_nonconverts_electric_bill_per_user(
-                x["electric_fixed_charge_per_user"],
-                x["electric_variable_tariff_per_kwh"],
-                input_params.electric.per_user_electric_need_kwh,
-            ),
-            return_dtype=pl.Float64,
+        savings = (
+            ts_params.npa_summary.pipe_cost_avoided_by_year(years) * npv_per_dollar_avoided - npa_install_costs
+        ) * shared.performance_incentive_pct
+        savings = np.where(savings > 0, savings, 0.0)
+        age = years[None, :] - years[:, None]
+        paying = (age >= 0) & (age < shared.incentive_payback_period)
+        gas_performance_incentive = (savings / shared.incentive_payback_period) @ paying
+    return gas_npa_opex, electric_npa_opex, gas_performance_incentive
+
+
+def _run_from_trajectories(
+    scenario_params: ScenarioParams,
+    gas: Optional[UtilityTrajectory],
+    electric: Optional[UtilityTrajectory],
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    engine: Literal["loop", "vectorized"],
+    bills: bool = True,
+    columns: Optional[list[str]] = None,
+) -> pl.DataFrame:
+    """Model results of a scenario given the trajectories of both utilities' capex ledgers.
+
+    With `bills` False, the output stops before the bill stage. With `columns`, only year and those columns are
+    returned, and a utility's trajectory may be None if none of `columns` depend on it.
+    """
+    years = np.arange(scenario_params.start_year, scenario_params.end_year, dtype=np.int64)
+    # a utility no requested column depends on never reaches the output, so NaN stands in for its ledger
+    unused = UtilityTrajectory(*(np.full(len(years), np.nan) for _ in range(3)))
+    trajectories = {"gas": gas, "electric": electric}
+    utilities = None if columns is None else [name for name, t in trajectories.items() if t is not None]
+    gas = unused if gas is None else gas
+    electric = unused if electric is None else electric
+    with profiling.stage("npa_funding"):
+        npa_funding = _npa_funding_vectorized if engine == "vectorized" else _npa_funding_loop
+        gas_npa_opex, electric_npa_opex, gas_performance_incentive = npa_funding(
+            scenario_params, input_params, ts_params
         )
-        .alias("electric_nonconverts_bill_per_user"),
-    ])
-
-    # Create total bill calculations for converts and nonconverts
-    df = df.with_columns([
-        pl.struct(["gas_converts_bill_per_user", "electric_converts_bill_per_user"])
-        .map_elements(
-            lambda x: calculate_converts_total_bill_per_user(
-                x["gas_converts_bill_per_user"], x["electric_converts_bill_per_user"]
+    context = YearContext(
+        year=years,
+        gas_ratebase=gas.ratebase,
+        electric_ratebase=electric.ratebase,
+        gas_depreciation_expense=gas.depreciation_expense,
+        electric_depreciation_expense=electric.depreciation_expense,
+        gas_maintenance_cost=gas.maintenance_cost,
+        electric_maintenance_cost=electric.maintenance_cost,
+        gas_npa_opex=gas_npa_opex,
+        electric_npa_opex=electric_npa_opex,
+        gas_performance_incentive=gas_performance_incentive,
+    )
+    with profiling.stage("intermediate_cols"):
+        output_df = _compute_output_df(context, input_params, ts_params, utilities)
+    if not bills:
+        return output_df
+    with profiling.stage("bill_costs"):
+        return compute_bill_costs(output_df, input_params, columns)
+
+
+@define
+class ModelState:
+    """Everything `run_model` carries from one year to the next.
+
+    `year` is the next year to simulate. `step` advances the state by one year and `results` turns the years
+    simulated so far into the model output, so a run is `initial`, then `step` up to the end year, then `results`.
+    `snapshot` returns an independent copy, which lets several scenarios continue from a shared history (see
+    `run_scenario_tree`).
+    """
+
+    year: int
+    gas_ratebase: float
+    electric_ratebase: float
+    # capex ledgers, each keeping running ratebase/depreciation/maintenance totals
+    gas_capex_projects: cp.CapexLedger
+    electric_capex_projects: cp.CapexLedger
+    gas_npa_savings: pl.DataFrame
+    year_buffer: YearBuffer
+    gas_npa_opex: float = 0.0
+    electric_npa_opex: float = 0.0
+    gas_performance_incentive: float = 0.0
+
+    @classmethod
+    def initial(
+        cls, scenario_params: ScenarioParams, input_params: InputParams, merge_cohorts: bool = False
+    ) -> "ModelState":
+        """State at the start of `scenario_params.start_year`, before any year has been simulated.
+
+        With `merge_cohorts`, the capex ledgers merge their vintages into cohorts and drop retired rows as the years
+        are stepped, keeping their size bounded over long horizons (see `capex_project.CapexLedger`). The running
+        totals, and so the results, are the same either way.
+        """
+        return cls(
+            year=scenario_params.start_year,
+            gas_ratebase=input_params.gas.ratebase_init,
+            electric_ratebase=input_params.electric.ratebase_init,
+            gas_capex_projects=_initial_ledger("gas", scenario_params.start_year, input_params, merge_cohorts),
+            electric_capex_projects=_initial_ledger(
+                "electric", scenario_params.start_year, input_params, merge_cohorts
             ),
-            return_dtype=pl.Float64,
-        )
-        .alias("converts_total_bill_per_user"),
-        pl.struct(["gas_nonconverts_bill_per_user", "electric_nonconverts_bill_per_user"])
-        .map_elements(
-            lambda x: calculate_nonconverts_total_bill_per_user(
-                x["gas_nonconverts_bill_per_user"], x["electric_nonconverts_bill_per_user"]
+            gas_npa_savings=cp.return_empty_npv_savings_df(),
+            # each year's context is written into preallocated arrays and turned into a dataframe once at the end
+            year_buffer=YearBuffer(
+                start_year=scenario_params.start_year,
+                num_years=max(scenario_params.end_year - scenario_params.start_year, 0),
             ),
-            return_dtype=pl.Float64,
         )
-        .alias("nonconverts_total_bill_per_user"),
-    ])
 
-    return df
+    def snapshot(self) -> "ModelState":
+        """Independent copy of the state; stepping either copy leaves the other untouched."""
+        # dataframes are immutable and the floats are values, so only the ledgers and buffer need copying
+        return evolve(
+            self,
+            gas_capex_projects=self.gas_capex_projects.copy(),
+            electric_capex_projects=self.electric_capex_projects.copy(),
+            year_buffer=self.year_buffer.copy(),
+        )
+
+    def step(self, scenario_params: ScenarioParams, input_params: InputParams, ts_params: TimeSeriesParams) -> None:
+        """Simulate `self.year` under `scenario_params` and move on to the next year.
 
+        NPA opex is only incurred in years whose scenario funds NPAs as opex. NPV savings only accrue in years with
+        a performance incentive, but the incentive on savings already accrued is paid out over its payback period.
+        """
+        year = self.year
+        npa_capex_utility = _npa_capex_utility(scenario_params)
 
-def run_model(scenario_params: ScenarioParams, input_params: InputParams, ts_params: TimeSeriesParams) -> pl.DataFrame:
+        with profiling.stage("capex_generation"):
+            _add_yearly_capex(
+                "gas",
+                self.gas_capex_projects,
+                year,
+                self.gas_ratebase,
+                npa_capex_utility == "gas",
+                input_params,
+                ts_params,
+            )
+            _add_yearly_capex(
+                "electric",
+                self.electric_capex_projects,
+                year,
+                self.electric_ratebase,
+                npa_capex_utility == "electric",
+                input_params,
+                ts_params,
+            )
+            self.gas_npa_opex, self.electric_npa_opex, self.gas_npa_savings = _fund_npas_this_year(
+                year, scenario_params, self.gas_npa_savings, input_params, ts_params
+            )
+            self.gas_performance_incentive = cp.compute_performance_incentive_this_year(year, self.gas_npa_savings)
+
+        with profiling.stage("ratebase"):
+            self.gas_ratebase, gas_depreciation_expense, gas_maintenance_cost = _close_year(
+                "gas", self.gas_capex_projects, year, input_params
+            )
+            self.electric_ratebase, electric_depreciation_expense, electric_maintenance_cost = _close_year(
+                "electric", self.electric_capex_projects, year, input_params
+            )
+
+        # Record the context object with all values needed for this year
+        self.year_buffer.write(
+            YearContext(
+                year=year,
+                gas_ratebase=self.gas_ratebase,
+                electric_ratebase=self.electric_ratebase,
+                gas_depreciation_expense=gas_depreciation_expense,
+                electric_depreciation_expense=electric_depreciation_expense,
+                gas_maintenance_cost=gas_maintenance_cost,
+                electric_maintenance_cost=electric_maintenance_cost,
+                gas_npa_opex=self.gas_npa_opex,
+                electric_npa_opex=self.electric_npa_opex,
+                gas_performance_incentive=self.gas_performance_incentive,
+            )
+        )
+        self.year += 1
+
+    def pre_bill_output(self, input_params: InputParams, ts_params: TimeSeriesParams) -> pl.DataFrame:
+        """Model output before the bill stage for every year of the buffer, which should all have been simulated."""
+        # Calculate intermediate columns for both gas and electric for all years at once. These don't feed back
+        # into the ratebase, so they can wait until every year has been stepped through.
+        with profiling.stage("intermediate_cols"):
+            return _compute_output_df(self.year_buffer.context(), input_params, ts_params)
+
+    def results(self, input_params: InputParams, ts_params: TimeSeriesParams) -> pl.DataFrame:
+        """Model output for every year of the buffer, which should all have been simulated."""
+        output_df = self.pre_bill_output(input_params, ts_params)
+        # appends new columns to output_df
+        with profiling.stage("bill_costs"):
+            return compute_bill_costs(output_df, input_params)
+
+
+def _scenario_ts_params(scenario_params: ScenarioParams, ts_params: TimeSeriesParams) -> TimeSeriesParams:
     # in the business-as-usual scenario, we don't have any npa projects. We maintain the scattershot electrification which will still reduce the number of gas customers and total gas usage but will not trigger grid upgrade or capex/opex for either utility.
     if scenario_params.bau:
-        ts_params = evolve(ts_params, npa_projects=npa.return_empty_npa_df())
+        with profiling.stage("npa_summary"):
+            return evolve(ts_params, npa_projects=npa.return_empty_npa_df())
+    return ts_params
 
-    gas_ratebase = input_params.gas.ratebase_init
-    electric_ratebase = input_params.electric.ratebase_init
 
-    # these will be updated depending on the scenario
-    gas_npa_opex = 0.0
-    electric_npa_opex = 0.0
-    gas_performance_incentive = 0.0
+def run_model(
+    scenario_params: ScenarioParams,
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    engine: Literal["loop", "vectorized"] = "loop",
+    columns: Optional[list[str]] = None,
+) -> pl.DataFrame:
+    """Run the model for one scenario.
 
-    output_df = pl.DataFrame()
+    Args:
+        scenario_params: Scenario to run
+        input_params: Input parameters
+        ts_params: Time series parameters
+        engine: "loop" steps through the years one at a time. "vectorized" computes ratebase, depreciation,
+            maintenance and revenue requirements for the whole horizon in array operations, solving the misc capex
+            feedback as a linear system; it matches the loop to floating point tolerance.
+        columns: Output columns to compute, e.g. COMPARE_COLS. Only the columns these depend on are built, and a
+            utility's capex ledger isn't run at all when none of them need it. Defaults to every column.
 
-    # synthetic initial capex projects
-    if gas_ratebase > 0:
-        gas_capex_projects = cp.get_synthetic_initial_capex_projects(
-            start_year=input_params.shared.start_year,
-            initial_ratebase=gas_ratebase,
-            depreciation_lifetime=input_params.gas.default_depreciation_lifetime,
-        )
-    else:
-        gas_capex_projects = cp.return_empty_capex_df()
-    if electric_ratebase > 0:
-        electric_capex_projects = cp.get_synthetic_initial_capex_projects(
-            start_year=input_params.shared.start_year,
-            initial_ratebase=electric_ratebase,
-            depreciation_lifetime=input_params.electric.default_depreciation_lifetime,
+    Returns:
+        DataFrame with one row per year of the scenario, holding year and `columns` if given
+
+    Raises:
+        ValueError: If `columns` names a column the model doesn't output
+    """
+    return _run_model(scenario_params, input_params, ts_params, engine, bills=True, columns=columns)
+
+
+def run_model_pre_bill(
+    scenario_params: ScenarioParams,
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    engine: Literal["loop", "vectorized"] = "loop",
+) -> pl.DataFrame:
+    """Run the model for one scenario up to, but not including, the bill stage.
+
+    The output holds every per-year revenue requirement and usage column `compute_bill_costs` needs, so it can be
+    kept and re-tariffed under other bill-stage parameters with `compute_bill_costs_variants` without rerunning the
+    capex ledgers. `compute_bill_costs(run_model_pre_bill(...), input_params)` equals `run_model(...)`.
+
+    Args:
+        scenario_params: Scenario to run
+        input_params: Input parameters
+        ts_params: Time series parameters
+        engine: See `run_model`
+
+    Returns:
+        DataFrame with one row per year of the scenario
+    """
+    return _run_model(scenario_params, input_params, ts_params, engine, bills=False)
+
+
+def _run_model(
+    scenario_params: ScenarioParams,
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    engine: Literal["loop", "vectorized"],
+    bills: bool,
+    columns: Optional[list[str]] = None,
+) -> pl.DataFrame:
+    if engine not in ("loop", "vectorized"):
+        raise ValueError(f"Unknown engine {engine!r}, expected 'loop' or 'vectorized'")
+    ts_params = _scenario_ts_params(scenario_params, ts_params)
+    if columns is not None:
+        # trajectories of only the utilities the requested columns need
+        utilities = _required_utilities(columns)
+        gas, electric = (
+            _utility_trajectory(utility, scenario_params, input_params, ts_params, engine)
+            if utility in utilities
+            else None
+            for utility in ("gas", "electric")
         )
-    else:
-        electric_capex_projects = cp.return_empty_capex_df()
+        return _run_from_trajectories(scenario_params, gas, electric, input_params, ts_params, engine, columns=columns)
+    if engine == "vectorized":
+        gas = _utility_trajectory_vectorized("gas", scenario_params, input_params, ts_params)
+        electric = _utility_trajectory_vectorized("electric", scenario_params, input_params, ts_params)
+        return _run_from_trajectories(scenario_params, gas, electric, input_params, ts_params, engine, bills)
+
+    with profiling.stage("setup"):
+        state = ModelState.initial(scenario_params, input_params)
+    while state.year < scenario_params.end_year:
+        state.step(scenario_params, input_params, ts_params)
+    if not bills:
+        return state.pre_bill_output(input_params, ts_params)
+    return state.results(input_params, ts_params)
+
+
+def _run_model_deduplicated(
+    scenario_params: ScenarioParams,
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    engine: Literal["loop", "vectorized"],
+    trajectories: dict[tuple, UtilityTrajectory],
+    columns: Optional[list[str]] = None,
+) -> pl.DataFrame:
+    """`run_model`, reusing (and adding to) utility trajectories already computed for other scenarios."""
+    ts_params = _scenario_ts_params(scenario_params, ts_params)
+    utilities: list[Literal["gas", "electric"]] = (
+        ["gas", "electric"] if columns is None else _required_utilities(columns)
+    )
+    scenario_trajectories: dict[str, Optional[UtilityTrajectory]] = {"gas": None, "electric": None}
+    for utility in utilities:
+        fingerprint = _utility_fingerprint(utility, scenario_params)
+        if fingerprint not in trajectories:
+            trajectories[fingerprint] = _utility_trajectory(utility, scenario_params, input_params, ts_params, engine)
+        scenario_trajectories[utility] = trajectories[fingerprint]
+    return _run_from_trajectories(
+        scenario_params,
+        scenario_trajectories["gas"],
+        scenario_trajectories["electric"],
+        input_params,
+        ts_params,
+        engine,
+        columns=columns,
+    )
 
-    gas_npa_savings = cp.return_empty_npv_savings_df()
 
-    for year in range(scenario_params.start_year, scenario_params.end_year):
-        # gas capex
-        gas_capex_projects = pl.concat(
-            [
-                gas_capex_projects,
-                cp.get_non_lpp_gas_capex_projects(
-                    year=year,
-                    current_ratebase=gas_ratebase,
-                    baseline_non_lpp_gas_ratebase_growth=input_params.gas.baseline_non_lpp_ratebase_growth,
-                    depreciation_lifetime=input_params.gas.non_lpp_depreciation_lifetime,
-                    construction_inflation_rate=input_params.shared.construction_inflation_rate,
-                ),
-                cp.get_lpp_gas_capex_projects(
-                    year=year,
-                    gas_bau_lpp_costs_per_year=ts_params.gas_bau_lpp_costs_per_year,
-                    npa_projects=ts_params.npa_projects,
-                    depreciation_lifetime=input_params.gas.pipeline_depreciation_lifetime,
-                ),
-            ],
-            how="vertical",
+def run_allocation_grid(
+    allocation_params: AllocationScenarioParams,
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    engine: Literal["loop", "vectorized"] = "loop",
+) -> pl.DataFrame:
+    """Run the model for a whole batch of fractional npa cost allocations in one pass.
+
+    The capex ledgers are linear in the npa capex they take (the misc capex feedback is a linear recurrence), so each
+    utility's trajectory under any capex share is the trajectory without npa capex plus that share of the difference
+    made by taking all of it. Four trajectories therefore cover every allocation; opex is scaled directly, and the
+    intermediate columns and bills are computed for all allocations in one stacked frame. An allocation putting
+    everything on one option matches `run_model` for the corresponding scenario, and one leaving everything to the
+    taxpayer matches the taxpayer scenario.
+
+    Args:
+        allocation_params: Years, allocation shares and whether the gas utility earns a performance incentive
+        input_params: Input parameters
+        ts_params: Time series parameters
+        engine: Engine used for the four utility trajectories, see `run_model`
+
+    Returns:
+        DataFrame with one row per allocation and year: an `allocation_id` column (the allocation's position in
+        `allocation_params.shares`), the share columns of `AllocationShares.to_df` and the `run_model` output columns
+    """
+    if engine not in ("loop", "vectorized"):
+        raise ValueError(f"Unknown engine {engine!r}, expected 'loop' or 'vectorized'")
+    start_year, end_year = allocation_params.start_year, allocation_params.end_year
+    years = np.arange(start_year, end_year, dtype=np.int64)
+    shares = allocation_params.shares
+    num_allocations, num_years = len(shares), len(years)
+
+    without_npa_capex = ScenarioParams(start_year, end_year, taxpayer=True)
+    trajectories = {}
+    for utility in ("gas", "electric"):
+        base = _utility_trajectory(utility, without_npa_capex, input_params, ts_params, engine)
+        with_npa_capex = _utility_trajectory(
+            utility,
+            ScenarioParams(start_year, end_year, gas_electric=utility, capex_opex="capex"),
+            input_params,
+            ts_params,
+            engine,
+        )
+        capex_share = getattr(shares, f"{utility}_capex")[:, None]
+        trajectories[utility] = UtilityTrajectory(
+            *(
+                (base_values[None, :] + capex_share * (npa_values - base_values)[None, :]).ravel()
+                for base_values, npa_values in (
+                    (base.ratebase, with_npa_capex.ratebase),
+                    (base.depreciation_expense, with_npa_capex.depreciation_expense),
+                    (base.maintenance_cost, with_npa_capex.maintenance_cost),
+                )
+            )
         )
 
-        # electric capex
-        electric_capex_projects = pl.concat(
+    with profiling.stage("npa_funding"):
+        npa_install_costs = _npa_install_costs_by_year(years, input_params, ts_params)
+        # the incentive depends on the npa costs and the pipe costs they avoid, not on who pays for the npas
+        gas_performance_incentive = np.zeros(num_years)
+        if allocation_params.performance_incentive:
+            incentive_params = ScenarioParams(
+                start_year, end_year, performance_incentive=True, gas_electric="gas", capex_opex="opex"
+            )
+            _, _, gas_performance_incentive = _npa_funding_vectorized(incentive_params, input_params, ts_params)
+
+    context = YearContext(
+        year=np.tile(years, num_allocations),
+        gas_ratebase=trajectories["gas"].ratebase,
+        electric_ratebase=trajectories["electric"].ratebase,
+        gas_depreciation_expense=trajectories["gas"].depreciation_expense,
+        electric_depreciation_expense=trajectories["electric"].depreciation_expense,
+        gas_maintenance_cost=trajectories["gas"].maintenance_cost,
+        electric_maintenance_cost=trajectories["electric"].maintenance_cost,
+        gas_npa_opex=(shares.gas_opex[:, None] * npa_install_costs[None, :]).ravel(),
+        electric_npa_opex=(shares.electric_opex[:, None] * npa_install_costs[None, :]).ravel(),
+        gas_performance_incentive=np.tile(gas_performance_incentive, num_allocations),
+    )
+    with profiling.stage("intermediate_cols"):
+        output_df = pl.concat(
             [
-                electric_capex_projects,
-                cp.get_non_npa_electric_capex_projects(
-                    year=year,
-                    current_ratebase=electric_ratebase,
-                    baseline_electric_ratebase_growth=input_params.electric.baseline_non_npa_ratebase_growth,
-                    depreciation_lifetime=input_params.electric.default_depreciation_lifetime,
-                    construction_inflation_rate=input_params.shared.construction_inflation_rate,
-                ),
-                cp.get_grid_upgrade_capex_projects(
-                    year=year,
-                    npa_projects=ts_params.npa_projects,
-                    peak_hp_kw=input_params.electric.hp_peak_kw,
-                    peak_aircon_kw=input_params.electric.aircon_peak_kw,
-                    distribution_cost_per_peak_kw_increase=input_params.electric.distribution_cost_per_peak_kw_increase(
-                        year
-                    ),
-                    grid_upgrade_depreciation_lifetime=input_params.electric.grid_upgrade_depreciation_lifetime,
-                ),
+                pl.DataFrame({"allocation_id": np.repeat(np.arange(num_allocations, dtype=np.int64), num_years)}),
+                shares.to_df().select(pl.all().gather(np.repeat(np.arange(num_allocations), num_years))),
+                _compute_output_df(context, input_params, ts_params),
             ],
-            how="vertical",
+            how="horizontal",
         )
+    with profiling.stage("bill_costs"):
+        return compute_bill_costs_batch(output_df, input_params, scenario_col="allocation_id")
 
-        # update npa capex/opex
-        if scenario_params.capex_opex == "capex":
-            # add npa capex
-            npa_capex = cp.get_npa_capex_projects(
-                year,
-                ts_params.npa_projects,
-                input_params.shared.npa_install_costs(year),
-                int(input_params.shared.npa_lifetime),
-            )
-            if scenario_params.gas_electric == "gas":
-                gas_capex_projects = pl.concat([gas_capex_projects, npa_capex], how="vertical")
-            elif scenario_params.gas_electric == "electric":
-                electric_capex_projects = pl.concat([electric_capex_projects, npa_capex], how="vertical")
-        elif scenario_params.capex_opex == "opex":
-            if scenario_params.gas_electric == "gas":
-                gas_npa_opex = npa.compute_npa_install_costs_from_df(
-                    year, ts_params.npa_projects, input_params.shared.npa_install_costs(year)
-                )
-            elif scenario_params.gas_electric == "electric":
-                electric_npa_opex = npa.compute_npa_install_costs_from_df(
-                    year, ts_params.npa_projects, input_params.shared.npa_install_costs(year)
-                )
-        # calculate performance incentive
-        if scenario_params.performance_incentive:
-            gas_npa_savings = pl.concat(
-                [
-                    gas_npa_savings,
-                    cp.compute_npv_savings_from_npa_projects(
-                        year,
-                        ts_params.npa_projects,
-                        input_params.shared.npa_install_costs(year),
-                        input_params.shared.npa_lifetime,
-                        input_params.gas.pipeline_depreciation_lifetime,
-                        input_params.gas.ror,
-                        input_params.shared.npv_discount_rate,
-                        input_params.shared.performance_incentive_pct,
-                        input_params.shared.incentive_payback_period,
-                    ),
-                ],
-                how="vertical",
+
+@define
+class ScenarioBranch:
+    """A scenario that follows its parent scenario up to `switch_year` and `scenario_params` from then on.
+
+    Args:
+        switch_year: First year simulated under `scenario_params`
+        scenario_params: Scenario from `switch_year` on. Its start and end years and `bau` flag must match the trunk.
+        branches: Further branches off this one, keyed by scenario name, switching in or after `switch_year`
+    """
+
+    switch_year: int
+    scenario_params: ScenarioParams
+    branches: dict[str, "ScenarioBranch"] = field(factory=dict)
+
+
+def _check_branches(
+    branches: dict[str, ScenarioBranch], trunk_params: ScenarioParams, earliest_year: int, seen: set[str]
+) -> None:
+    for name, branch in branches.items():
+        if name in seen:
+            raise ValueError(f"Scenario name {name!r} is used more than once in the tree")
+        seen.add(name)
+        params = branch.scenario_params
+        if (params.start_year, params.end_year, params.bau) != (
+            trunk_params.start_year,
+            trunk_params.end_year,
+            trunk_params.bau,
+        ):
+            raise ValueError(f"Branch {name!r} must have the trunk's start_year, end_year and bau")
+        if not earliest_year <= branch.switch_year <= trunk_params.end_year:
+            raise ValueError(
+                f"Branch {name!r} switches in {branch.switch_year}, expected {earliest_year} to {trunk_params.end_year}"
             )
-            gas_performance_incentive = cp.compute_performance_incentive_this_year(year, gas_npa_savings)
+        _check_branches(branch.branches, trunk_params, branch.switch_year, seen)
 
-        # calculate ratebase
-        gas_ratebase = cp.compute_ratebase_from_capex_projects(year, gas_capex_projects)
-        electric_ratebase = cp.compute_ratebase_from_capex_projects(year, electric_capex_projects)
 
-        # calculate depreciation expense
-        gas_depreciation_expense = cp.compute_depreciation_expense_from_capex_projects(year, gas_capex_projects)
-        electric_depreciation_expense = cp.compute_depreciation_expense_from_capex_projects(
-            year, electric_capex_projects
+def _run_branch(
+    name: str,
+    state: ModelState,
+    scenario_params: ScenarioParams,
+    branches: dict[str, ScenarioBranch],
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    results_dfs: dict[str, pl.DataFrame],
+) -> None:
+    """Step `state` to the end year, forking a snapshot for each branch as its switch year comes up."""
+    results_dfs[name] = pl.DataFrame()  # placeholder so the results keep the tree's order
+    for branch_name, branch in sorted(branches.items(), key=lambda item: item[1].switch_year):
+        with profiling.scenario(name):
+            while state.year < branch.switch_year:
+                state.step(scenario_params, input_params, ts_params)
+        _run_branch(
+            branch_name,
+            state.snapshot(),
+            branch.scenario_params,
+            branch.branches,
+            input_params,
+            ts_params,
+            results_dfs,
         )
+    with profiling.scenario(name):
+        while state.year < scenario_params.end_year:
+            state.step(scenario_params, input_params, ts_params)
+        results_dfs[name] = state.results(input_params, ts_params)
 
-        # calculate maintanence costs
-        gas_maintanence_costs = cp.compute_maintanence_costs(
-            year, gas_capex_projects, input_params.gas.pipeline_maintenance_cost_pct
-        )
-        electric_maintanence_costs = cp.compute_maintanence_costs(
-            year, electric_capex_projects, input_params.electric.electric_maintenance_cost_pct
-        )
 
-        # Create context object with all values needed for this year
-        context = YearContext(
-            year=year,
-            gas_ratebase=gas_ratebase,
-            electric_ratebase=electric_ratebase,
-            gas_depreciation_expense=gas_depreciation_expense,
-            electric_depreciation_expense=electric_depreciation_expense,
-            gas_maintenance_cost=gas_maintanence_costs,
-            electric_maintenance_cost=electric_maintanence_costs,
-            gas_npa_opex=gas_npa_opex,
-            electric_npa_opex=electric_npa_opex,
-            gas_performance_incentive=gas_performance_incentive,
+def run_scenario_tree(
+    trunk_params: ScenarioParams,
+    branches: dict[str, ScenarioBranch],
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    trunk_name: str = "trunk",
+) -> dict[str, pl.DataFrame]:
+    """Run scenarios that share their early years, simulating each shared prefix only once.
+
+    Each branch continues from a snapshot of its parent's state at the start of its switch year, so the trunk is
+    simulated once and each branch only from its switch year on. Every result covers the full horizon and matches
+    `run_model` for a scenario following the same policies year by year. For example, NPAs funded as gas opex until
+    2035 and as electric capex afterwards:
+
+        run_scenario_tree(
+            gas_opex,
+            {"electric_capex_from_2035": ScenarioBranch(2035, electric_capex)},
+            input_params,
+            ts_params,
         )
 
-        # Calculate intermediate columns for both gas and electric
-        intermediate_df_gas = compute_intermediate_cols_gas(context, input_params, ts_params)
-        intermediate_df_electric = compute_intermediate_cols_electric(context, input_params, ts_params)
+    Args:
+        trunk_params: Scenario of the trunk
+        branches: Branches off the trunk, keyed by scenario name
+        input_params: Input parameters shared by all scenarios
+        ts_params: Time series parameters shared by all scenarios
+        trunk_name: Scenario name of the trunk in the results
 
-        # Build output row for this year with all intermediate calculations
-        year_output = pl.DataFrame({
-            "year": [year],
-            "gas_ratebase": [gas_ratebase],
-            "electric_ratebase": [electric_ratebase],
-            "gas_depreciation_expense": [gas_depreciation_expense],
-            "electric_depreciation_expense": [electric_depreciation_expense],
-            "gas_maintenance_costs": [gas_maintanence_costs],
-            "electric_maintenance_costs": [electric_maintanence_costs],
-        })
+    Returns:
+        Dictionary mapping the trunk and every branch, at any depth, to its model results
+    """
+    _check_branches(branches, trunk_params, trunk_params.start_year, {trunk_name})
+    ts_params = _scenario_ts_params(trunk_params, ts_params)
+    results_dfs: dict[str, pl.DataFrame] = {}
+    _run_branch(
+        trunk_name,
+        ModelState.initial(trunk_params, input_params),
+        trunk_params,
+        branches,
+        input_params,
+        ts_params,
+        results_dfs,
+    )
+    return results_dfs
 
-        # Join with intermediate calculations
-        year_output = year_output.join(intermediate_df_gas, on="year", how="left")
-        year_output = year_output.join(intermediate_df_electric, on="year", how="left")
 
-        output_df = pl.concat([output_df, year_output], how="vertical")
+def create_delta_df(results_dfs: dict[str, pl.DataFrame], compare_cols_all: list[str]) -> pl.DataFrame:
+    return pl.concat(list(iter_delta_dfs(results_dfs, compare_cols_all)), how="vertical")
 
-    # appends new columns to output_df
-    results_df = compute_bill_costs(output_df, input_params)
 
-    return results_df
+def iter_delta_dfs(
+    results: Union[dict[str, pl.DataFrame], Iterable[tuple[str, pl.DataFrame]]],
+    compare_cols_all: list[str],
+    bau_df: Optional[pl.DataFrame] = None,
+) -> Iterator[pl.DataFrame]:
+    """Streaming `create_delta_df`: yield each non-BAU scenario's deltas as its results arrive.
 
+    Args:
+        results: Results keyed by scenario name, or an iterable of (scenario name, results) pairs such as
+            `iter_all_scenarios`
+        compare_cols_all: Columns to compare
+        bau_df: BAU results to compare against. Defaults to the "bau" scenario of `results`; scenarios arriving
+            before it are held back until it does.
 
-def create_delta_df(results_dfs: dict[str, pl.DataFrame], compare_cols_all: list[str]) -> pl.DataFrame:
-    bau_df = results_dfs["bau"].select(["year"] + compare_cols_all)
+    Yields:
+        One frame per scenario, in the layout of `create_delta_df`, whose concatenation equals `create_delta_df`
 
+    Raises:
+        ValueError: If no `bau_df` is given and `results` has no "bau" scenario
+    """
+    items = results.items() if isinstance(results, dict) else results
+    pinned = None if bau_df is None else bau_df.select(["year"] + compare_cols_all)
+    waiting: list[tuple[str, pl.DataFrame]] = []
+    for scenario_name, scenario_df in items:
+        if scenario_name == "bau":
+            if bau_df is None:
+                pinned = scenario_df.select(["year"] + compare_cols_all)
+                for waiting_name, waiting_df in waiting:
+                    yield _scenario_delta_df(waiting_name, waiting_df, pinned, compare_cols_all)
+                waiting = []
+            continue
+        if pinned is None:
+            waiting.append((scenario_name, scenario_df))
+        else:
+            yield _scenario_delta_df(scenario_name, scenario_df, pinned, compare_cols_all)
+    if pinned is None:
+        raise ValueError("No bau scenario to compare against; pass bau_df or include a 'bau' scenario")
+
+
+def _scenario_delta_df(
+    scenario_id: str, scenario_df: pl.DataFrame, bau_df: pl.DataFrame, compare_cols_all: list[str]
+) -> pl.DataFrame:
+    """Deltas of one scenario against the BAU results (already narrowed to year and `compare_cols_all`)."""
     # Default mapping: most columns compare against themselves in BAU
     column_mappings = {col: (col, "bau") for col in compare_cols_all}
 
     # Override special cases: converts columns compare against nonconverts in same scenario
-    special_cases = {
-        "converts_total_bill_per_user": ("nonconverts_total_bill_per_user", "self"),
-        "electric_converts_bill_per_user": ("electric_nonconverts_bill_per_user", "self"),
-        "gas_converts_bill_per_user": ("gas_nonconverts_bill_per_user", "self"),
-    }
+    special_cases = {col: (baseline_col, "self") for col, baseline_col in SELF_BASELINES.items()}
     column_mappings.update(special_cases)
 
     # Determine what BAU columns we need
@@ -742,71 +1792,203 @@ def create_delta_df(results_dfs: dict[str, pl.DataFrame], compare_cols_all: list
         if baseline_df_name == "bau" and scenario_col in compare_cols_all:
             bau_cols_needed.add(baseline_col)
 
-    # Create comparison DataFrames for each scenario
-    comparison_dfs = {}
-    for scenario_name, scenario_df in results_dfs.items():
-        if scenario_name == "bau":
-            continue
+    # Do one join with all needed BAU columns
+    if bau_cols_needed:
+        bau_cols_to_join = ["year"] + list(bau_cols_needed)
+        bau_renames = {col: f"bau_{col}" for col in bau_cols_needed}
+        working_df = scenario_df.join(
+            bau_df.select(bau_cols_to_join).rename(bau_renames),
+            on="year",
+        )
+    else:
+        working_df = scenario_df
 
-        # Do one join with all needed BAU columns
-        if bau_cols_needed:
-            bau_cols_to_join = ["year"] + list(bau_cols_needed)
-            bau_renames = {col: f"bau_{col}" for col in bau_cols_needed}
-            working_df = scenario_df.join(
-                bau_df.select(bau_cols_to_join).rename(bau_renames),
-                on="year",
-            )
-        else:
-            working_df = scenario_df
-
-        # Create all comparison expressions
-        comparison_cols = []
-        for scenario_col, (baseline_col, baseline_df_name) in column_mappings.items():
-            if scenario_col in compare_cols_all:
-                if baseline_df_name == "self":
-                    if baseline_col in scenario_df.columns:
-                        comparison_cols.append(pl.col(scenario_col).sub(pl.col(baseline_col)))
-                else:  # bau
-                    if baseline_col in bau_df.columns:
-                        comparison_cols.append(pl.col(scenario_col).sub(pl.col(f"bau_{baseline_col}")))
-
-        # Select final columns
-        if comparison_cols:
-            final_df = working_df.select(["year", *comparison_cols])
-        else:
-            final_df = working_df.select(["year"])
+    # Create all comparison expressions
+    comparison_cols = []
+    for scenario_col, (baseline_col, baseline_df_name) in column_mappings.items():
+        if scenario_col in compare_cols_all:
+            if baseline_df_name == "self":
+                if baseline_col in scenario_df.columns:
+                    comparison_cols.append(pl.col(scenario_col).sub(pl.col(baseline_col)))
+            else:  # bau
+                if baseline_col in bau_df.columns:
+                    comparison_cols.append(pl.col(scenario_col).sub(pl.col(f"bau_{baseline_col}")))
+
+    # Select final columns
+    if comparison_cols:
+        final_df = working_df.select(["year", *comparison_cols])
+    else:
+        final_df = working_df.select(["year"])
 
-        comparison_dfs[scenario_name] = final_df
+    return final_df.with_columns(pl.lit(scenario_id).alias("scenario_id"))
 
-    delta_df = pl.concat(
-        [df.with_columns(pl.lit(scenario_id).alias("scenario_id")) for scenario_id, df in comparison_dfs.items()],
-        how="vertical",
-    )
-    return delta_df
+
+# Scenarios per worker task when deduplicating in worker processes; trajectories are only shared within a task
+_DEDUPLICATED_CHUNK_SIZE = 8
+# Tasks queued per worker process ahead of the results being consumed by `iter_all_scenarios`
+_MAX_PENDING_CHUNKS_PER_WORKER = 2
+# Results of one worker task: a frame per scenario of the chunk, and the task's profiler if one was requested
+_ChunkResults = tuple[list[pl.DataFrame], Optional[profiling.StageProfiler]]
+
+
+def _iter_scenarios_serial(
+    scenario_runs: Iterable[tuple[str, ScenarioParams]],
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    engine: Literal["loop", "vectorized"],
+    deduplicate: bool,
+    columns: Optional[list[str]],
+) -> Iterator[tuple[str, pl.DataFrame]]:
+    """Run scenarios one after another in this process, sharing ledger trajectories between them if `deduplicate`."""
+    trajectories: dict[tuple, UtilityTrajectory] = {}
+    for scenario_name, scenario_params in scenario_runs:
+        logger.info(f"Running scenario: {scenario_name}")
+        with profiling.scenario(scenario_name), profiling.stage("run_model"):
+            if deduplicate:
+                df = _run_model_deduplicated(scenario_params, input_params, ts_params, engine, trajectories, columns)
+            else:
+                df = run_model(scenario_params, input_params, ts_params, engine, columns)
+        yield scenario_name, df
+
+
+def _run_scenario_chunk(
+    chunk: list[tuple[str, ScenarioParams]],
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    engine: Literal["loop", "vectorized"],
+    deduplicate: bool,
+    columns: Optional[list[str]],
+    trace_memory: Optional[bool],
+) -> _ChunkResults:
+    """Run a chunk of scenarios in a worker process, as the serial executor would.
+
+    With `trace_memory` given, the chunk runs under a fresh profiler that is sent back along with the results.
+    """
+    profiler = None if trace_memory is None else profiling.StageProfiler(trace_memory=trace_memory)
+    with nullcontext() if profiler is None else profiler:
+        dfs = [df for _, df in _iter_scenarios_serial(chunk, input_params, ts_params, engine, deduplicate, columns)]
+    return dfs, profiler
 
 
 def run_all_scenarios(
-    scenario_runs: dict[str, ScenarioParams], input_params: InputParams, ts_params: TimeSeriesParams
+    scenario_runs: dict[str, ScenarioParams],
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    executor: Literal["serial", "process"] = "serial",
+    max_workers: Optional[int] = None,
+    engine: Literal["loop", "vectorized"] = "loop",
+    deduplicate: bool = True,
+    columns: Optional[list[str]] = None,
 ) -> dict[str, pl.DataFrame]:
-    results_dfs = {}
-    for scenario_name, scenario_params in scenario_runs.items():
-        logger.info(f"Running scenario: {scenario_name}")
-        results_dfs[scenario_name] = run_model(scenario_params, input_params, ts_params)
+    """Run every scenario and return the results keyed by scenario name.
 
-    return results_dfs
+    Args:
+        scenario_runs: Mapping of scenario names to scenario parameters, e.g. from `create_scenario_runs`
+        input_params: Input parameters shared by all scenarios
+        ts_params: Time series parameters shared by all scenarios
+        executor: "serial" runs the scenarios one after another in this process. "process" fans them out to a pool
+            of worker processes; each worker's polars thread pool is limited to its share of the cores so the
+            workers don't oversubscribe the machine.
+        max_workers: Number of worker processes for the "process" executor. Defaults to one per scenario, capped at
+            the number of cores.
+        engine: Model engine passed to `run_model`
+        deduplicate: Compute each distinct utility ledger trajectory once and share it between scenarios. A utility's
+            capex ledger only depends on the scenario through its years, `bau` and whether it takes the npa capex, so
+            e.g. every scenario without npa capex shares one gas trajectory apart from bau. The "process" executor
+            shares trajectories within the chunk of scenarios sent to each task. Results match running each scenario
+            on its own.
+        columns: Output columns to compute for every scenario, see `run_model`. Defaults to every column.
+
+    Stages are recorded per scenario when run inside an active `profiling.StageProfiler`, with either executor.
+
+    Returns:
+        Dictionary mapping scenario names to model results, in the same order as `scenario_runs`
+    """
+    return dict(
+        iter_all_scenarios(scenario_runs, input_params, ts_params, executor, max_workers, engine, deduplicate, columns)
+    )
 
 
-def return_absolute_values_df(results_dfs: dict[str, pl.DataFrame], compare_cols_all: list[str]) -> pl.DataFrame:
-    filtered_results = {}
-    for scenario_name, scenario_df in results_dfs.items():
-        filtered_results[scenario_name] = scenario_df.select(["year", *compare_cols_all])
-        print(f"Added {scenario_name} with shape {scenario_df.shape}")
+def iter_all_scenarios(
+    scenario_runs: dict[str, ScenarioParams],
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    executor: Literal["serial", "process"] = "serial",
+    max_workers: Optional[int] = None,
+    engine: Literal["loop", "vectorized"] = "loop",
+    deduplicate: bool = True,
+    columns: Optional[list[str]] = None,
+) -> Iterator[tuple[str, pl.DataFrame]]:
+    """`run_all_scenarios` as a generator of (scenario name, results) pairs, in the order of `scenario_runs`.
+
+    Results are yielded as they finish, so a consumer such as `iter_delta_dfs` or `write_parquet_parts` can write
+    them out without holding every scenario in memory. Arguments are as for `run_all_scenarios`.
+    """
+    # fail before any scenario runs, rather than in each worker
+    if columns is not None:
+        _required_utilities(columns)
+    if engine not in ("loop", "vectorized"):
+        raise ValueError(f"Unknown engine {engine!r}, expected 'loop' or 'vectorized'")
+    if executor == "serial":
+        yield from _iter_scenarios_serial(scenario_runs.items(), input_params, ts_params, engine, deduplicate, columns)
+        return
+
+    if executor != "process":
+        raise ValueError(f"Unknown executor {executor!r}, expected 'serial' or 'process'")
+
+    num_workers = max_workers or max(1, min(len(scenario_runs), os.cpu_count() or 1))
+    logger.info(f"Running {len(scenario_runs)} scenarios on {num_workers} worker processes")
+    profiler = profiling.active_profiler()
+    trace_memory = None if profiler is None else profiler.trace_memory
+    # a bounded window of chunks is submitted ahead of the one being yielded, so the results waiting to be consumed
+    # stay in bounded memory however many scenarios there are
+    chunk_size = min(_DEDUPLICATED_CHUNK_SIZE, -(-len(scenario_runs) // num_workers)) if deduplicate else 1
+    items = list(scenario_runs.items())
+    chunks = iter([items[i : i + chunk_size] for i in range(0, len(items), chunk_size)])
+    pending: deque[tuple[list[tuple[str, ScenarioParams]], Future[_ChunkResults]]] = deque()
+    with spawn_process_pool(num_workers) as pool:
+
+        def submit_next() -> None:
+            chunk = next(chunks, None)
+            if chunk is not None:
+                future = pool.submit(
+                    _run_scenario_chunk, chunk, input_params, ts_params, engine, deduplicate, columns, trace_memory
+                )
+                pending.append((chunk, future))
 
-    print(f"filtered_results keys: {filtered_results.keys()}")
+        for _ in range(_MAX_PENDING_CHUNKS_PER_WORKER * num_workers):
+            submit_next()
+        # results are consumed in submission order, so the output order matches scenario_runs
+        while pending:
+            chunk, future = pending.popleft()
+            dfs, worker_profiler = future.result()
+            submit_next()
+            if profiler is not None and worker_profiler is not None:
+                profiler.merge(worker_profiler)
+            for (scenario_name, _), df in zip(chunk, dfs):
+                yield scenario_name, df
+
+
+def return_absolute_values_df(results_dfs: dict[str, pl.DataFrame], compare_cols_all: list[str]) -> pl.DataFrame:
     # Concatenate and transform to long format
-    combined_df = pl.concat(
-        [df.with_columns(pl.lit(scenario_id).alias("scenario_id")) for scenario_id, df in filtered_results.items()],
-        how="vertical",
-    )
+    return pl.concat(list(iter_absolute_values_dfs(results_dfs, compare_cols_all)), how="vertical")
+
 
-    return combined_df
+def iter_absolute_values_dfs(
+    results: Union[dict[str, pl.DataFrame], Iterable[tuple[str, pl.DataFrame]]],
+    compare_cols_all: list[str],
+) -> Iterator[pl.DataFrame]:
+    """Streaming `return_absolute_values_df`: yield each scenario's selected columns as its results arrive.
+
+    Args:
+        results: Results keyed by scenario name, or an iterable of (scenario name, results) pairs such as
+            `iter_all_scenarios`
+        compare_cols_all: Columns to keep
+
+    Yields:
+        One frame per scenario, in the layout of `return_absolute_values_df`
+    """
+    items = results.items() if isinstance(results, dict) else results
+    for scenario_name, scenario_df in items:
+        logger.debug(f"Added {scenario_name} with shape {scenario_df.shape}")
+        yield scenario_df.select(["year", *compare_cols_all]).with_columns(pl.lit(scenario_name).alias("scenario_id"))
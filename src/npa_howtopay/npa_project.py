@@ -1,4 +1,5 @@
 from attrs import define, field, validators
+from typing import Union
 import numpy as np
 import polars as pl
 
@@ -44,6 +45,149 @@ class NpaProject:
         })
 
 
+@define
+class NpaYearSummary:
+    """Dense, year-indexed totals of an npa projects dataframe.
+
+    Built once per set of npa projects (see `TimeSeriesParams`) so that the per-year helpers below become O(1) array
+    lookups instead of re-filtering every project on every call. Index `i` of each array holds the total for
+    `first_year + i`; years outside the range have no projects.
+
+    Peak kW increases depend on the heat pump and air conditioner peak loads, so they are computed for the whole
+    range the first time a given pair of loads is requested and memoized. `TimeSeriesParams` built from one memoized
+    summary (see `web_params.create_npa_summary`) share the memo too.
+    """
+
+    first_year: int
+    npa_converts: np.ndarray
+    scattershot_converts: np.ndarray
+    cumulative_npa_converts: np.ndarray
+    cumulative_converts: np.ndarray
+    pipe_value: np.ndarray
+    pipe_decomm_cost: np.ndarray
+    npa_projects: pl.DataFrame
+    _peak_kw_increase: dict[tuple[float, float], np.ndarray] = field(init=False, factory=dict)
+
+    @classmethod
+    def from_df(cls, df: pl.DataFrame) -> "NpaYearSummary":
+        if df.height == 0:
+            first_year, num_years = 0, 0
+        else:
+            project_years = df["project_year"].to_numpy()
+            first_year = int(project_years.min())
+            num_years = int(project_years.max()) - first_year + 1
+
+        by_year = df.group_by("project_year").agg(
+            pl.col("num_converts").filter(~pl.col("is_scattershot")).sum().alias("npa_converts"),
+            pl.col("num_converts").filter(pl.col("is_scattershot")).sum().alias("scattershot_converts"),
+            (pl.col("pipe_value_per_user") * pl.col("num_converts")).sum().alias("pipe_value"),
+            (pl.col("pipe_decomm_cost_per_user") * pl.col("num_converts")).sum().alias("pipe_decomm_cost"),
+        )
+        idx = by_year["project_year"].to_numpy() - first_year
+
+        def dense(col: str, dtype: type) -> np.ndarray:
+            values: np.ndarray = np.zeros(num_years, dtype=dtype)
+            values[idx] = by_year[col].to_numpy()
+            return values
+
+        npa_converts = dense("npa_converts", np.int64)
+        scattershot_converts = dense("scattershot_converts", np.int64)
+        return cls(
+            first_year=first_year,
+            npa_converts=npa_converts,
+            scattershot_converts=scattershot_converts,
+            cumulative_npa_converts=np.cumsum(npa_converts),
+            cumulative_converts=np.cumsum(npa_converts + scattershot_converts),
+            pipe_value=dense("pipe_value", np.float64),
+            pipe_decomm_cost=dense("pipe_decomm_cost", np.float64),
+            npa_projects=df,
+        )
+
+    def _index(self, year: int) -> int:
+        """Array index for `year`; -1 before the first year and len(arrays) after the last."""
+        return min(max(year - self.first_year, -1), len(self.npa_converts))
+
+    def _this_year(self, values: np.ndarray, year: int) -> float:
+        i = self._index(year)
+        return float(values[i]) if 0 <= i < len(values) else 0.0
+
+    def _through_year(self, values: np.ndarray, year: int) -> float:
+        i = min(self._index(year), len(values) - 1)
+        return float(values[i]) if i >= 0 else 0.0
+
+    def _this_years(self, values: np.ndarray, years: np.ndarray) -> np.ndarray:
+        idx = np.asarray(years) - self.first_year
+        in_range = (idx >= 0) & (idx < len(values))
+        out = np.zeros(len(idx), dtype=values.dtype)
+        out[in_range] = values[idx[in_range]]
+        return out
+
+    def _through_years(self, values: np.ndarray, years: np.ndarray) -> np.ndarray:
+        idx = np.minimum(np.asarray(years) - self.first_year, len(values) - 1)
+        out = np.zeros(len(idx), dtype=values.dtype)
+        out[idx >= 0] = values[idx[idx >= 0]]
+        return out
+
+    def hp_converts(self, year: int, cumulative: bool = False, npa_only: bool = False) -> int:
+        if cumulative:
+            return int(self._through_year(self.cumulative_npa_converts if npa_only else self.cumulative_converts, year))
+        converts = int(self._this_year(self.npa_converts, year))
+        if not npa_only:
+            converts += int(self._this_year(self.scattershot_converts, year))
+        return converts
+
+    def pipe_cost_avoided(self, year: int) -> float:
+        return float(self._this_year(self.pipe_value, year))
+
+    def pipe_decomm_costs(self, year: int) -> float:
+        return float(self._this_year(self.pipe_decomm_cost, year))
+
+    def _peak_kw_increase_values(self, peak_hp_kw: float, peak_aircon_kw: float) -> np.ndarray:
+        key = (peak_hp_kw, peak_aircon_kw)
+        if key not in self._peak_kw_increase:
+            by_year = self.npa_projects.group_by("project_year").agg(
+                _peak_kw_increase_expr(peak_hp_kw, peak_aircon_kw).sum().alias("peak_kw_increase")
+            )
+            values = np.zeros(len(self.npa_converts), dtype=np.float64)
+            values[by_year["project_year"].to_numpy() - self.first_year] = by_year["peak_kw_increase"].to_numpy()
+            self._peak_kw_increase[key] = values
+        return self._peak_kw_increase[key]
+
+    def peak_kw_increase(self, year: int, peak_hp_kw: float, peak_aircon_kw: float) -> float:
+        return float(self._this_year(self._peak_kw_increase_values(peak_hp_kw, peak_aircon_kw), year))
+
+    # Array versions of the lookups above, returning one value for each of `years`
+
+    def hp_converts_by_year(self, years: np.ndarray, cumulative: bool = False, npa_only: bool = False) -> np.ndarray:
+        if cumulative:
+            return self._through_years(self.cumulative_npa_converts if npa_only else self.cumulative_converts, years)
+        converts = self._this_years(self.npa_converts, years)
+        if not npa_only:
+            converts += self._this_years(self.scattershot_converts, years)
+        return converts
+
+    def pipe_cost_avoided_by_year(self, years: np.ndarray) -> np.ndarray:
+        return self._this_years(self.pipe_value, years)
+
+    def peak_kw_increase_by_year(self, years: np.ndarray, peak_hp_kw: float, peak_aircon_kw: float) -> np.ndarray:
+        return self._this_years(self._peak_kw_increase_values(peak_hp_kw, peak_aircon_kw), years)
+
+    def to_df(self) -> pl.DataFrame:
+        """Return the summary as a dataframe with one row per year."""
+        return pl.DataFrame({
+            "year": np.arange(self.first_year, self.first_year + len(self.npa_converts), dtype=np.int64),
+            "npa_converts": self.npa_converts,
+            "scattershot_converts": self.scattershot_converts,
+            "cumulative_npa_converts": self.cumulative_npa_converts,
+            "cumulative_converts": self.cumulative_converts,
+            "pipe_value": self.pipe_value,
+            "pipe_decomm_cost": self.pipe_decomm_cost,
+        })
+
+
+NpaProjects = Union[pl.DataFrame, NpaYearSummary]
+
+
 def append_scattershot_electrification_df(
     npa_projects_df: pl.DataFrame,
     scattershot_electrification_df: pl.DataFrame,
@@ -63,7 +207,9 @@ def append_scattershot_electrification_df(
     return pl.concat([npa_projects_df, scattershot_with_npa_cols])
 
 
-def compute_hp_converts_from_df(year: int, df: pl.DataFrame, cumulative: bool = False, npa_only: bool = False) -> int:
+def compute_hp_converts_from_df(year: int, df: NpaProjects, cumulative: bool = False, npa_only: bool = False) -> int:
+    if isinstance(df, NpaYearSummary):
+        return df.hp_converts(year, cumulative=cumulative, npa_only=npa_only)
     if df.height == 0:
         return 0
     year_filter = pl.col("project_year") <= pl.lit(year) if cumulative else pl.col("project_year") == pl.lit(year)
@@ -71,12 +217,14 @@ def compute_hp_converts_from_df(year: int, df: pl.DataFrame, cumulative: bool =
     return int(df.filter(year_filter & npa_filter).select(pl.col("num_converts")).sum().item())
 
 
-def compute_npa_install_costs_from_df(year: int, df: pl.DataFrame, npa_install_cost: float) -> float:
+def compute_npa_install_costs_from_df(year: int, df: NpaProjects, npa_install_cost: float) -> float:
     # TODO: should this also include pipe_decomm_costs?
     return npa_install_cost * compute_hp_converts_from_df(year, df, cumulative=False, npa_only=True)
 
 
-def compute_npa_pipe_cost_avoided_from_df(year: int, df: pl.DataFrame) -> float:
+def compute_npa_pipe_cost_avoided_from_df(year: int, df: NpaProjects) -> float:
+    if isinstance(df, NpaYearSummary):
+        return df.pipe_cost_avoided(year)
     if df.height == 0:
         return 0.0
     return float(
@@ -87,27 +235,31 @@ def compute_npa_pipe_cost_avoided_from_df(year: int, df: pl.DataFrame) -> float:
     )
 
 
-def compute_peak_kw_increase_from_df(year: int, df: pl.DataFrame, peak_hp_kw: float, peak_aircon_kw: float) -> float:
+def _peak_kw_increase_expr(peak_hp_kw: float, peak_aircon_kw: float) -> pl.Expr:
+    return pl.max_horizontal(
+        pl.max_horizontal(pl.col("num_converts") * pl.lit(peak_hp_kw) - pl.col("peak_kw_winter_headroom"), pl.lit(0)),
+        pl.max_horizontal(
+            pl.col("num_converts") * (1 - pl.col("aircon_percent_adoption_pre_npa")) * pl.lit(peak_aircon_kw)
+            - pl.col("peak_kw_summer_headroom"),
+            pl.lit(0),
+        ),
+    )
+
+
+def compute_peak_kw_increase_from_df(year: int, df: NpaProjects, peak_hp_kw: float, peak_aircon_kw: float) -> float:
+    if isinstance(df, NpaYearSummary):
+        return df.peak_kw_increase(year, peak_hp_kw, peak_aircon_kw)
     return float(
         df.filter(pl.col("project_year") == year)
-        .select(
-            pl.max_horizontal(
-                pl.max_horizontal(
-                    pl.col("num_converts") * pl.lit(peak_hp_kw) - pl.col("peak_kw_winter_headroom"), pl.lit(0)
-                ),
-                pl.max_horizontal(
-                    pl.col("num_converts") * (1 - pl.col("aircon_percent_adoption_pre_npa")) * pl.lit(peak_aircon_kw)
-                    - pl.col("peak_kw_summer_headroom"),
-                    pl.lit(0),
-                ),
-            )
-        )
+        .select(_peak_kw_increase_expr(peak_hp_kw, peak_aircon_kw))
         .sum()
         .item()
     )
 
 
-def compute_existing_pipe_value_from_df(year: int, df: pl.DataFrame) -> float:
+def compute_existing_pipe_value_from_df(year: int, df: NpaProjects) -> float:
+    if isinstance(df, NpaYearSummary):
+        return df.pipe_cost_avoided(year)
     return float(
         df.filter(pl.col("project_year") == year)
         .select(pl.col("pipe_value_per_user") * pl.col("num_converts"))
@@ -116,7 +268,9 @@ def compute_existing_pipe_value_from_df(year: int, df: pl.DataFrame) -> float:
     )
 
 
-def compute_pipe_decomm_cost_from_df(year: int, df: pl.DataFrame) -> float:
+def compute_pipe_decomm_cost_from_df(year: int, df: NpaProjects) -> float:
+    if isinstance(df, NpaYearSummary):
+        return df.pipe_decomm_costs(year)
     return float(
         df.filter(pl.col("project_year") == year)
         .select(pl.col("pipe_decomm_cost_per_user") * pl.col("num_converts"))
@@ -0,0 +1,36 @@
+"""Worker process pools for the batch runners (`run_all_scenarios`, `run_sweep` and `load_all_runs`).
+
+Workers are spawned rather than forked, so they don't inherit the parent's already-running polars thread pool, and
+each caps its own polars thread pool so that the workers together don't oversubscribe the machine.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+
+def spawn_process_pool(num_workers: int, threads_per_worker: Optional[int] = None) -> ProcessPoolExecutor:
+    """Pool of `num_workers` spawned worker processes, each capping its polars thread pool.
+
+    Each worker sets POLARS_MAX_THREADS in its own environment before it runs any task, leaving the parent's
+    environment alone. Polars reads the variable when it is first imported, so the cap only applies to workers that
+    haven't imported polars by then: spawned workers re-run the parent's `__main__` module first, so scripts should
+    import polars and npa_howtopay inside functions or under `if __name__ == "__main__":` for it to take effect.
+
+    Args:
+        num_workers: Number of worker processes
+        threads_per_worker: Size of each worker's polars thread pool. Defaults to an equal share of the cores.
+
+    Returns:
+        The pool, to be used as a context manager so its workers are shut down
+    """
+    if threads_per_worker is None:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // num_workers)
+    return ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        # a builtin initializer, since unpickling one defined in this package would import polars first
+        initializer=os.putenv,
+        initargs=("POLARS_MAX_THREADS", str(threads_per_worker)),
+    )
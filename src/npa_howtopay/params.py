@@ -1,12 +1,19 @@
 from attrs import define, field, validators
-from typing import Literal, Optional
-from ruamel.yaml import YAML
+from typing import Any, Literal, Optional, Union
+import numpy as np
 import polars as pl
-from npa_howtopay.web_params import create_time_series_from_web_params, WebParams
-from npa_howtopay.npa_project import append_scattershot_electrification_df
+from npa_howtopay.npa_project import NpaYearSummary, append_scattershot_electrification_df
+from npa_howtopay.parallel import spawn_process_pool
 
 # from npa_project import NpaProject
+import glob
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
 
 # Get the directory where this file is located
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -134,11 +141,26 @@ class TimeSeriesParams:
     gas_fixed_overhead_costs: pl.DataFrame
     electric_fixed_overhead_costs: pl.DataFrame
     gas_bau_lpp_costs_per_year: pl.DataFrame
+    # year-indexed totals of npa_projects, built once so per-year lookups don't re-filter the projects. A summary
+    # passed in whose npa_projects is the given npa_projects frame (e.g. from `web_params.create_npa_summary`, or
+    # copied by `evolve`) marks the projects as already having scattershot electrification appended.
+    _npa_summary: Optional[NpaYearSummary] = field(default=None, kw_only=True, eq=False, repr=False)
 
     def __attrs_post_init__(self) -> None:
         """Automatically append scattershot electrification to npa projects. In the BAU scenario, this will only return the scattershot electrification dataframe."""
 
-        self.npa_projects = append_scattershot_electrification_df(self.npa_projects, self.scattershot_electrification)
+        if self._npa_summary is None or self._npa_summary.npa_projects is not self.npa_projects:
+            self.npa_projects = append_scattershot_electrification_df(
+                self.npa_projects, self.scattershot_electrification
+            )
+            self._npa_summary = NpaYearSummary.from_df(self.npa_projects)
+
+    @property
+    def npa_summary(self) -> NpaYearSummary:
+        """Year-indexed totals of `npa_projects`, rebuilt if `npa_projects` has been reassigned since."""
+        if self._npa_summary is None or self._npa_summary.npa_projects is not self.npa_projects:
+            self._npa_summary = NpaYearSummary.from_df(self.npa_projects)
+        return self._npa_summary
 
 
 @define
@@ -178,11 +200,98 @@ class ScenarioParams:
                 raise ValueError("capex_opex must be set when bau=False and taxpayer=False")
 
 
-def _load_params_from_yaml(yaml_path: str) -> InputParams:
+ALLOCATION_OPTIONS = ("gas_capex", "gas_opex", "electric_capex", "electric_opex")
+
+
+def _share_array(value: Union[float, list[float], np.ndarray]) -> np.ndarray:
+    return np.atleast_1d(np.asarray(value, dtype=np.float64))
+
+
+@define
+class AllocationShares:
+    """Fractional split of npa install costs between funding options, for one or many allocations.
+
+    Each field holds one share per allocation (scalars are broadcast). Whatever isn't allocated to a utility is
+    funded by the taxpayer, so the shares of each allocation must be in [0, 1] and sum to at most 1.
+    """
+
+    gas_capex: np.ndarray = field(default=0.0, converter=_share_array)
+    gas_opex: np.ndarray = field(default=0.0, converter=_share_array)
+    electric_capex: np.ndarray = field(default=0.0, converter=_share_array)
+    electric_opex: np.ndarray = field(default=0.0, converter=_share_array)
+
+    def __attrs_post_init__(self) -> None:
+        shares = np.broadcast_arrays(*(getattr(self, option) for option in ALLOCATION_OPTIONS))
+        for option, share in zip(ALLOCATION_OPTIONS, shares):
+            setattr(self, option, share.copy())
+        if np.any(np.stack(shares) < 0) or np.any(np.stack(shares) > 1):
+            raise ValueError("Allocation shares must be between 0 and 1")
+        if np.any(self.taxpayer < -1e-9):
+            raise ValueError("Allocation shares must sum to at most 1")
+
+    @property
+    def taxpayer(self) -> np.ndarray:
+        """Share of npa install costs left to the taxpayer."""
+        taxpayer: np.ndarray = 1 - (self.gas_capex + self.gas_opex + self.electric_capex + self.electric_opex)
+        return taxpayer
+
+    def __len__(self) -> int:
+        return len(self.gas_capex)
+
+    @classmethod
+    def grid(
+        cls,
+        gas_shares: Union[list[float], np.ndarray],
+        capex_shares: Union[list[float], np.ndarray],
+        taxpayer_share: float = 0.0,
+    ) -> "AllocationShares":
+        """Every combination of a gas (vs electric) share and a capex (vs opex) share of the utility-funded costs.
+
+        Allocations are ordered with the gas share varying slowest. For example `grid(np.linspace(0, 1, 21),
+        np.linspace(0, 1, 21))` is a 21x21 allocation surface.
+        """
+        gas, capex = np.meshgrid(_share_array(gas_shares), _share_array(capex_shares), indexing="ij")
+        gas, capex = gas.ravel(), capex.ravel()
+        utility = 1 - taxpayer_share
+        return cls(
+            gas_capex=utility * gas * capex,
+            gas_opex=utility * gas * (1 - capex),
+            electric_capex=utility * (1 - gas) * capex,
+            electric_opex=utility * (1 - gas) * (1 - capex),
+        )
+
+    def to_df(self) -> pl.DataFrame:
+        """One row per allocation with a `<option>_share` column per funding option, including the taxpayer."""
+        return pl.DataFrame({
+            **{f"{option}_share": getattr(self, option) for option in ALLOCATION_OPTIONS},
+            "taxpayer_share": self.taxpayer,
+        })
+
+
+@define
+class AllocationScenarioParams:
+    """Scenarios that split npa costs fractionally between utilities, capex, opex and the taxpayer.
+
+    Unlike `ScenarioParams`, which picks one funding option, this describes a batch of allocations that
+    `run_allocation_grid` evaluates together.
+    """
+
+    start_year: int
+    end_year: int
+    shares: AllocationShares
+    performance_incentive: bool = field(default=False)
+
+
+def _load_yaml_config(yaml_path: str) -> dict:
+    from ruamel.yaml import YAML
+
     yaml = YAML(typ="safe")
     with open(yaml_path) as f:
-        config = yaml.load(f)
+        config: dict = yaml.load(f)
+    return config
+
 
+def _input_params_from_config(config: dict) -> InputParams:
     return InputParams(
         gas=GasParams(**config["gas"]),
         electric=ElectricParams(**config["electric"]),
@@ -190,18 +299,25 @@ def _load_params_from_yaml(yaml_path: str) -> InputParams:
     )
 
 
-def _load_time_series_params_from_yaml(yaml_path: str) -> TimeSeriesParams:
-    yaml = YAML(typ="safe")
-    with open(yaml_path) as f:
-        config = yaml.load(f)
+def _time_series_frames_from_config(config: dict) -> dict[str, Any]:
+    """The `TimeSeriesParams` constructor arguments in a run config, as built from the YAML lists."""
+    return {
+        "npa_projects": pl.DataFrame(config["time_series"]["npa_projects"]),
+        "scattershot_electrification": pl.DataFrame(
+            config["time_series"]["scattershot_electrification_users_per_year"]
+        ),
+        "gas_fixed_overhead_costs": pl.DataFrame(config["time_series"]["gas_fixed_overhead_costs"]),
+        "electric_fixed_overhead_costs": pl.DataFrame(config["time_series"]["electric_fixed_overhead_costs"]),
+        "gas_bau_lpp_costs_per_year": pl.DataFrame(config["time_series"]["gas_bau_lpp_costs_per_year"]),
+    }
+
+
+def _load_params_from_yaml(yaml_path: str) -> InputParams:
+    return _input_params_from_config(_load_yaml_config(yaml_path))
 
-    return TimeSeriesParams(
-        npa_projects=pl.DataFrame(config["time_series"]["npa_projects"]),
-        scattershot_electrification=pl.DataFrame(config["time_series"]["scattershot_electrification_users_per_year"]),
-        gas_fixed_overhead_costs=pl.DataFrame(config["time_series"]["gas_fixed_overhead_costs"]),
-        electric_fixed_overhead_costs=pl.DataFrame(config["time_series"]["electric_fixed_overhead_costs"]),
-        gas_bau_lpp_costs_per_year=pl.DataFrame(config["time_series"]["gas_bau_lpp_costs_per_year"]),
-    )
+
+def _load_time_series_params_from_yaml(yaml_path: str) -> TimeSeriesParams:
+    return TimeSeriesParams(**_time_series_frames_from_config(_load_yaml_config(yaml_path)))
 
 
 def get_available_runs(data_dir: str = "data") -> list[str]:
@@ -235,18 +351,130 @@ def load_time_series_params_from_yaml(run_name: str, data_dir: str = "data") ->
     return _load_time_series_params_from_yaml(str(yaml_path))
 
 
+def load_run_from_yaml(
+    run_name: str, data_dir: str = "data", snapshot_dir: Optional[str] = None
+) -> tuple[InputParams, TimeSeriesParams]:
+    """Load both the input and the time series parameters of a run, parsing its YAML file once.
+
+    Args:
+        run_name: Name of the YAML file, without extension
+        data_dir: Directory of the YAML file, relative to the package
+        snapshot_dir: If given, load from (and keep up to date) a compiled snapshot of the YAML file in this
+            directory instead of parsing it; see `npa_howtopay.snapshot`
+
+    Returns:
+        The run's input parameters and time series parameters
+    """
+    # Get the package directory
+    package_dir = Path(__file__).parent
+    return _load_run_file(str(package_dir / data_dir / f"{run_name}.yaml"), snapshot_dir)
+
+
+@define
+class BulkLoadResult:
+    """Runs loaded by `load_all_runs`, and the files that failed to load.
+
+    Attributes:
+        runs: Mapping of run name to its input and time series parameters, sorted by run name
+        errors: Mapping of run name to the error its file raised, sorted by run name
+    """
+
+    runs: dict[str, tuple[InputParams, TimeSeriesParams]]
+    errors: dict[str, str]
+
+
+def _load_run_file(yaml_path: str, snapshot_dir: Optional[str]) -> tuple[InputParams, TimeSeriesParams]:
+    if snapshot_dir is not None:
+        from npa_howtopay.snapshot import load_snapshot
+
+        return load_snapshot(yaml_path, snapshot_dir)
+    config = _load_yaml_config(yaml_path)
+    return _input_params_from_config(config), TimeSeriesParams(**_time_series_frames_from_config(config))
+
+
+def _try_load_run_file(
+    yaml_path: str, snapshot_dir: Optional[str]
+) -> tuple[Optional[tuple[InputParams, TimeSeriesParams]], Optional[str]]:
+    """Load one run file, returning its parameters or the error it raised (so one bad file can't fail a batch).
+
+    Only errors from reading, parsing or validating the file are caught; anything else is a bug and propagates.
+    """
+    from ruamel.yaml import YAMLError
+
+    try:
+        return _load_run_file(yaml_path, snapshot_dir), None
+    except (OSError, YAMLError, ValueError, TypeError, KeyError) as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def load_all_runs(
+    data_dir: str = "data",
+    snapshot_dir: Optional[str] = None,
+    executor: Literal["serial", "thread", "process"] = "thread",
+    max_workers: Optional[int] = None,
+) -> BulkLoadResult:
+    """Parse and validate every run YAML file in a directory, concurrently.
+
+    Each file is parsed once for both its input and time series parameters. A file that fails to read, parse or
+    validate is reported in `errors` rather than aborting the others.
+
+    Args:
+        data_dir: Directory of the YAML files, relative to the package (as for `load_scenario_from_yaml`) or absolute
+        snapshot_dir: If given, load through compiled snapshots in this directory, see `npa_howtopay.snapshot`
+        executor: "serial" loads the files one after another in this process, and "thread" on a pool of threads in
+            this process. "process" spreads them over a pool of worker processes, which only pays off for large
+            batches since YAML parsing holds the GIL but each worker has to start up and import the package.
+        max_workers: Number of threads or worker processes. Defaults to the number of cores, capped at the number of
+            files; with a single worker the files are loaded in this process.
+
+    Returns:
+        The loaded runs and the per-file errors, both keyed by run name
+    """
+    yaml_paths = sorted(glob.glob(str(Path(__file__).parent / data_dir / "*.yaml")))
+    run_names = [os.path.splitext(os.path.basename(path))[0] for path in yaml_paths]
+
+    if executor not in ("serial", "thread", "process"):
+        raise ValueError(f"Unknown executor {executor!r}, expected 'serial', 'thread' or 'process'")
+    num_workers = max_workers or max(1, min(len(yaml_paths), os.cpu_count() or 1))
+    snapshot_dirs = repeat(snapshot_dir, len(yaml_paths))
+    if executor == "serial" or num_workers == 1:
+        outcomes = list(map(_try_load_run_file, yaml_paths, snapshot_dirs))
+    elif executor == "thread":
+        with ThreadPoolExecutor(max_workers=num_workers) as pool:
+            outcomes = list(pool.map(_try_load_run_file, yaml_paths, snapshot_dirs))
+    else:
+        with spawn_process_pool(num_workers) as pool:
+            # larger chunks amortize the round trips to the workers over several small files
+            chunksize = max(1, len(yaml_paths) // (4 * num_workers))
+            outcomes = list(pool.map(_try_load_run_file, yaml_paths, snapshot_dirs, chunksize=chunksize))
+
+    runs = {}
+    errors = {}
+    for run_name, (params, error) in zip(run_names, outcomes):
+        if error is not None:
+            logger.warning(f"Could not load run {run_name}: {error}")
+            errors[run_name] = error
+        elif params is not None:
+            runs[run_name] = params
+    return BulkLoadResult(runs=runs, errors=errors)
+
+
 def load_time_series_params_from_web_params(
     web_params: dict, start_year: int, end_year: int, cost_inflation_rate: float = 0.0
 ) -> TimeSeriesParams:
     """Load time series parameters from web parameters (scalar values)"""
+    from npa_howtopay.web_params import WebParams, create_npa_summary, create_time_series_from_web_params
 
     web_params_obj = WebParams(**web_params)
     generated_data = create_time_series_from_web_params(web_params_obj, start_year, end_year, cost_inflation_rate)
+    # memoized along with the series, so unchanged projects aren't appended and summarized again
+    npa_summary = create_npa_summary(web_params_obj, start_year, end_year)
 
     return TimeSeriesParams(
-        npa_projects=generated_data["npa_projects"],
+        npa_projects=npa_summary.npa_projects,
         scattershot_electrification=generated_data["scattershot_electrification_users_per_year"],
         gas_fixed_overhead_costs=generated_data["gas_fixed_overhead_costs"],
         electric_fixed_overhead_costs=generated_data["electric_fixed_overhead_costs"],
         gas_bau_lpp_costs_per_year=generated_data["gas_bau_lpp_costs_per_year"],
+        npa_summary=npa_summary,
     )
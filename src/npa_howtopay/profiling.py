@@ -0,0 +1,158 @@
+"""Opt-in per-stage profiling of model runs.
+
+`run_model` and `run_all_scenarios` mark their stages (capex generation, ratebase totals, npa funding, intermediate
+columns and bill costs) with `stage`. Nothing is recorded unless a `StageProfiler` is active, and
+with no active profiler marking a stage costs one context variable lookup.
+
+Example:
+    with StageProfiler(trace_memory=True) as profiler:
+        run_all_scenarios(scenario_runs, input_params, ts_params)
+    profiler.to_df().sort("wall_time_s", descending=True)
+"""
+
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from contextvars import ContextVar, Token
+from typing import Any, Optional
+
+import polars as pl
+from attrs import define, field
+
+_active_profiler: ContextVar[Optional["StageProfiler"]] = ContextVar("npa_howtopay_profiler", default=None)
+_disabled: AbstractContextManager[None] = nullcontext()
+
+
+@define
+class StageStats:
+    calls: int = 0
+    wall_time_s: float = 0.0
+    peak_bytes: Optional[int] = None
+
+
+@define
+class StageProfiler:
+    """Records wall time, call counts and (optionally) peak traced memory per scenario and stage.
+
+    Use it as a context manager; every model stage run inside the block is recorded. Stages may be nested, in which
+    case the outer stage's time and memory include the inner stage's.
+
+    Args:
+        trace_memory: Also record the peak memory allocated during each stage, above the level at the start of the
+            stage, using tracemalloc. Tracing slows down allocation-heavy code considerably, so it is off by default.
+    """
+
+    trace_memory: bool = False
+    _stats: dict[tuple[Optional[str], str], StageStats] = field(init=False, factory=dict)
+    _scenario: Optional[str] = field(init=False, default=None)
+    # [traced memory at stage start, highest peak seen so far] for each open stage
+    _memory_frames: list[list[int]] = field(init=False, factory=list)
+    _token: Optional[Token] = field(init=False, default=None)
+    _started_tracing: bool = field(init=False, default=False)
+
+    def __enter__(self) -> "StageProfiler":
+        self._token = _active_profiler.set(self)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self._token is not None:
+            _active_profiler.reset(self._token)
+            self._token = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Record the time (and memory) spent in the block under `name` for the current scenario."""
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._memory_frames:
+                # keep the enclosing stage's peak before resetting it for this stage
+                self._memory_frames[-1][1] = max(self._memory_frames[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._memory_frames.append([current, current])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats = self._stats.setdefault((self._scenario, name), StageStats())
+            stats.calls += 1
+            stats.wall_time_s += time.perf_counter() - start
+            if tracing:
+                start_bytes, frame_peak = self._memory_frames.pop()
+                peak = max(frame_peak, tracemalloc.get_traced_memory()[1])
+                stats.peak_bytes = max(stats.peak_bytes or 0, peak - start_bytes)
+                if self._memory_frames:
+                    self._memory_frames[-1][1] = max(self._memory_frames[-1][1], peak)
+
+    @contextmanager
+    def scenario(self, name: str) -> Iterator[None]:
+        """Attribute every stage recorded in the block to scenario `name`."""
+        previous = self._scenario
+        self._scenario = name
+        try:
+            yield
+        finally:
+            self._scenario = previous
+
+    def merge(self, other: "StageProfiler") -> None:
+        """Add the records of another profiler, e.g. one that ran in a worker process."""
+        for key, other_stats in other._stats.items():
+            stats = self._stats.setdefault(key, StageStats())
+            stats.calls += other_stats.calls
+            stats.wall_time_s += other_stats.wall_time_s
+            if other_stats.peak_bytes is not None:
+                stats.peak_bytes = max(stats.peak_bytes or 0, other_stats.peak_bytes)
+
+    def to_df(self) -> pl.DataFrame:
+        """Return the records as a dataframe with one row per scenario and stage, in the order first recorded.
+
+        Columns are scenario (null for runs outside `run_all_scenarios`), stage, calls, wall_time_s (total over all
+        calls), mean_time_s and peak_bytes (null unless memory is traced).
+        """
+        return pl.DataFrame(
+            {
+                "scenario": [scenario for scenario, _ in self._stats],
+                "stage": [stage for _, stage in self._stats],
+                "calls": [stats.calls for stats in self._stats.values()],
+                "wall_time_s": [stats.wall_time_s for stats in self._stats.values()],
+                "peak_bytes": [stats.peak_bytes for stats in self._stats.values()],
+            },
+            schema={
+                "scenario": pl.Utf8,
+                "stage": pl.Utf8,
+                "calls": pl.Int64,
+                "wall_time_s": pl.Float64,
+                "peak_bytes": pl.Int64,
+            },
+        ).select(
+            "scenario",
+            "stage",
+            "calls",
+            "wall_time_s",
+            (pl.col("wall_time_s") / pl.col("calls")).alias("mean_time_s"),
+            "peak_bytes",
+        )
+
+
+def active_profiler() -> Optional[StageProfiler]:
+    """Return the profiler active in this context, if any."""
+    return _active_profiler.get()
+
+
+def stage(name: str) -> AbstractContextManager[None]:
+    """Mark a block as model stage `name`. A no-op unless a `StageProfiler` is active."""
+    profiler = _active_profiler.get()
+    return _disabled if profiler is None else profiler.stage(name)
+
+
+def scenario(name: str) -> AbstractContextManager[None]:
+    """Attribute the stages in a block to scenario `name`. A no-op unless a `StageProfiler` is active."""
+    profiler = _active_profiler.get()
+    return _disabled if profiler is None else profiler.scenario(name)
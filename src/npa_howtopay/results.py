@@ -0,0 +1,235 @@
+"""Dense storage and streaming output of many scenarios' results.
+
+A `ScenarioResultCube` holds one float64 value per scenario, year and metric in a single contiguous array, so deltas
+against a baseline scenario are one array subtraction instead of a join per scenario, and exporting to polars or
+Arrow doesn't copy the metric values. `write_parquet_parts` writes result frames that arrive one at a time (e.g. from
+`model.iter_delta_dfs`) to disk in bounded batches.
+"""
+
+import glob
+import logging
+import os
+from collections.abc import Iterable, Sequence
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+import polars as pl
+from attrs import define, field
+
+logger = logging.getLogger(__name__)
+
+# converts' bills are compared with nonconverts' bills in the same scenario rather than with the baseline scenario
+SELF_BASELINES = {
+    "converts_total_bill_per_user": "nonconverts_total_bill_per_user",
+    "electric_converts_bill_per_user": "electric_nonconverts_bill_per_user",
+    "gas_converts_bill_per_user": "gas_nonconverts_bill_per_user",
+}
+
+
+def _as_list(labels: Iterable[str]) -> list[str]:
+    return list(labels)
+
+
+def _as_years(years: npt.ArrayLike) -> np.ndarray:
+    return np.asarray(years, dtype=np.int64)
+
+
+def _as_data(data: npt.ArrayLike) -> np.ndarray:
+    return np.ascontiguousarray(data, dtype=np.float64)
+
+
+def _positions(labels: Sequence[Any], selected: Optional[Sequence[Any]], axis: str) -> np.ndarray:
+    if selected is None:
+        return np.arange(len(labels))
+    index = {label: i for i, label in enumerate(labels)}
+    missing = [label for label in selected if label not in index]
+    if missing:
+        msg = f"Unknown {axis}: {missing}"
+        raise KeyError(msg)
+    return np.array([index[label] for label in selected], dtype=np.int64)
+
+
+@define
+class ScenarioResultCube:
+    """Results of many scenarios that share the same years, as one dense scenario x year x metric array.
+
+    Values are stored metric-major (one contiguous block of scenario x year values per metric), which is what lets
+    `to_polars` and `to_arrow` hand each metric column over without copying. `values` is the scenario x year x metric
+    view of the same memory.
+
+    Args:
+        scenarios: Scenario names
+        years: Years, shared by every scenario
+        metrics: Metric (model output column) names
+        data: Array of shape (len(metrics), len(scenarios), len(years)), converted to contiguous float64
+    """
+
+    scenarios: list[str] = field(converter=_as_list)
+    years: np.ndarray = field(converter=_as_years)
+    metrics: list[str] = field(converter=_as_list)
+    data: np.ndarray = field(converter=_as_data)
+
+    def __attrs_post_init__(self) -> None:
+        expected = (len(self.metrics), len(self.scenarios), len(self.years))
+        if self.data.shape != expected:
+            msg = f"data has shape {self.data.shape}, expected (metrics, scenarios, years) = {expected}"
+            raise ValueError(msg)
+
+    @classmethod
+    def from_results(cls, results_dfs: dict[str, pl.DataFrame], metrics: list[str]) -> "ScenarioResultCube":
+        """Pack the `metrics` columns of results keyed by scenario name, e.g. from `run_all_scenarios`.
+
+        Args:
+            results_dfs: Mapping of scenario name to model results
+            metrics: Columns to keep; integer columns are stored as floats
+
+        Returns:
+            Cube with the scenarios in the order of `results_dfs` and the years of the first scenario
+
+        Raises:
+            ValueError: If the scenarios don't all cover the same years
+        """
+        scenarios = list(results_dfs)
+        years = next(iter(results_dfs.values()))["year"].to_numpy()
+        data = np.empty((len(metrics), len(scenarios), len(years)), dtype=np.float64)
+        for i, (scenario_name, df) in enumerate(results_dfs.items()):
+            if not np.array_equal(df["year"].to_numpy(), years):
+                msg = f"Scenario {scenario_name!r} covers different years than {scenarios[0]!r}"
+                raise ValueError(msg)
+            data[:, i, :] = df.select(metrics).to_numpy().T
+        return cls(scenarios, years, metrics, data)
+
+    @property
+    def values(self) -> np.ndarray:
+        """The values indexed by scenario, year and metric (a view, not a copy)."""
+        return self.data.transpose(1, 2, 0)
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        """(scenarios, years, metrics)"""
+        return len(self.scenarios), len(self.years), len(self.metrics)
+
+    def metric(self, name: str) -> np.ndarray:
+        """The scenario x year values of one metric (a view, not a copy)."""
+        values: np.ndarray = self.data[self.metrics.index(name)]
+        return values
+
+    def sel(
+        self,
+        scenarios: Optional[Sequence[str]] = None,
+        years: Optional[Sequence[int]] = None,
+        metrics: Optional[Sequence[str]] = None,
+    ) -> "ScenarioResultCube":
+        """Select scenarios, years and metrics by label; None keeps the whole axis.
+
+        Raises:
+            KeyError: If a label isn't in the cube
+        """
+        metric_pos = _positions(self.metrics, metrics, "metrics")
+        scenario_pos = _positions(self.scenarios, scenarios, "scenarios")
+        year_pos = _positions(self.years.tolist(), years, "years")
+        return ScenarioResultCube(
+            [self.scenarios[i] for i in scenario_pos],
+            self.years[year_pos],
+            [self.metrics[i] for i in metric_pos],
+            self.data[np.ix_(metric_pos, scenario_pos, year_pos)],
+        )
+
+    def delta(self, baseline: str = "bau") -> "ScenarioResultCube":
+        """Difference of every other scenario from the `baseline` scenario, as in `create_delta_df`.
+
+        Converts' bills are compared with the nonconverts' bills of the same scenario instead (see `SELF_BASELINES`).
+
+        Raises:
+            KeyError: If `baseline` isn't one of the scenarios
+            ValueError: If a converts bill metric is present without its nonconverts counterpart
+        """
+        baseline_pos = _positions(self.scenarios, [baseline], "scenarios")[0]
+        deltas = self.data - self.data[:, baseline_pos : baseline_pos + 1, :]
+        for metric_pos, name in enumerate(self.metrics):
+            if name in SELF_BASELINES:
+                if SELF_BASELINES[name] not in self.metrics:
+                    msg = f"The delta of {name} needs {SELF_BASELINES[name]} in the cube"
+                    raise ValueError(msg)
+                deltas[metric_pos] = self.data[metric_pos] - self.metric(SELF_BASELINES[name])
+        keep = [i for i in range(len(self.scenarios)) if i != baseline_pos]
+        return ScenarioResultCube(
+            [self.scenarios[i] for i in keep], self.years, self.metrics, np.take(deltas, keep, axis=1)
+        )
+
+    def to_polars(self) -> pl.DataFrame:
+        """Long dataframe with one row per scenario and year: year, the metrics and scenario_id.
+
+        This is the layout of `return_absolute_values_df` (and of `create_delta_df` for a delta cube). The metric
+        columns share memory with the cube.
+        """
+        num_rows = len(self.scenarios) * len(self.years)
+        return pl.DataFrame([
+            pl.Series("year", np.tile(self.years, len(self.scenarios))),
+            *(pl.Series(name, self.data[i].reshape(num_rows)) for i, name in enumerate(self.metrics)),
+            pl.Series("scenario_id", np.repeat(np.array(self.scenarios, dtype=object), len(self.years)), pl.Utf8),
+        ])
+
+    def to_arrow(self) -> Any:
+        """`to_polars` as a pyarrow Table, with scenario_id dictionary-encoded. Requires pyarrow.
+
+        The metric columns share memory with the cube.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            msg = "Exporting to Arrow requires pyarrow; install it or use to_polars"
+            raise ImportError(msg) from e
+        num_rows = len(self.scenarios) * len(self.years)
+        scenario_codes = np.repeat(np.arange(len(self.scenarios), dtype=np.int32), len(self.years))
+        return pa.table({
+            "year": pa.array(np.tile(self.years, len(self.scenarios))),
+            **{name: pa.array(self.data[i].reshape(num_rows)) for i, name in enumerate(self.metrics)},
+            "scenario_id": pa.DictionaryArray.from_arrays(scenario_codes, pa.array(self.scenarios, pa.string())),
+        })
+
+
+def write_parquet_parts(frames: Iterable[pl.DataFrame], directory: str, frames_per_part: int = 100) -> list[str]:
+    """Write a stream of frames with the same schema to numbered Parquet files, `frames_per_part` at a time.
+
+    Only one part's frames are held in memory at once, so e.g.
+    `write_parquet_parts(iter_delta_dfs(iter_all_scenarios(...), COMPARE_COLS), "deltas")` writes the deltas of any
+    number of scenarios in bounded memory. Read the parts back with `pl.scan_parquet(f"{directory}/*.parquet")`.
+
+    Args:
+        frames: Frames to write, e.g. one per scenario
+        directory: Directory for the part-NNNNN.parquet files; created if missing
+        frames_per_part: Number of frames concatenated into each part file
+
+    Returns:
+        Paths of the part files written, in order
+
+    Raises:
+        ValueError: If `frames_per_part` is less than 1
+        FileExistsError: If the directory already holds part files, which would otherwise mix with the new ones
+    """
+    if frames_per_part < 1:
+        msg = f"frames_per_part must be at least 1, got {frames_per_part}"
+        raise ValueError(msg)
+    os.makedirs(directory, exist_ok=True)
+    if glob.glob(os.path.join(directory, "part-*.parquet")):
+        msg = f"{directory} already holds part files"
+        raise FileExistsError(msg)
+    paths: list[str] = []
+    batch: list[pl.DataFrame] = []
+
+    def flush() -> None:
+        path = os.path.join(directory, f"part-{len(paths):05d}.parquet")
+        pl.concat(batch, how="vertical").write_parquet(path)
+        logger.debug(f"Wrote {len(batch)} frames to {path}")
+        paths.append(path)
+        batch.clear()
+
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == frames_per_part:
+            flush()
+    if batch:
+        flush()
+    return paths
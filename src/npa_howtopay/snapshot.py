@@ -0,0 +1,163 @@
+"""Compiled binary snapshots of run YAML files.
+
+Parsing a run's YAML with ruamel.yaml and rebuilding its time series frames from Python lists dominates loading
+time when many runs are loaded repeatedly. `compile_snapshot` parses a YAML file once and stores the scalar
+parameters as JSON and each time series as an Arrow IPC file; `load_snapshot` then rebuilds `InputParams` and
+`TimeSeriesParams` from those without touching the YAML.
+
+Snapshots are content-addressed by the SHA-256 of the YAML file, under a subdirectory per package version. An index
+entry per YAML file remembers the modification time and size the hash was taken at, so an unchanged file is served
+with a single `stat`; a touched but unchanged file is re-hashed and reuses its snapshot, and an edited file is
+recompiled. Files are written atomically, so several processes can share one snapshot directory.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Any
+
+import polars as pl
+from attrs import fields
+
+from . import __version__
+from .params import (
+    InputParams,
+    TimeSeriesParams,
+    _input_params_from_config,
+    _load_yaml_config,
+    _time_series_frames_from_config,
+)
+
+logger = logging.getLogger(__name__)
+
+_SCALAR_SECTIONS = ("gas", "electric", "shared")
+# the time series frames; the npa summary built from them isn't part of the params' value
+_TIME_SERIES_FIELDS = [f.name for f in fields(TimeSeriesParams) if f.init and f.eq]
+
+
+def _version_dir(snapshot_dir: str) -> str:
+    return os.path.join(snapshot_dir, __version__)
+
+
+def _file_sha256(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _index_path(yaml_path: str, snapshot_dir: str) -> str:
+    # one index entry per YAML file, named after its absolute path so same-named files in other directories differ
+    path_key = hashlib.sha256(os.path.abspath(yaml_path).encode()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(yaml_path))[0]
+    return os.path.join(_version_dir(snapshot_dir), "index", f"{name}-{path_key}.json")
+
+
+def _write_json_atomic(path: str, data: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _write_snapshot(config: dict, snapshot_path: str) -> None:
+    """Write the snapshot of a parsed run config to `snapshot_path`, unless another process already has."""
+    if os.path.isdir(snapshot_path):
+        return
+    os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+    # build the snapshot in a temporary directory and rename it into place so readers never see a partial one
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(snapshot_path), suffix=".tmp")
+    try:
+        with open(os.path.join(tmp_dir, "params.json"), "w") as f:
+            json.dump({section: config[section] for section in _SCALAR_SECTIONS}, f)
+        for name, df in _time_series_frames_from_config(config).items():
+            df.write_ipc(os.path.join(tmp_dir, f"{name}.arrow"), compression="uncompressed")
+        try:
+            os.rename(tmp_dir, snapshot_path)
+        except OSError:
+            if not os.path.isdir(snapshot_path):
+                raise
+            # another process compiled the same content first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _read_snapshot(snapshot_path: str) -> tuple[InputParams, TimeSeriesParams]:
+    with open(os.path.join(snapshot_path, "params.json")) as f:
+        input_params = _input_params_from_config(json.load(f))
+    frames: dict[str, Any] = {
+        name: pl.read_ipc(os.path.join(snapshot_path, f"{name}.arrow")) for name in _TIME_SERIES_FIELDS
+    }
+    return input_params, TimeSeriesParams(**frames)
+
+
+def compile_snapshot(yaml_path: str, snapshot_dir: str) -> str:
+    """Parse a run's YAML file and store its snapshot, returning the snapshot's directory.
+
+    Args:
+        yaml_path: Path of the run's YAML file
+        snapshot_dir: Directory holding the snapshots
+
+    Returns:
+        Path of the snapshot directory
+    """
+    stat = os.stat(yaml_path)
+    sha256 = _file_sha256(yaml_path)
+    snapshot_path = os.path.join(_version_dir(snapshot_dir), sha256)
+    if not os.path.isdir(snapshot_path):
+        _write_snapshot(_load_yaml_config(yaml_path), snapshot_path)
+    _write_json_atomic(
+        _index_path(yaml_path, snapshot_dir), {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256}
+    )
+    return snapshot_path
+
+
+def compile_data_dir(data_dir: str, snapshot_dir: str) -> list[str]:
+    """Compile the snapshot of every YAML file in `data_dir`, returning the snapshot directories."""
+    return [compile_snapshot(yaml_path, snapshot_dir) for yaml_path in sorted(glob.glob(f"{data_dir}/*.yaml"))]
+
+
+def load_snapshot(yaml_path: str, snapshot_dir: str) -> tuple[InputParams, TimeSeriesParams]:
+    """Load a run's input and time series parameters from its snapshot, compiling it first if it is missing or stale.
+
+    Args:
+        yaml_path: Path of the run's YAML file
+        snapshot_dir: Directory holding the snapshots
+
+    Returns:
+        The same parameters as parsing the YAML file with `params.load_run_from_yaml`
+    """
+    stat = os.stat(yaml_path)
+    index_path = _index_path(yaml_path, snapshot_dir)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = None
+
+    if index is not None and (index["mtime_ns"], index["size"]) == (stat.st_mtime_ns, stat.st_size):
+        sha256 = index["sha256"]
+    else:
+        # the file was touched (or never indexed): its content decides whether the snapshot can be reused
+        sha256 = _file_sha256(yaml_path)
+        _write_json_atomic(index_path, {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256})
+
+    snapshot_path = os.path.join(_version_dir(snapshot_dir), sha256)
+    if not os.path.isdir(snapshot_path):
+        logger.info(f"Compiling snapshot of {yaml_path}")
+        config = _load_yaml_config(yaml_path)
+        _write_snapshot(config, snapshot_path)
+        return _input_params_from_config(config), TimeSeriesParams(**_time_series_frames_from_config(config))
+    return _read_snapshot(snapshot_path)
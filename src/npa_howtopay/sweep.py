@@ -0,0 +1,330 @@
+"""Monte Carlo parameter sweeps over InputParams.
+
+A sweep samples any numeric field of `GasParams`, `ElectricParams` or `SharedParams` from a distribution, runs the
+model for every draw and scenario, and returns one tidy table with a row per draw, scenario and year.
+"""
+
+import logging
+import os
+from typing import Any, Literal, Optional, Union
+
+import attrs
+import numpy as np
+import polars as pl
+from attrs import define, field, validators
+
+from .model import iter_all_scenarios
+from .parallel import spawn_process_pool
+from .params import COMPARE_COLS, ElectricParams, GasParams, InputParams, ScenarioParams, SharedParams, TimeSeriesParams
+
+logger = logging.getLogger(__name__)
+
+PARAM_SECTIONS: dict[str, type] = {"gas": GasParams, "electric": ElectricParams, "shared": SharedParams}
+
+
+@define
+class Uniform:
+    low: float
+    high: float
+
+    def ppf(self, u: np.ndarray) -> np.ndarray:
+        return self.low + u * (self.high - self.low)
+
+
+@define
+class Normal:
+    mean: float
+    std: float = field(validator=validators.gt(0.0))
+
+    def ppf(self, u: np.ndarray) -> np.ndarray:
+        # keep u strictly inside (0, 1) so a draw of exactly 0 doesn't map to -inf
+        u = np.clip(u, 1e-12, 1 - 1e-12)
+        return self.mean + _standard_normal_ppf(u) * self.std
+
+
+# Coefficients of Wichura's algorithm AS241 (Applied Statistics 37(3), 1988), highest power first, as used by
+# `statistics.NormalDist.inv_cdf`: numerator and denominator of the central region and the two tail regions
+_AS241_CENTRAL = (
+    [
+        2.5090809287301226727e3,
+        3.3430575583588128105e4,
+        6.7265770927008700853e4,
+        4.5921953931549871457e4,
+        1.3731693765509461125e4,
+        1.9715909503065514427e3,
+        1.3314166789178437745e2,
+        3.3871328727963666080e0,
+    ],
+    [
+        5.2264952788528545610e3,
+        2.8729085735721942674e4,
+        3.9307895800092710610e4,
+        2.1213794301586595867e4,
+        5.3941960214247511077e3,
+        6.8718700749205790830e2,
+        4.2313330701600911252e1,
+        1.0,
+    ],
+)
+_AS241_NEAR_TAIL = (
+    [
+        7.74545014278341407640e-4,
+        2.27238449892691845833e-2,
+        2.41780725177450611770e-1,
+        1.27045825245236838258e0,
+        3.64784832476320460504e0,
+        5.76949722146069140550e0,
+        4.63033784615654529590e0,
+        1.42343711074968357734e0,
+    ],
+    [
+        1.05075007164441684324e-9,
+        5.47593808499534494600e-4,
+        1.51986665636164571966e-2,
+        1.48103976427480074590e-1,
+        6.89767334985100004550e-1,
+        1.67638483018380384940e0,
+        2.05319162663775882187e0,
+        1.0,
+    ],
+)
+_AS241_FAR_TAIL = (
+    [
+        2.01033439929228813265e-7,
+        2.71155556874348757815e-5,
+        1.24266094738807843860e-3,
+        2.65321895265761230930e-2,
+        2.96560571828504891230e-1,
+        1.78482653991729133580e0,
+        5.46378491116411436990e0,
+        6.65790464350110377720e0,
+    ],
+    [
+        2.04426310338993978564e-15,
+        1.42151175831644588870e-7,
+        1.84631831751005468180e-5,
+        7.86869131145613259100e-4,
+        1.48753612908506148525e-2,
+        1.36929880922735805310e-1,
+        5.99832206555887937690e-1,
+        1.0,
+    ],
+)
+
+
+def _standard_normal_ppf(u: np.ndarray) -> np.ndarray:
+    """Inverse CDF of the standard normal distribution for every entry of `u` in (0, 1)."""
+    q = u - 0.5
+    r = 0.180625 - q * q
+    central = q * np.polyval(_AS241_CENTRAL[0], r) / np.polyval(_AS241_CENTRAL[1], r)
+    # the tails are symmetric, so both are evaluated at the distance to the nearer end
+    t = np.sqrt(-np.log(np.minimum(u, 1.0 - u)))
+    near = np.polyval(_AS241_NEAR_TAIL[0], t - 1.6) / np.polyval(_AS241_NEAR_TAIL[1], t - 1.6)
+    far = np.polyval(_AS241_FAR_TAIL[0], t - 5.0) / np.polyval(_AS241_FAR_TAIL[1], t - 5.0)
+    tail = np.where(t <= 5.0, near, far)
+    return np.where(np.abs(q) <= 0.425, central, np.where(q < 0.0, -tail, tail))
+
+
+@define
+class Triangular:
+    low: float
+    mode: float
+    high: float
+
+    def __attrs_post_init__(self) -> None:
+        if not self.low <= self.mode <= self.high or self.low == self.high:
+            msg = "Triangular requires low <= mode <= high and low < high"
+            raise ValueError(msg)
+
+    def ppf(self, u: np.ndarray) -> np.ndarray:
+        width = self.high - self.low
+        split = (self.mode - self.low) / width
+        lower = self.low + np.sqrt(u * width * (self.mode - self.low))
+        upper = self.high - np.sqrt((1 - u) * width * (self.high - self.mode))
+        return np.where(u < split, lower, upper)
+
+
+Distribution = Union[Uniform, Normal, Triangular]
+
+
+def _sweepable_fields(section: str) -> dict[str, type]:
+    return {f.name: f.type for f in attrs.fields(PARAM_SECTIONS[section]) if f.init}
+
+
+def _parse_param_path(path: str) -> tuple[str, str]:
+    """Split and validate a parameter path such as "electric.hp_efficiency"."""
+    section, _, name = path.partition(".")
+    if section not in PARAM_SECTIONS:
+        msg = f"Parameter {path!r} must start with one of {sorted(PARAM_SECTIONS)}"
+        raise ValueError(msg)
+    if name not in _sweepable_fields(section):
+        msg = f"{PARAM_SECTIONS[section].__name__} has no field {name!r}"
+        raise ValueError(msg)
+    return section, name
+
+
+def sample_unit_hypercube(
+    n_draws: int, n_dims: int, method: Literal["lhs", "sobol", "random"] = "lhs", seed: int = 0
+) -> np.ndarray:
+    """Sample `n_draws` points in the unit hypercube [0, 1)^n_dims.
+
+    Args:
+        n_draws: Number of points
+        n_dims: Number of dimensions (one per swept parameter)
+        method: "lhs" for Latin hypercube sampling, "sobol" for a scrambled Sobol sequence (requires scipy),
+            or "random" for plain Monte Carlo
+        seed: Seed for the random stream. The same seed always gives the same points.
+
+    Returns:
+        Array of shape (n_draws, n_dims)
+    """
+    rng = np.random.default_rng(seed)
+    if method == "lhs":
+        # one point in each of n_draws equal-width strata per dimension, strata shuffled independently
+        strata = np.stack([rng.permutation(n_draws) for _ in range(n_dims)], axis=1)
+        return (strata + rng.random((n_draws, n_dims))) / n_draws
+    if method == "sobol":
+        try:
+            from scipy.stats import qmc
+        except ImportError as e:
+            msg = "Sobol sampling requires scipy; install it or use method='lhs'"
+            raise ImportError(msg) from e
+        return np.asarray(qmc.Sobol(d=n_dims, scramble=True, seed=rng).random(n_draws))
+    if method == "random":
+        return rng.random((n_draws, n_dims))
+    msg = f"Unknown sampling method {method!r}, expected 'lhs', 'sobol' or 'random'"
+    raise ValueError(msg)
+
+
+def sample_parameters(
+    distributions: dict[str, Distribution],
+    n_draws: int,
+    method: Literal["lhs", "sobol", "random"] = "lhs",
+    seed: int = 0,
+) -> pl.DataFrame:
+    """Draw parameter values for a sweep.
+
+    Args:
+        distributions: Mapping of parameter path ("gas.<field>", "electric.<field>" or "shared.<field>") to the
+            distribution it is drawn from
+        n_draws: Number of draws
+        method: Sampling method, see `sample_unit_hypercube`
+        seed: Seed for the random stream
+
+    Returns:
+        DataFrame with a `draw_id` column and one column per parameter path. Integer fields are rounded.
+    """
+    paths = list(distributions)
+    unit = sample_unit_hypercube(n_draws, len(paths), method=method, seed=seed)
+    columns: dict[str, Any] = {"draw_id": np.arange(n_draws, dtype=np.int64)}
+    for i, path in enumerate(paths):
+        section, name = _parse_param_path(path)
+        values = distributions[path].ppf(unit[:, i])
+        columns[path] = np.rint(values).astype(np.int64) if _sweepable_fields(section)[name] is int else values
+    return pl.DataFrame(columns)
+
+
+def apply_draw(input_params: InputParams, draw: dict[str, Any]) -> InputParams:
+    """Return a copy of `input_params` with the parameter paths in `draw` replaced.
+
+    Values passed down from `SharedParams` (start year and cost inflation rate) are propagated as usual.
+    """
+    changes: dict[str, dict[str, Any]] = {section: {} for section in PARAM_SECTIONS}
+    for path, value in draw.items():
+        section, name = _parse_param_path(path)
+        changes[section][name] = value
+    return InputParams(
+        gas=attrs.evolve(input_params.gas, **changes["gas"]),
+        electric=attrs.evolve(input_params.electric, **changes["electric"]),
+        shared=attrs.evolve(input_params.shared, **changes["shared"]),
+    )
+
+
+def _run_draws(
+    draws: list[dict[str, Any]],
+    scenario_runs: dict[str, ScenarioParams],
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    columns: list[str],
+    engine: Literal["loop", "vectorized"],
+) -> pl.DataFrame:
+    """Run every scenario for a batch of draws and stack the results."""
+    results = []
+    for draw in draws:
+        draw_params = apply_draw(input_params, {k: v for k, v in draw.items() if k != "draw_id"})
+        # the scenarios of a draw share its utility ledger trajectories, as in `run_all_scenarios`
+        for scenario_name, df in iter_all_scenarios(
+            scenario_runs, draw_params, ts_params, engine=engine, deduplicate=True, columns=columns
+        ):
+            results.append(
+                df.select(
+                    pl.lit(draw["draw_id"], dtype=pl.Int64).alias("draw_id"),
+                    pl.lit(scenario_name).alias("scenario_id"),
+                    "year",
+                    *columns,
+                )
+            )
+    return pl.concat(results, how="vertical")
+
+
+def run_sweep(
+    distributions: dict[str, Distribution],
+    scenario_runs: dict[str, ScenarioParams],
+    input_params: InputParams,
+    ts_params: TimeSeriesParams,
+    n_draws: int,
+    method: Literal["lhs", "sobol", "random"] = "lhs",
+    seed: int = 0,
+    columns: Optional[list[str]] = None,
+    batch_size: int = 50,
+    executor: Literal["serial", "process"] = "serial",
+    max_workers: Optional[int] = None,
+    engine: Literal["loop", "vectorized"] = "vectorized",
+) -> pl.DataFrame:
+    """Propagate parameter uncertainty through the model.
+
+    Draws are sampled up front from a seeded stream, so results are reproducible regardless of batch size or
+    executor. Draws are then evaluated in batches, either in this process or on a pool of worker processes.
+
+    Args:
+        distributions: Mapping of parameter path to distribution, see `sample_parameters`
+        scenario_runs: Scenarios to run for every draw, e.g. from `create_scenario_runs`
+        input_params: Base input parameters; swept fields are replaced for each draw
+        ts_params: Time series parameters shared by all draws
+        n_draws: Number of draws
+        method: Sampling method, see `sample_unit_hypercube`
+        seed: Seed for the random stream
+        columns: Model output columns to keep. Defaults to COMPARE_COLS.
+        batch_size: Number of draws evaluated per task
+        executor: "serial" or "process", as in `run_all_scenarios`
+        max_workers: Number of worker processes for the "process" executor
+        engine: Model engine, see `run_model`. Defaults to "vectorized", which computes each scenario's whole
+            horizon in array operations.
+
+    Returns:
+        Tidy DataFrame with columns draw_id, the swept parameter paths, scenario_id, year and the requested
+        output columns
+    """
+    columns = COMPARE_COLS if columns is None else columns
+    samples = sample_parameters(distributions, n_draws, method=method, seed=seed)
+    draws = samples.to_dicts()
+    batches = [draws[i : i + batch_size] for i in range(0, len(draws), batch_size)]
+    logger.info(f"Running {n_draws} draws x {len(scenario_runs)} scenarios in {len(batches)} batches")
+
+    if executor == "serial":
+        batch_results = [
+            _run_draws(batch, scenario_runs, input_params, ts_params, columns, engine) for batch in batches
+        ]
+    elif executor == "process":
+        num_workers = max_workers or max(1, min(len(batches), os.cpu_count() or 1))
+        with spawn_process_pool(num_workers) as pool:
+            futures = [
+                pool.submit(_run_draws, batch, scenario_runs, input_params, ts_params, columns, engine)
+                for batch in batches
+            ]
+            batch_results = [future.result() for future in futures]
+    else:
+        msg = f"Unknown executor {executor!r}, expected 'serial' or 'process'"
+        raise ValueError(msg)
+
+    return samples.join(pl.concat(batch_results, how="vertical"), on="draw_id", how="inner", maintain_order="right")
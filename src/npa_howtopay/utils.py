@@ -1,5 +1,4 @@
 import polars as pl
-import matplotlib.pyplot as plt
 from typing import Optional
 
 
@@ -45,6 +44,8 @@ def plot_utility_metric(
         save_dir: Directory to save the plot (optional)
     """
 
+    import matplotlib.pyplot as plt
+
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
 
     # Determine y-axis label based on show_absolute parameter
@@ -253,6 +254,8 @@ def plot_total_bills(
     if scenario_line_styles is None:
         scenario_line_styles = line_styles
 
+    import matplotlib.pyplot as plt
+
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
 
     # Determine y-axis label based on show_absolute parameter
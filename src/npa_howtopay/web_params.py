@@ -1,6 +1,9 @@
 from attrs import define
+from functools import lru_cache
+import numpy as np
 import polars as pl
-from typing import Optional
+from typing import Optional, Union
+from npa_howtopay.npa_project import NpaYearSummary, append_scattershot_electrification_df
 
 
 @define
@@ -23,19 +26,93 @@ class WebParams:
     # stuff_for_producing_ratebase_baseline
 
 
-def create_npa_projects(web_params: WebParams, start_year: int, end_year: int) -> pl.DataFrame:
+# WebParams fields copied onto every generated npa project, in npa_projects column order
+_NPA_PROJECT_FIELDS = [
+    "num_converts",
+    "pipe_value_per_user",
+    "pipe_decomm_cost_per_user",
+    "peak_kw_winter_headroom",
+    "peak_kw_summer_headroom",
+    "aircon_percent_adoption_pre_npa",
+    "is_scattershot",
+]
+
+
+# Generated series are memoized on only the WebParams fields (plus years and inflation rate) each one depends on, so
+# an edit to one field rebuilds only the series that use it; the others are returned as the same DataFrame objects.
+# Cached frames are shared between callers and must not be modified in place.
+_SERIES_CACHE_SIZE = 64
+
+
+def _field_values(web_params: WebParams, names: list[str]) -> tuple:
+    # the type is part of the key: 1, 1.0 and True are equal but make Int64, Float64 and Boolean columns
+    return tuple((type(value), value) for value in (getattr(web_params, name) for name in names))
+
+
+def _project_years(start_year: int, end_year: int) -> np.ndarray:
+    return np.arange(start_year, end_year + 1, dtype=np.int64)
+
+
+def _inflation_factors(num_years: int, cost_inflation_rate: float) -> np.ndarray:
+    # compound inflation: (1 + rate)^(year - start_year)
+    return (1 + cost_inflation_rate) ** np.arange(num_years, dtype=np.float64)
+
+
+@lru_cache(maxsize=_SERIES_CACHE_SIZE)
+def _inflated_costs_df(base_cost: float, start_year: int, end_year: int, cost_inflation_rate: float) -> pl.DataFrame:
+    years = _project_years(start_year, end_year)
+    return pl.DataFrame({
+        "year": years,
+        "cost": base_cost * _inflation_factors(len(years), cost_inflation_rate),
+    })
+
+
+@lru_cache(maxsize=_SERIES_CACHE_SIZE)
+def _npa_projects_df(field_values: tuple, start_year: int, end_year: int) -> pl.DataFrame:
+    years = _project_years(start_year, end_year)
+    return pl.DataFrame({
+        "project_year": years,
+        **{name: np.full(len(years), value) for name, (_, value) in zip(_NPA_PROJECT_FIELDS, field_values)},
+    })
+
+
+@lru_cache(maxsize=_SERIES_CACHE_SIZE)
+def _scattershot_df(field_values: tuple, start_year: int, end_year: int) -> pl.DataFrame:
+    years = _project_years(start_year, end_year)
+    ((_, users_per_year),) = field_values
     return pl.DataFrame({
-        "project_year": list(range(start_year, end_year + 1)),
-        "num_converts": [web_params.num_converts] * (end_year - start_year + 1),
-        "pipe_value_per_user": [web_params.pipe_value_per_user] * (end_year - start_year + 1),
-        "pipe_decomm_cost_per_user": [web_params.pipe_decomm_cost_per_user] * (end_year - start_year + 1),
-        "peak_kw_winter_headroom": [web_params.peak_kw_winter_headroom] * (end_year - start_year + 1),
-        "peak_kw_summer_headroom": [web_params.peak_kw_summer_headroom] * (end_year - start_year + 1),
-        "aircon_percent_adoption_pre_npa": [web_params.aircon_percent_adoption_pre_npa] * (end_year - start_year + 1),
-        "is_scattershot": [web_params.is_scattershot] * (end_year - start_year + 1),
+        "project_year": years,
+        "num_converts": np.full(len(years), users_per_year),
     })
 
 
+@lru_cache(maxsize=_SERIES_CACHE_SIZE)
+def _npa_summary(
+    npa_field_values: tuple,
+    npa_year_start: int,
+    npa_year_end: int,
+    scattershot_field_values: tuple,
+    start_year: int,
+    end_year: int,
+) -> NpaYearSummary:
+    return NpaYearSummary.from_df(
+        append_scattershot_electrification_df(
+            _npa_projects_df(npa_field_values, npa_year_start, npa_year_end),
+            _scattershot_df(scattershot_field_values, start_year, end_year),
+        )
+    )
+
+
+def clear_series_cache() -> None:
+    """Drop the memoized time series and npa summaries, e.g. to release their memory."""
+    for cached in (_inflated_costs_df, _npa_projects_df, _scattershot_df, _npa_summary):
+        cached.cache_clear()
+
+
+def create_npa_projects(web_params: WebParams, start_year: int, end_year: int) -> pl.DataFrame:
+    return _npa_projects_df(_field_values(web_params, _NPA_PROJECT_FIELDS), start_year, end_year)
+
+
 def create_scattershot_electrification_df(
     web_params: WebParams,
     start_year: int,
@@ -46,64 +123,31 @@ def create_scattershot_electrification_df(
     The projects are distributed evenly across the years. These match the schema for npa projects, but will only
     affect the number of users, not anything related to pipe value or grid upgrades
     """
-    years = range(start_year, end_year + 1)
-    num_years = len(years)
-
-    return pl.DataFrame({
-        "project_year": list(years),
-        "num_converts": [web_params.scattershot_electrification_users_per_year] * num_years,
-    })
+    return _scattershot_df(
+        _field_values(web_params, ["scattershot_electrification_users_per_year"]), start_year, end_year
+    )
 
 
 def create_gas_fixed_overhead_costs(
     web_params: WebParams, start_year: int, end_year: int, cost_inflation_rate: float = 0.0
 ) -> pl.DataFrame:
-    years = list(range(start_year, end_year + 1))
-    base_cost = web_params.gas_fixed_overhead_costs
-
-    # Apply compound inflation: cost * (1 + rate)^(year - start_year)
-    costs = [base_cost * (1 + cost_inflation_rate) ** (year - start_year) for year in years]
-
-    return pl.DataFrame({
-        "year": years,
-        "cost": costs,
-    })
+    return _inflated_costs_df(web_params.gas_fixed_overhead_costs, start_year, end_year, cost_inflation_rate)
 
 
 def create_electric_fixed_overhead_costs(
     web_params: WebParams, start_year: int, end_year: int, cost_inflation_rate: float = 0.0
 ) -> pl.DataFrame:
-    years = list(range(start_year, end_year + 1))
-    base_cost = web_params.electric_fixed_overhead_costs
-
-    # Apply compound inflation: cost * (1 + rate)^(year - start_year)
-    costs = [base_cost * (1 + cost_inflation_rate) ** (year - start_year) for year in years]
-
-    return pl.DataFrame({
-        "year": years,
-        "cost": costs,
-    })
+    return _inflated_costs_df(web_params.electric_fixed_overhead_costs, start_year, end_year, cost_inflation_rate)
 
 
 def create_gas_bau_lpp_costs_per_year(
     web_params: WebParams, start_year: int, end_year: int, cost_inflation_rate: float = 0.0
 ) -> pl.DataFrame:
-    years = list(range(start_year, end_year + 1))
-    base_cost = web_params.gas_bau_lpp_costs_per_year
-
-    # Apply compound inflation: cost * (1 + rate)^(year - start_year)
-    costs = [base_cost * (1 + cost_inflation_rate) ** (year - start_year) for year in years]
-
-    return pl.DataFrame({
-        "year": years,
-        "cost": costs,
-    })
+    return _inflated_costs_df(web_params.gas_bau_lpp_costs_per_year, start_year, end_year, cost_inflation_rate)
 
 
-def create_time_series_from_web_params(
-    web_params: WebParams, start_year: int, end_year: int, cost_inflation_rate: float = 0.0
-) -> dict[str, pl.DataFrame]:
-    """Create all time series DataFrames from web parameters"""
+def _npa_years(web_params: WebParams, start_year: int, end_year: int) -> tuple[int, int]:
+    """First and last year of the npa projects, defaulting to the whole model horizon."""
     npa_year_end = web_params.npa_year_end if web_params.npa_year_end is not None else end_year
     npa_year_start = web_params.npa_year_start if web_params.npa_year_start is not None else start_year
 
@@ -111,6 +155,32 @@ def create_time_series_from_web_params(
         raise ValueError("npa_year_start must be greater than or equal to SharedParams.start_year")
     if npa_year_end > end_year:
         raise ValueError("npa_year_end must be less than or equal to npa_end_year")
+    return npa_year_start, npa_year_end
+
+
+def create_npa_summary(web_params: WebParams, start_year: int, end_year: int) -> NpaYearSummary:
+    """Year-indexed totals of the npa projects with scattershot electrification appended, memoized like the series.
+
+    Pass it to `TimeSeriesParams` as `npa_summary`, along with its `npa_projects`, to skip appending the scattershot
+    electrification again. The summary, and the peak kW increases it memoizes, is shared by every `TimeSeriesParams`
+    built from it.
+    """
+    npa_year_start, npa_year_end = _npa_years(web_params, start_year, end_year)
+    return _npa_summary(
+        _field_values(web_params, _NPA_PROJECT_FIELDS),
+        npa_year_start,
+        npa_year_end,
+        _field_values(web_params, ["scattershot_electrification_users_per_year"]),
+        start_year,
+        end_year,
+    )
+
+
+def create_time_series_from_web_params(
+    web_params: WebParams, start_year: int, end_year: int, cost_inflation_rate: float = 0.0
+) -> dict[str, pl.DataFrame]:
+    """Create all time series DataFrames from web parameters"""
+    npa_year_start, npa_year_end = _npa_years(web_params, start_year, end_year)
 
     return {
         "npa_projects": create_npa_projects(web_params, npa_year_start, npa_year_end),
@@ -127,3 +197,71 @@ def create_time_series_from_web_params(
             web_params, start_year, end_year, cost_inflation_rate
         ),
     }
+
+
+def create_time_series_from_web_params_batch(
+    web_params: Union[list[WebParams], dict[str, WebParams]],
+    start_year: int,
+    end_year: int,
+    cost_inflation_rate: float = 0.0,
+    request_col: str = "request_id",
+) -> dict[str, pl.DataFrame]:
+    """Create the time series DataFrames of many web requests at once, stacked into one frame per series.
+
+    Equivalent to calling `create_time_series_from_web_params` for each request and concatenating the results with
+    a request id column in front, but every series is built with one set of array operations for the whole batch.
+
+    Args:
+        web_params: Web parameters of each request, as a list (ids are the list positions) or keyed by request id
+        start_year: First year of the model horizon, shared by every request
+        end_year: Last year of the model horizon, shared by every request
+        cost_inflation_rate: Rate at which the overhead and lpp costs grow each year
+        request_col: Name of the request id column
+
+    Returns:
+        The same keys as `create_time_series_from_web_params`, each frame holding the rows of every request in order
+    """
+    requests = web_params if isinstance(web_params, dict) else dict(enumerate(web_params))
+    request_ids = list(requests)
+    params = list(requests.values())
+
+    npa_windows = []
+    for request_id, request_params in requests.items():
+        try:
+            npa_windows.append(_npa_years(request_params, start_year, end_year))
+        except ValueError as e:
+            raise ValueError(f"Request {request_id!r}: {e}") from e
+    npa_starts = np.array([window[0] for window in npa_windows], dtype=np.int64)
+    npa_lengths = np.maximum(np.array([window[1] for window in npa_windows], dtype=np.int64) - npa_starts + 1, 0)
+    # position of each npa project row within its request's block of rows
+    npa_offsets = np.arange(npa_lengths.sum()) - np.repeat(np.cumsum(npa_lengths) - npa_lengths, npa_lengths)
+
+    npa_projects = pl.DataFrame({
+        request_col: pl.Series(request_ids).gather(np.repeat(np.arange(len(params)), npa_lengths)),
+        "project_year": np.repeat(npa_starts, npa_lengths) + npa_offsets,
+        **{name: np.repeat(np.array([getattr(p, name) for p in params]), npa_lengths) for name in _NPA_PROJECT_FIELDS},
+    })
+
+    years = _project_years(start_year, end_year)
+    request_rows = pl.Series(request_ids).gather(np.repeat(np.arange(len(params)), len(years)))
+    year_rows = np.tile(years, len(params))
+
+    def per_year(name: str) -> np.ndarray:
+        return np.repeat(np.array([getattr(p, name) for p in params]), len(years))
+
+    inflation_factors = np.tile(_inflation_factors(len(years), cost_inflation_rate), len(params))
+
+    def inflated_costs(name: str) -> pl.DataFrame:
+        return pl.DataFrame({request_col: request_rows, "year": year_rows, "cost": per_year(name) * inflation_factors})
+
+    return {
+        "npa_projects": npa_projects,
+        "scattershot_electrification_users_per_year": pl.DataFrame({
+            request_col: request_rows,
+            "project_year": year_rows,
+            "num_converts": per_year("scattershot_electrification_users_per_year"),
+        }),
+        "gas_fixed_overhead_costs": inflated_costs("gas_fixed_overhead_costs"),
+        "electric_fixed_overhead_costs": inflated_costs("electric_fixed_overhead_costs"),
+        "gas_bau_lpp_costs_per_year": inflated_costs("gas_bau_lpp_costs_per_year"),
+    }
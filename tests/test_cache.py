@@ -0,0 +1,75 @@
+## Switchbox
+## 2026-10-17
+
+import polars as pl
+import pytest
+from attrs import evolve
+from polars.testing import assert_frame_equal
+
+from npa_howtopay import cache
+from npa_howtopay.cache import ResultCache, run_key
+from npa_howtopay.model import compute_bill_costs, run_model
+from npa_howtopay.params import ScenarioParams, load_scenario_from_yaml, load_time_series_params_from_yaml
+
+
+@pytest.fixture
+def run_inputs():
+    return (
+        ScenarioParams(start_year=2025, end_year=2028, bau=True),
+        load_scenario_from_yaml("sample"),
+        load_time_series_params_from_yaml("sample"),
+    )
+
+
+def test_run_key_is_content_addressed(run_inputs):
+    scenario_params, input_params, ts_params = run_inputs
+    key = run_key(*run_inputs)
+    # equal but separately loaded inputs hash the same
+    assert key == run_key(
+        scenario_params, load_scenario_from_yaml("sample"), load_time_series_params_from_yaml("sample")
+    )
+    assert key != run_key(evolve(scenario_params, end_year=2029), input_params, ts_params)
+    assert key != run_key(scenario_params, evolve(input_params, gas=evolve(input_params.gas, ror=0.09)), ts_params)
+    changed_costs = ts_params.gas_fixed_overhead_costs.with_columns(pl.col("cost") * 2)
+    assert key != run_key(scenario_params, input_params, evolve(ts_params, gas_fixed_overhead_costs=changed_costs))
+
+
+def test_result_cache_lru(run_inputs):
+    scenario_params, input_params, ts_params = run_inputs
+    result_cache = ResultCache(max_entries=1)
+    first = result_cache.run_model(*run_inputs)
+    assert_frame_equal(first, run_model(*run_inputs))
+    assert (result_cache.hits, result_cache.misses) == (0, 1)
+
+    assert_frame_equal(result_cache.run_model(*run_inputs), first)
+    assert (result_cache.hits, result_cache.misses) == (1, 1)
+
+    # a second distinct run evicts the first
+    result_cache.run_model(evolve(scenario_params, end_year=2027), input_params, ts_params)
+    assert len(result_cache) == 1
+    assert result_cache.get(run_key(*run_inputs)) is None
+
+
+def test_result_cache_disk_tier(run_inputs, tmp_path, monkeypatch):
+    first = ResultCache(cache_dir=str(tmp_path)).run_model(*run_inputs)
+
+    # a fresh cache (e.g. another process) reads the result back from disk
+    other_cache = ResultCache(cache_dir=str(tmp_path))
+    assert_frame_equal(other_cache.get(run_key(*run_inputs)), first)
+    assert other_cache.hits == 1
+
+    # a new package version doesn't see entries written by the old one
+    monkeypatch.setattr(cache, "__version__", "999.0.0")
+    upgraded_cache = ResultCache(cache_dir=str(tmp_path))
+    assert upgraded_cache.get(run_key(*run_inputs)) is None
+
+
+def test_result_cache_pre_bill_entries(run_inputs):
+    input_params = run_inputs[1]
+    result_cache = ResultCache()
+    pre_bill = result_cache.run_model_pre_bill(*run_inputs)
+    assert "gas_variable_tariff_per_therm" not in pre_bill.columns
+    assert_frame_equal(compute_bill_costs(pre_bill, input_params), result_cache.run_model(*run_inputs))
+    assert (result_cache.hits, result_cache.misses, len(result_cache)) == (0, 2, 2)
+    assert_frame_equal(result_cache.run_model_pre_bill(*run_inputs), pre_bill)
+    assert result_cache.hits == 1
@@ -7,7 +7,12 @@ import pytest
 from polars.testing import assert_frame_equal
 
 from src.npa_howtopay.capex_project import (
+    CapexAccumulator,
+    CapexLedger,
+    CapexProject,
+    SyntheticBlock,
     compute_depreciation_expense_from_capex_projects,
+    compute_maintanence_costs,
     compute_ratebase_from_capex_projects,
     get_grid_upgrade_capex_projects,
     get_lpp_gas_capex_projects,
@@ -15,6 +20,8 @@ from src.npa_howtopay.capex_project import (
     get_non_npa_electric_capex_projects,
     get_npa_capex_projects,
     get_synthetic_initial_capex_projects,
+    return_empty_capex_df,
+    solve_misc_capex_costs,
 )
 from src.npa_howtopay.npa_project import NpaProject
 
@@ -196,3 +203,155 @@ def test_compute_depreciation_expense_from_capex_projects():
         for year in [2025, 2026, 2027, 2028, 2045, 2046, 2047]
     ]
     assert np.isclose(depreciations, [0, 100, 150, 250, 50, 50, 0]).all()
+
+
+# LEDGER TESTS
+def test_capex_ledger_matches_concat():
+    synthetic = get_synthetic_initial_capex_projects(start_year=2025, initial_ratebase=6000, depreciation_lifetime=3)
+    vintages = [
+        get_non_lpp_gas_capex_projects(
+            year=year,
+            current_ratebase=1000,
+            baseline_non_lpp_gas_ratebase_growth=0.015,
+            depreciation_lifetime=60,
+            construction_inflation_rate=0.02,
+        )
+        for year in range(2025, 2030)
+    ]
+    # start with a tiny capacity to exercise regrowth
+    ledger = CapexLedger.from_df(synthetic, capacity=1)
+    for vintage in vintages:
+        ledger.extend(vintage)
+    ledger.append(2030, "npa", 500.0, 10)
+
+    ref_df = pl.concat([synthetic, *vintages, CapexProject(2030, "npa", 500.0, 10).to_df()], how="vertical")
+    assert len(ledger) == 9
+    assert_frame_equal(ref_df, ledger.to_df(), check_dtypes=False)
+    assert ledger.to_df().schema == return_empty_capex_df().schema
+
+
+def test_capex_accumulator_matches_reference():
+    projects = pl.concat(
+        [
+            get_synthetic_initial_capex_projects(start_year=2025, initial_ratebase=6000, depreciation_lifetime=5),
+            CapexProject(2026, "misc", 1000.0, 3).to_df(),
+            CapexProject(2027, "npa", 800.0, 2).to_df(),
+            CapexProject(2031, "pipeline", 500.0, 4).to_df(),
+        ],
+        how="vertical",
+    )
+    totals = CapexAccumulator(year=2025)
+    totals.extend(projects)
+    for year in range(2025, 2040):
+        totals.advance_to(year)
+        assert np.isclose(totals.ratebase, compute_ratebase_from_capex_projects(year, projects), atol=1e-9)
+        assert np.isclose(
+            totals.depreciation_expense, compute_depreciation_expense_from_capex_projects(year, projects), atol=1e-9
+        )
+        assert np.isclose(totals.maintenance_costs(0.02), compute_maintanence_costs(year, projects, 0.02), atol=1e-9)
+
+    # projects can also be added for the current year after the totals have been advanced
+    totals.add(2039, "misc", 100.0, 10)
+    assert np.isclose(totals.ratebase, 100.0)
+    with pytest.raises(ValueError):
+        totals.advance_to(2038)
+
+
+def test_capex_ledger_schedules_match_reference():
+    projects = pl.concat(
+        [
+            get_synthetic_initial_capex_projects(start_year=2025, initial_ratebase=6000, depreciation_lifetime=5),
+            CapexProject(2026, "misc", 1000.0, 3).to_df(),
+            CapexProject(2027, "npa", 800.0, 2).to_df(),
+        ],
+        how="vertical",
+    )
+    ledger = CapexLedger.from_df(projects)
+    ledger.extend_arrays(np.array([2031, 2032]), "pipeline", np.array([500.0, 250.0]), 4)
+    projects = ledger.to_df()
+
+    years = np.arange(2020, 2040)
+    ratebase, depreciation, maintenance_base = ledger.schedules(years)
+    for i, year in enumerate(years.tolist()):
+        assert np.isclose(ratebase[i], compute_ratebase_from_capex_projects(year, projects))
+        assert np.isclose(depreciation[i], compute_depreciation_expense_from_capex_projects(year, projects))
+        assert np.isclose(maintenance_base[i] * 0.02, compute_maintanence_costs(year, projects, 0.02))
+
+
+@pytest.mark.parametrize("depreciation_lifetime", [1, 5, 65])
+def test_synthetic_block_matches_expanded_projects(depreciation_lifetime):
+    block = SyntheticBlock.from_initial_ratebase(2025, 6000, depreciation_lifetime)
+    expanded = CapexLedger.from_df(block.to_df())
+    assert_frame_equal(block.to_df(), get_synthetic_initial_capex_projects(2025, 6000, depreciation_lifetime))
+
+    ledger = CapexLedger(totals=CapexAccumulator(year=2025))
+    ledger.add_synthetic_block(block)
+    ledger.append(2027, "misc", 1000.0, 3)
+    assert len(ledger) == depreciation_lifetime + 1
+    assert ledger.to_df()["project_type"].to_list() == ["synthetic_initial"] * depreciation_lifetime + ["misc"]
+
+    years = np.arange(2025 - depreciation_lifetime - 2, 2025 + depreciation_lifetime + 3)
+    block_schedules = block.schedules(years)
+    for actual, expected in zip(block_schedules, expanded.schedules(years)):
+        np.testing.assert_allclose(actual, expected, rtol=1e-12, atol=1e-9)
+    assert np.isclose(block_schedules[0][years == 2025].item(), 6000)
+
+    ratebase, _, _ = ledger.schedules(years)
+    np.testing.assert_allclose(ratebase, CapexLedger.from_df(ledger.to_df()).schedules(years)[0], rtol=1e-12)
+    assert np.isclose(ledger.totals.ratebase, 6000)
+
+
+def test_capex_ledger_merges_cohorts_and_prunes_retired_rows():
+    plain = CapexLedger()
+    merged = CapexLedger(capacity=1, totals=CapexAccumulator(year=2025), merge_cohorts=True)
+    for ledger in (plain, merged):
+        for year in range(2025, 2125):
+            ledger.append(year, "misc", 100.0 + year, 4)
+            ledger.append(year, "misc", 5.0, 4)  # same cohort as the first misc project
+            ledger.append(year, "pipeline", 50.0, 4)  # another type, so another cohort
+            ledger.append(year, "npa", 20.0, 4)
+            ledger.extend_arrays(np.array([year]), "grid_upgrade", np.array([10.0]), 6)
+    assert len(plain) == 500
+    assert len(merged) == 400
+    # merged cohorts keep their project type
+    costs_by_type = lambda ledger: ledger.to_df().group_by("project_type").agg(pl.col("original_cost").sum())
+    assert_frame_equal(costs_by_type(merged), costs_by_type(plain), check_row_order=False)
+
+    years = np.arange(2025, 2130)
+    for actual, expected in zip(merged.schedules(years), plain.schedules(years)):
+        np.testing.assert_allclose(actual, expected, rtol=1e-12)
+
+    # the lifetime 4 cohorts retire in project_year + 4 and the grid upgrades in project_year + 6
+    assert merged.prune_retired(2120) == 3 * (2116 - 2025) + (2114 - 2025)
+    later_years = np.arange(2120, 2130)
+    for actual, expected in zip(merged.schedules(later_years), plain.schedules(later_years)):
+        np.testing.assert_allclose(actual, expected, rtol=1e-12)
+    assert merged.prune_retired(2120) == 0
+
+    # cohorts are still merged after pruning
+    merged.append(2124, "misc", 1.0, 4)
+    assert len(merged) == 3 * (2125 - 2116) + (2125 - 2114)
+    merged.totals.advance_to(2124)
+    np.testing.assert_allclose(merged.schedules(np.array([2124]))[0], merged.totals.ratebase)
+
+
+def test_solve_misc_capex_costs_matches_yearly_recurrence():
+    exogenous = get_synthetic_initial_capex_projects(start_year=2025, initial_ratebase=6000, depreciation_lifetime=5)
+    years = np.arange(2025, 2040)
+    costs = solve_misc_capex_costs(
+        years,
+        CapexLedger.from_df(exogenous).schedules(years)[0],
+        ratebase_init=6000,
+        baseline_ratebase_growth=0.05,
+        depreciation_lifetime=4,
+        construction_inflation_rate=0.02,
+    )
+
+    # step through the years the way run_model does
+    ratebase = 6000.0
+    projects = exogenous
+    for i, year in enumerate(years.tolist()):
+        vintage = get_non_lpp_gas_capex_projects(year, ratebase, 0.05, 4, 0.02)
+        assert np.isclose(costs[i], vintage["original_cost"].item())
+        projects = pl.concat([projects, vintage], how="vertical")
+        ratebase = compute_ratebase_from_capex_projects(year, projects)
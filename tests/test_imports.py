@@ -0,0 +1,18 @@
+## Switchbox
+## 2026-10-17
+
+import subprocess
+import sys
+
+
+def test_package_import_skips_plotting_and_yaml():
+    code = (
+        "import sys, npa_howtopay; "
+        "print(any(m in sys.modules for m in ('matplotlib', 'ruamel.yaml', 'npa_howtopay.utils'))); "
+        "npa_howtopay.utils.plot_ratebase; "
+        "print('matplotlib' in sys.modules)"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)  # noqa: S603
+    out = proc.stdout.split()
+    # nothing heavy on import, and utils only loads matplotlib once a plot is drawn
+    assert out == ["False", "False"]
@@ -1,14 +1,28 @@
+import shutil
+import weakref
+from pathlib import Path
+
 import numpy as np
 import polars as pl
 import pytest
 from polars.testing import assert_frame_equal
 
+from npa_howtopay import params
 from npa_howtopay.params import (
+    AllocationShares,
     ScenarioParams,
+    load_all_runs,
     load_scenario_from_yaml,
     load_time_series_params_from_web_params,
     load_time_series_params_from_yaml,
 )
+from npa_howtopay.web_params import (
+    WebParams,
+    clear_series_cache,
+    create_npa_projects,
+    create_time_series_from_web_params,
+    create_time_series_from_web_params_batch,
+)
 
 
 @pytest.fixture
@@ -156,6 +170,54 @@ def test_load_web_params_with_inflation(
     assert params.npa_projects.equals(expected_npa_projects)
 
 
+def test_web_params_batch_matches_per_request(web_params):
+    requests = {
+        "base": WebParams(**web_params),
+        "scattershot": WebParams(**{**web_params, "is_scattershot": True, "gas_bau_lpp_costs_per_year": 250.0}),
+        "no_projects": WebParams(**{**web_params, "npa_num_projects": 0, "num_converts": 0}),
+    }
+    batch = create_time_series_from_web_params_batch(requests, 2025, 2040, cost_inflation_rate=0.05)
+    for name, df in batch.items():
+        expected = pl.concat([
+            create_time_series_from_web_params(params, 2025, 2040, cost_inflation_rate=0.05)[name].select(
+                pl.lit(request_id).alias("request_id"), pl.all()
+            )
+            for request_id, params in requests.items()
+        ])
+        assert_frame_equal(df, expected)
+
+
+def test_web_params_series_are_memoized(web_params):
+    clear_series_cache()
+    first = create_time_series_from_web_params(WebParams(**web_params), 2025, 2040, cost_inflation_rate=0.05)
+    edited = WebParams(**{**web_params, "gas_fixed_overhead_costs": 150.0})
+    second = create_time_series_from_web_params(edited, 2025, 2040, cost_inflation_rate=0.05)
+    for name in first:
+        assert (second[name] is first[name]) == (name != "gas_fixed_overhead_costs")
+    assert second["gas_fixed_overhead_costs"]["cost"][0] == 150.0
+
+    # equal values of another type still make their own column dtype
+    float_converts = WebParams(**{**web_params, "num_converts": 100.0})
+    assert create_npa_projects(float_converts, 2025, 2030)["num_converts"].dtype == pl.Float64
+    assert create_npa_projects(WebParams(**web_params), 2025, 2030)["num_converts"].dtype == pl.Int64
+
+    # unchanged npa and scattershot series also reuse the appended projects and their summary
+    ts_params = load_time_series_params_from_web_params(web_params, 2025, 2040)
+    edited_params = load_time_series_params_from_web_params(
+        {**web_params, "gas_bau_lpp_costs_per_year": 1.0}, 2025, 2040
+    )
+    assert edited_params.npa_summary is ts_params.npa_summary
+    assert edited_params.npa_projects is ts_params.npa_projects
+
+
+def test_clear_series_cache_releases_npa_summaries(web_params):
+    load_time_series_params_from_web_params(web_params, 2025, 2040)
+    # the cached summary keeps the memoized npa projects frame it was built from alive
+    npa_projects = weakref.ref(create_npa_projects(WebParams(**web_params), 2025, 2040))
+    clear_series_cache()
+    assert npa_projects() is None
+
+
 def test_load_time_series_params_from_yaml():
     """Test loading the time series params from yaml"""
     params = load_time_series_params_from_yaml("sample")
@@ -215,3 +277,58 @@ def test_scenario_params_validation():
 
     with pytest.raises(ValueError, match="capex_opex must be set when bau=False and taxpayer=False"):
         ScenarioParams(2025, 2050, gas_electric="gas")
+
+
+def test_allocation_shares():
+    shares = AllocationShares(gas_capex=[0.3, 0.0], electric_opex=0.5)
+    assert len(shares) == 2
+    np.testing.assert_allclose(shares.electric_opex, [0.5, 0.5])
+    np.testing.assert_allclose(shares.taxpayer, [0.2, 0.5])
+    assert shares.to_df().columns == [
+        "gas_capex_share",
+        "gas_opex_share",
+        "electric_capex_share",
+        "electric_opex_share",
+        "taxpayer_share",
+    ]
+
+    grid = AllocationShares.grid([0.0, 0.5, 1.0], [0.25, 1.0], taxpayer_share=0.2)
+    assert len(grid) == 6
+    np.testing.assert_allclose(grid.taxpayer, 0.2)
+    np.testing.assert_allclose(grid.gas_capex, 0.8 * np.array([0, 0, 0.125, 0.5, 0.25, 1.0]))
+
+    with pytest.raises(ValueError, match="between 0 and 1"):
+        AllocationShares(gas_opex=-0.1)
+    with pytest.raises(ValueError, match="at most 1"):
+        AllocationShares(gas_capex=0.6, electric_capex=0.6)
+
+
+@pytest.mark.parametrize("executor", ["serial", "thread", "process"])
+def test_load_all_runs_reports_bad_files(tmp_path, executor):
+    sample_yaml = Path(__file__).parents[1] / "src" / "npa_howtopay" / "data" / "sample.yaml"
+    for name in ("territory_a", "territory_b"):
+        shutil.copy(sample_yaml, tmp_path / f"{name}.yaml")
+    (tmp_path / "broken.yaml").write_text("gas: [1, 2\n")
+    (tmp_path / "incomplete.yaml").write_text(sample_yaml.read_text().replace("  ror: 0.08  # gas utility", "  # "))
+
+    result = load_all_runs(str(tmp_path), executor=executor, max_workers=2)
+    assert list(result.runs) == ["territory_a", "territory_b"]
+    input_params, ts_params = result.runs["territory_a"]
+    assert input_params == load_scenario_from_yaml("sample")
+    assert_frame_equal(ts_params.npa_projects, load_time_series_params_from_yaml("sample").npa_projects)
+    assert list(result.errors) == ["broken", "incomplete"]
+    assert result.errors["broken"].startswith("ParserError")
+    assert "ror" in result.errors["incomplete"]
+
+
+def test_load_all_runs_propagates_unexpected_errors(tmp_path, monkeypatch):
+    sample_yaml = Path(__file__).parents[1] / "src" / "npa_howtopay" / "data" / "sample.yaml"
+    shutil.copy(sample_yaml, tmp_path / "territory_a.yaml")
+
+    def buggy_load(yaml_path, snapshot_dir):
+        raise RuntimeError("bug")
+
+    # only read, parse and validation errors are reported per file
+    monkeypatch.setattr(params, "_load_run_file", buggy_load)
+    with pytest.raises(RuntimeError, match="bug"):
+        load_all_runs(str(tmp_path), executor="serial")
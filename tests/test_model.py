@@ -0,0 +1,402 @@
+## Switchbox
+## 2026-10-17
+
+import os
+
+import numpy as np
+import polars as pl
+import pytest
+from attrs import evolve
+from polars.testing import assert_frame_equal
+
+from npa_howtopay import capex_project as cp
+from npa_howtopay.model import (
+    BillStageParams,
+    ModelState,
+    ScenarioBranch,
+    YearBuffer,
+    YearContext,
+    compute_bill_costs,
+    compute_bill_costs_batch,
+    compute_bill_costs_variants,
+    create_scenario_runs,
+    iter_all_scenarios,
+    run_all_scenarios,
+    run_allocation_grid,
+    run_model,
+    run_model_pre_bill,
+    run_scenario_tree,
+)
+from npa_howtopay.params import (
+    COMPARE_COLS,
+    AllocationScenarioParams,
+    AllocationShares,
+    ScenarioParams,
+    load_scenario_from_yaml,
+    load_time_series_params_from_web_params,
+    load_time_series_params_from_yaml,
+)
+
+
+@pytest.fixture
+def input_params():
+    return load_scenario_from_yaml("sample")
+
+
+@pytest.fixture
+def pre_bill_df():
+    """Minimal per-year frame with the columns compute_bill_costs reads."""
+    return pl.DataFrame({
+        "year": [2025, 2026, 2027],
+        "gas_ratebase": [1000.0, 1100.0, 1200.0],
+        "electric_ratebase": [2000.0, 2100.0, 2200.0],
+        "gas_revenue_requirement": [1.0e9, 1.1e9, 1.2e9],
+        "electric_revenue_requirement": [2.0e9, 2.1e9, 2.2e9],
+        "gas_num_users": [1.0e6, 0.99e6, 0.98e6],
+        "electric_num_users": [1.5e6, 1.5e6, 1.5e6],
+        "total_gas_usage_therms": [8.0e8, 7.92e8, 7.84e8],
+        "total_electric_usage_kwh": [1.5e10, 1.51e10, 1.52e10],
+    })
+
+
+def test_compute_bill_costs(pre_bill_df, input_params):
+    df = compute_bill_costs(pre_bill_df, input_params)
+    rate = input_params.shared.real_dollar_discount_rate
+    expected_gas_rr = np.array([1.0e9, 1.1e9 / (1 + rate), 1.2e9 / (1 + rate) ** 2])
+    assert np.allclose(df["gas_inflation_adjusted_revenue_requirement"].to_numpy(), expected_gas_rr)
+    expected_tariff = (
+        expected_gas_rr - input_params.gas.num_users_init * input_params.gas.user_bill_fixed_charge
+    ) / pre_bill_df["total_gas_usage_therms"].to_numpy()
+    assert np.allclose(df["gas_variable_tariff_per_therm"].to_numpy(), expected_tariff)
+    assert np.allclose(
+        df["nonconverts_total_bill_per_user"].to_numpy(),
+        (df["gas_nonconverts_bill_per_user"] + df["electric_nonconverts_bill_per_user"]).to_numpy(),
+    )
+
+
+def test_compute_bill_costs_batch_matches_per_scenario(pre_bill_df, input_params):
+    other_params = evolve(input_params, gas=evolve(input_params.gas, user_bill_fixed_charge=300))
+    # the second scenario starts a year later, so it is discounted from its own first year
+    stacked = pl.concat(
+        [
+            pre_bill_df.with_columns(pl.lit("a").alias("scenario_id")),
+            pre_bill_df.filter(pl.col("year") > 2025).with_columns(pl.lit("b").alias("scenario_id")),
+        ],
+        how="vertical",
+    )
+    batch = compute_bill_costs_batch(stacked, {"a": input_params, "b": other_params})
+    expected = pl.concat(
+        [
+            compute_bill_costs(pre_bill_df, input_params).with_columns(pl.lit("a").alias("scenario_id")),
+            compute_bill_costs(pre_bill_df.filter(pl.col("year") > 2025), other_params).with_columns(
+                pl.lit("b").alias("scenario_id")
+            ),
+        ],
+        how="vertical",
+    )
+    assert_frame_equal(batch.select(expected.columns), expected, check_dtypes=False)
+
+    with pytest.raises(ValueError, match="No input params"):
+        compute_bill_costs_batch(stacked, {"a": input_params})
+    with pytest.raises(ValueError, match="at least one scenario"):
+        compute_bill_costs_batch(stacked, {})
+
+
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+def test_run_model_does_not_materialize_capex_ledgers(input_params, engine, monkeypatch):
+    """Yearly totals come from the ledgers' running totals and schedules, never from a per-year `to_df`."""
+    calls = []
+    to_df = cp.CapexLedger.to_df
+    monkeypatch.setattr(cp.CapexLedger, "to_df", lambda self: calls.append(len(self)) or to_df(self))
+    ts_params = load_time_series_params_from_yaml("sample")
+    for end_year in (2030, 2050):
+        for scenario_params in (
+            ScenarioParams(2025, end_year, bau=True),
+            ScenarioParams(2025, end_year, gas_electric="gas", capex_opex="capex"),
+        ):
+            run_model(scenario_params, input_params, ts_params, engine)
+    assert calls == []
+
+
+def test_year_buffer_collects_contexts_into_arrays():
+    buffer = YearBuffer(start_year=2025, num_years=3)
+    for i, year in enumerate(range(2025, 2028)):
+        buffer.write(
+            YearContext(
+                year=year,
+                gas_ratebase=100.0 * i,
+                electric_ratebase=200.0 * i,
+                gas_depreciation_expense=1.0,
+                electric_depreciation_expense=2.0,
+                gas_maintenance_cost=3.0,
+                electric_maintenance_cost=4.0,
+                gas_npa_opex=0,
+                electric_npa_opex=5.0 * i,
+                gas_performance_incentive=6.0,
+            )
+        )
+    context = buffer.context()
+    np.testing.assert_array_equal(context.year, [2025, 2026, 2027])
+    np.testing.assert_array_equal(context.gas_ratebase, [0.0, 100.0, 200.0])
+    np.testing.assert_array_equal(context.electric_npa_opex, [0.0, 5.0, 10.0])
+    assert context.gas_npa_opex.dtype == np.float64
+
+
+def test_run_all_scenarios_process_executor_matches_serial(input_params):
+    scenario_runs = create_scenario_runs(2025, 2030, ["gas", "electric"], ["capex"])
+    ts_params = load_time_series_params_from_yaml("sample")
+    serial = run_all_scenarios(scenario_runs, input_params, ts_params)
+    parallel = run_all_scenarios(scenario_runs, input_params, ts_params, executor="process", max_workers=2)
+    assert list(parallel) == list(scenario_runs)
+    for scenario_name, df in serial.items():
+        assert_frame_equal(parallel[scenario_name], df)
+
+    with pytest.raises(ValueError, match="Unknown executor"):
+        run_all_scenarios(scenario_runs, input_params, ts_params, executor="threads")
+    with pytest.raises(ValueError, match="Unknown engine"):
+        run_all_scenarios(scenario_runs, input_params, ts_params, executor="process", engine="compiled")
+
+
+def test_iter_all_scenarios_process_executor_streams_deduplicated_chunks(input_params, monkeypatch):
+    scenario_runs = create_scenario_runs(2025, 2030, ["gas", "electric"], ["capex", "opex"])
+    ts_params = load_time_series_params_from_yaml("sample")
+    serial = run_all_scenarios(scenario_runs, input_params, ts_params, deduplicate=False)
+    monkeypatch.delenv("POLARS_MAX_THREADS", raising=False)
+    stream = iter_all_scenarios(scenario_runs, input_params, ts_params, executor="process", max_workers=2)
+    for (scenario_name, df), expected_name in zip(stream, scenario_runs):
+        # the workers' thread limit isn't left in this process's environment while results are consumed
+        assert "POLARS_MAX_THREADS" not in os.environ
+        assert scenario_name == expected_name
+        assert_frame_equal(df, serial[scenario_name])
+
+
+@pytest.mark.parametrize("ts_source", ["yaml", "web"])
+def test_vectorized_engine_matches_loop(input_params, ts_source):
+    if ts_source == "yaml":
+        ts_params = load_time_series_params_from_yaml("sample")
+    else:
+        web_params = {
+            "npa_num_projects": 10,
+            "num_converts": 100,
+            "pipe_value_per_user": 1000.0,
+            "pipe_decomm_cost_per_user": 100.0,
+            "peak_kw_winter_headroom": 10.0,
+            "peak_kw_summer_headroom": 10.0,
+            "aircon_percent_adoption_pre_npa": 0.8,
+            "scattershot_electrification_users_per_year": 5,
+            "gas_fixed_overhead_costs": 100.0,
+            "electric_fixed_overhead_costs": 100.0,
+            "gas_bau_lpp_costs_per_year": 100.0,
+            "npa_year_start": 2025,
+            "npa_year_end": 2030,
+            "is_scattershot": False,
+        }
+        ts_params = load_time_series_params_from_web_params(web_params, 2025, 2050, 0.02)
+
+    for scenario_params in create_scenario_runs(2025, 2050, ["gas", "electric"], ["capex", "opex"]).values():
+        assert_frame_equal(
+            run_model(scenario_params, input_params, ts_params, engine="vectorized"),
+            run_model(scenario_params, input_params, ts_params),
+            rel_tol=1e-9,
+            abs_tol=1e-6,
+        )
+
+    with pytest.raises(ValueError, match="Unknown engine"):
+        run_model(scenario_params, input_params, ts_params, engine="matrix")
+
+
+def test_scenario_tree_matches_switching_runs(input_params):
+    ts_params = load_time_series_params_from_yaml("sample")
+    start_year, end_year = input_params.shared.start_year, input_params.shared.start_year + 12
+    gas_opex = ScenarioParams(start_year, end_year, gas_electric="gas", capex_opex="opex")
+    electric_capex = ScenarioParams(
+        start_year, end_year, gas_electric="electric", capex_opex="capex", performance_incentive=True
+    )
+    gas_capex = ScenarioParams(start_year, end_year, gas_electric="gas", capex_opex="capex")
+    branches = {
+        "electric_capex_from_start": ScenarioBranch(start_year, electric_capex),
+        "electric_capex_from_5": ScenarioBranch(
+            start_year + 5, electric_capex, {"gas_capex_from_8": ScenarioBranch(start_year + 8, gas_capex)}
+        ),
+        "electric_capex_at_end": ScenarioBranch(end_year, electric_capex),
+    }
+    results = run_scenario_tree(gas_opex, branches, input_params, ts_params, trunk_name="gas_opex")
+    assert list(results) == [
+        "gas_opex",
+        "electric_capex_from_start",
+        "electric_capex_from_5",
+        "gas_capex_from_8",
+        "electric_capex_at_end",
+    ]
+
+    assert_frame_equal(results["gas_opex"], run_model(gas_opex, input_params, ts_params))
+    assert_frame_equal(results["electric_capex_from_start"], run_model(electric_capex, input_params, ts_params))
+    assert_frame_equal(results["electric_capex_at_end"], results["gas_opex"])
+
+    # step a single state through the same policy switches
+    state = ModelState.initial(gas_opex, input_params)
+    while state.year < end_year:
+        if state.year < start_year + 5:
+            scenario_params = gas_opex
+        elif state.year < start_year + 8:
+            scenario_params = electric_capex
+        else:
+            scenario_params = gas_capex
+        state.step(scenario_params, input_params, ts_params)
+    assert_frame_equal(results["gas_capex_from_8"], state.results(input_params, ts_params))
+
+
+def test_model_state_merge_cohorts_matches_plain_ledgers(input_params):
+    ts_params = load_time_series_params_from_yaml("sample")
+    scenario_params = ScenarioParams(2025, 2050, gas_electric="electric", capex_opex="capex")
+    plain = ModelState.initial(scenario_params, input_params)
+    merged = ModelState.initial(scenario_params, input_params, merge_cohorts=True)
+    for state in (plain, merged):
+        while state.year < scenario_params.end_year:
+            state.step(scenario_params, input_params, ts_params)
+    assert not plain.gas_capex_projects.merge_cohorts
+    assert merged.electric_capex_projects.merge_cohorts
+    assert_frame_equal(merged.results(input_params, ts_params), plain.results(input_params, ts_params))
+
+
+def test_model_state_snapshot_is_independent(input_params):
+    ts_params = load_time_series_params_from_yaml("sample")
+    scenario_params = ScenarioParams(2025, 2035, gas_electric="gas", capex_opex="capex")
+    state = ModelState.initial(scenario_params, input_params)
+    for _ in range(3):
+        state.step(scenario_params, input_params, ts_params)
+    snapshot = state.snapshot()
+    while state.year < 2035:
+        state.step(scenario_params, input_params, ts_params)
+    assert snapshot.year == 2028
+    assert snapshot.gas_capex_projects.totals.year == 2027
+    while snapshot.year < 2035:
+        snapshot.step(scenario_params, input_params, ts_params)
+    assert_frame_equal(snapshot.results(input_params, ts_params), state.results(input_params, ts_params))
+
+
+def test_scenario_tree_rejects_invalid_branches(input_params):
+    ts_params = load_time_series_params_from_yaml("sample")
+    trunk = ScenarioParams(2025, 2035, gas_electric="gas", capex_opex="opex")
+    electric_capex = ScenarioParams(2025, 2035, gas_electric="electric", capex_opex="capex")
+    with pytest.raises(ValueError, match="switches in"):
+        run_scenario_tree(trunk, {"late": ScenarioBranch(2036, electric_capex)}, input_params, ts_params)
+    with pytest.raises(ValueError, match="switches in"):
+        nested = {"child": ScenarioBranch(2028, trunk)}
+        run_scenario_tree(trunk, {"parent": ScenarioBranch(2030, electric_capex, nested)}, input_params, ts_params)
+    with pytest.raises(ValueError, match="more than once"):
+        run_scenario_tree(trunk, {"trunk": ScenarioBranch(2030, electric_capex)}, input_params, ts_params)
+    with pytest.raises(ValueError, match="bau"):
+        bau = ScenarioParams(2025, 2035, bau=True)
+        run_scenario_tree(trunk, {"bau": ScenarioBranch(2030, bau)}, input_params, ts_params)
+
+
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+def test_run_all_scenarios_deduplicated_matches_run_model(input_params, engine):
+    ts_params = load_time_series_params_from_yaml("sample")
+    scenario_runs = create_scenario_runs(2025, 2040, ["gas", "electric"], ["capex", "opex"])
+    deduplicated = run_all_scenarios(scenario_runs, input_params, ts_params, engine=engine)
+    separate = run_all_scenarios(scenario_runs, input_params, ts_params, engine=engine, deduplicate=False)
+    assert list(deduplicated) == list(scenario_runs)
+    for scenario_name, scenario_params in scenario_runs.items():
+        assert_frame_equal(deduplicated[scenario_name], separate[scenario_name], check_exact=engine == "loop")
+        assert_frame_equal(deduplicated[scenario_name], run_model(scenario_params, input_params, ts_params, engine))
+
+
+def test_allocation_grid_matches_discrete_scenarios(input_params):
+    ts_params = load_time_series_params_from_yaml("sample")
+    scenario_runs = create_scenario_runs(2025, 2040, ["gas", "electric"], ["capex", "opex"])
+    corners = ["gas_capex", "gas_opex", "electric_capex", "electric_opex", "taxpayer"]
+    shares = AllocationShares(**{
+        option: [float(name == option) for name in corners] + [0.25] for option in corners if option != "taxpayer"
+    })
+    results = run_allocation_grid(AllocationScenarioParams(2025, 2040, shares), input_params, ts_params)
+    assert results.height == len(shares) * 15
+    for allocation_id, scenario_name in enumerate(corners):
+        expected = run_model(scenario_runs[scenario_name], input_params, ts_params)
+        assert_frame_equal(results.filter(allocation_id=allocation_id).select(expected.columns), expected)
+
+    # revenue requirements are linear in the shares, so an even split is the mean of the corners
+    revenue_requirements = results.group_by("allocation_id", maintain_order=True).agg(
+        pl.col("gas_revenue_requirement", "electric_revenue_requirement").sum()
+    )
+    corners_mean = revenue_requirements.head(4).mean()
+    even_split = revenue_requirements.filter(allocation_id=5)
+    for col in ("gas_revenue_requirement", "electric_revenue_requirement"):
+        assert np.isclose(even_split[col].item(), corners_mean[col].item())
+
+    incentive = run_allocation_grid(
+        AllocationScenarioParams(2025, 2040, AllocationShares(gas_opex=1.0), performance_incentive=True),
+        input_params,
+        ts_params,
+        engine="vectorized",
+    )
+    expected = run_model(scenario_runs["performance_incentive"], input_params, ts_params)
+    assert_frame_equal(incentive.select(expected.columns), expected)
+
+
+@pytest.mark.parametrize("scenario", ["electric_capex", "performance_incentive"])
+def test_compute_bill_costs_variants_matches_rerunning_model(input_params, scenario):
+    ts_params = load_time_series_params_from_yaml("sample")
+    scenario_params = create_scenario_runs(2025, 2040, ["gas", "electric"], ["capex", "opex"])[scenario]
+    pre_bill = run_model_pre_bill(scenario_params, input_params, ts_params)
+    assert_frame_equal(compute_bill_costs(pre_bill, input_params), run_model(scenario_params, input_params, ts_params))
+
+    # tariff-only variants and variants that change usage
+    variant_values = [
+        {"electric_user_bill_fixed_charge": 12.5, "real_dollar_discount_rate": 0.03},
+        {"hp_efficiency": 2.0, "water_heater_efficiency": 1.5},
+        {"per_user_heating_need_therms": 400.0, "per_user_water_heating_need_therms": 100.0},
+        {"gas_num_users_init": 250_000, "electric_num_users_init": 400_000, "per_user_electric_need_kwh": 9000.0},
+    ]
+    names = sorted({name for values in variant_values for name in values})
+    base = BillStageParams.from_input_params(input_params)
+    bill_params = BillStageParams.from_input_params(
+        input_params,
+        **{name: [values.get(name, getattr(base, name)[0]) for values in variant_values] for name in names},
+    )
+    assert len(bill_params) == len(variant_values)
+    results = compute_bill_costs_variants(pre_bill, bill_params, input_params)
+    assert results.height == len(variant_values) * pre_bill.height
+
+    input_fields = {
+        "real_dollar_discount_rate": ("shared", "real_dollar_discount_rate"),
+        "electric_user_bill_fixed_charge": ("electric", "user_bill_fixed_charge"),
+        "hp_efficiency": ("electric", "hp_efficiency"),
+        "water_heater_efficiency": ("electric", "water_heater_efficiency"),
+        "per_user_heating_need_therms": ("gas", "per_user_heating_need_therms"),
+        "per_user_water_heating_need_therms": ("gas", "per_user_water_heating_need_therms"),
+        "gas_num_users_init": ("gas", "num_users_init"),
+        "electric_num_users_init": ("electric", "num_users_init"),
+        "per_user_electric_need_kwh": ("electric", "per_user_electric_need_kwh"),
+    }
+    for variant_id, values in enumerate(variant_values):
+        variant_params = input_params
+        for name, value in values.items():
+            section, field_name = input_fields[name]
+            section_params = evolve(getattr(variant_params, section), **{field_name: value})
+            variant_params = evolve(variant_params, **{section: section_params})
+        expected = run_model(scenario_params, variant_params, ts_params)
+        variant = results.filter(variant_id=variant_id)
+        assert_frame_equal(variant.select(expected.columns), expected, check_dtypes=False, rel_tol=1e-12)
+
+
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+def test_run_model_columns_match_full_output(input_params, engine):
+    ts_params = load_time_series_params_from_yaml("sample")
+    scenario_params = ScenarioParams(2025, 2040, gas_electric="gas", capex_opex="capex")
+    full = run_model(scenario_params, input_params, ts_params, engine)
+    # every output column can be requested
+    assert_frame_equal(run_model(scenario_params, input_params, ts_params, engine, columns=full.columns), full)
+    for columns in (COMPARE_COLS, ["gas_nonconverts_bill_per_user"], ["electric_ratebase", "total_converts_cumul"]):
+        selected = run_model(scenario_params, input_params, ts_params, engine, columns=columns)
+        assert_frame_equal(selected, full.select(["year", *columns]))
+
+    scenario_runs = create_scenario_runs(2025, 2040, ["gas", "electric"], ["capex", "opex"])
+    results = run_all_scenarios(scenario_runs, input_params, ts_params, engine=engine, columns=COMPARE_COLS)
+    for scenario_name, scenario_params in scenario_runs.items():
+        expected = run_model(scenario_params, input_params, ts_params, engine).select(["year", *COMPARE_COLS])
+        assert_frame_equal(results[scenario_name], expected)
+
+    with pytest.raises(ValueError, match="not_a_column"):
+        run_model(scenario_params, input_params, ts_params, engine, columns=["gas_ratebase", "not_a_column"])
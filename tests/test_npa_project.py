@@ -4,9 +4,11 @@
 import numpy as np
 import polars as pl
 import pytest
+from attrs import evolve
 from polars.testing import assert_frame_equal
 
 from npa_howtopay.npa_project import (
+    NpaYearSummary,
     append_scattershot_electrification_df,
     compute_existing_pipe_value_from_df,
     compute_hp_converts_from_df,
@@ -16,6 +18,7 @@ from npa_howtopay.npa_project import (
     compute_pipe_decomm_cost_from_df,
     return_empty_npa_df,
 )
+from npa_howtopay.params import TimeSeriesParams
 
 
 @pytest.fixture
@@ -130,3 +133,73 @@ def test_compute_pipe_decomm_cost_from_df(sample_npa_projects_df, sample_scatter
     result = compute_pipe_decomm_cost_from_df(2025, combined_df)
     expected = (600.0 * 200) + (550.0 * 150)
     assert result == expected
+
+
+def test_npa_year_summary_matches_df_helpers(sample_npa_projects_df, sample_scattershot_df):
+    """Test that summary lookups match the dataframe helpers, including years outside the project range."""
+    combined_df = append_scattershot_electrification_df(sample_npa_projects_df, sample_scattershot_df)
+    summary = NpaYearSummary.from_df(combined_df)
+    assert summary.to_df()["year"].to_list() == [2024, 2025, 2026, 2027]
+
+    for year in range(2022, 2030):
+        for cumulative in (False, True):
+            for npa_only in (False, True):
+                assert compute_hp_converts_from_df(year, summary, cumulative, npa_only) == compute_hp_converts_from_df(
+                    year, combined_df, cumulative, npa_only
+                )
+        assert compute_npa_pipe_cost_avoided_from_df(year, summary) == compute_npa_pipe_cost_avoided_from_df(
+            year, combined_df
+        )
+        assert compute_pipe_decomm_cost_from_df(year, summary) == compute_pipe_decomm_cost_from_df(year, combined_df)
+        assert np.isclose(
+            compute_peak_kw_increase_from_df(year, summary, 5.0, 3.0),
+            compute_peak_kw_increase_from_df(year, combined_df, 5.0, 3.0),
+        )
+
+
+def test_npa_year_summary_array_lookups(sample_npa_projects_df, sample_scattershot_df):
+    summary = NpaYearSummary.from_df(
+        append_scattershot_electrification_df(sample_npa_projects_df, sample_scattershot_df)
+    )
+    years = np.arange(2022, 2030)
+    for cumulative in (False, True):
+        for npa_only in (False, True):
+            assert summary.hp_converts_by_year(years, cumulative, npa_only).tolist() == [
+                summary.hp_converts(year, cumulative, npa_only) for year in years.tolist()
+            ]
+    assert summary.pipe_cost_avoided_by_year(years).tolist() == [
+        summary.pipe_cost_avoided(year) for year in years.tolist()
+    ]
+    assert summary.peak_kw_increase_by_year(years, 5.0, 3.0).tolist() == [
+        summary.peak_kw_increase(year, 5.0, 3.0) for year in years.tolist()
+    ]
+
+
+def test_npa_year_summary_empty():
+    summary = NpaYearSummary.from_df(return_empty_npa_df())
+    assert compute_hp_converts_from_df(2025, summary, cumulative=True) == 0
+    assert compute_npa_pipe_cost_avoided_from_df(2025, summary) == 0.0
+    assert compute_peak_kw_increase_from_df(2025, summary, 5.0, 3.0) == 0.0
+    assert summary.hp_converts_by_year(np.arange(2024, 2027), cumulative=True).tolist() == [0, 0, 0]
+
+
+def test_time_series_params_summary_follows_reassigned_projects(sample_npa_projects_df, sample_scattershot_df):
+    costs = pl.DataFrame({"year": [2025], "cost": [1.0]})
+    ts_params = TimeSeriesParams(sample_npa_projects_df, sample_scattershot_df, costs, costs, costs)
+    assert ts_params.npa_summary.hp_converts(2025) == 400
+    ts_params.npa_projects = ts_params.npa_projects.filter(pl.col("project_year") != 2025)
+    assert ts_params.npa_summary.npa_projects is ts_params.npa_projects
+    assert ts_params.npa_summary.hp_converts(2025) == 0
+
+
+def test_time_series_params_reuses_summary_of_appended_projects(sample_npa_projects_df, sample_scattershot_df):
+    costs = pl.DataFrame({"year": [2025], "cost": [1.0]})
+    ts_params = TimeSeriesParams(sample_npa_projects_df, sample_scattershot_df, costs, costs, costs)
+    # the summary marks the projects as already appended, so scattershot electrification isn't appended twice
+    edited = evolve(ts_params, gas_fixed_overhead_costs=costs.with_columns(cost=pl.lit(2.0)))
+    assert edited.npa_projects is ts_params.npa_projects
+    assert edited.npa_summary is ts_params.npa_summary
+    # replacing the projects appends scattershot electrification to the new ones
+    bau = evolve(ts_params, npa_projects=return_empty_npa_df())
+    assert bau.npa_projects.height == sample_scattershot_df.height
+    assert bau.npa_summary.npa_projects is bau.npa_projects
@@ -0,0 +1,16 @@
+## Switchbox
+## 2026-10-17
+
+import os
+
+import polars as pl
+
+from npa_howtopay.parallel import spawn_process_pool
+
+
+def test_spawn_process_pool_caps_worker_polars_threads(monkeypatch):
+    monkeypatch.delenv("POLARS_MAX_THREADS", raising=False)
+    with spawn_process_pool(1, threads_per_worker=3) as pool:
+        assert pool.submit(pl.thread_pool_size).result() == 3
+    # the cap is set in the workers only
+    assert "POLARS_MAX_THREADS" not in os.environ
@@ -0,0 +1,65 @@
+## Switchbox
+## 2026-10-17
+
+from npa_howtopay import profiling
+from npa_howtopay.model import create_scenario_runs, run_all_scenarios, run_model
+from npa_howtopay.params import load_scenario_from_yaml, load_time_series_params_from_yaml
+from npa_howtopay.profiling import StageProfiler
+
+
+def test_stage_is_a_no_op_without_profiler():
+    assert profiling.active_profiler() is None
+    with profiling.stage("anything"), profiling.scenario("anything"):
+        pass
+    with StageProfiler() as profiler:
+        assert profiling.active_profiler() is profiler
+    assert profiling.active_profiler() is None
+    assert profiler.to_df().height == 0
+
+
+def test_nested_stages_and_memory():
+    with StageProfiler(trace_memory=True) as profiler, profiler.scenario("a"):
+        with profiling.stage("outer"):
+            with profiling.stage("inner"):
+                block = bytearray(1_000_000)
+            del block
+        with profiling.stage("inner"):
+            pass
+
+    df = profiler.to_df()
+    assert df["stage"].to_list() == ["inner", "outer"]
+    assert df["scenario"].to_list() == ["a", "a"]
+    assert df["calls"].to_list() == [2, 1]
+    inner_bytes, outer_bytes = df["peak_bytes"].to_list()
+    # the outer stage's peak includes the allocation made in the inner stage
+    assert inner_bytes >= 1_000_000
+    assert outer_bytes >= inner_bytes
+
+
+def test_run_all_scenarios_records_stages_per_scenario():
+    input_params = load_scenario_from_yaml("sample")
+    ts_params = load_time_series_params_from_yaml("sample")
+    scenario_runs = create_scenario_runs(2025, 2028, ["gas"], ["capex"])
+
+    with StageProfiler() as profiler:
+        run_all_scenarios(scenario_runs, input_params, ts_params)
+    df = profiler.to_df()
+    assert df["scenario"].unique(maintain_order=True).to_list() == list(scenario_runs)
+    gas_capex = df.filter(scenario="gas_capex")
+    assert gas_capex.filter(stage="capex_generation")["calls"].item() == 3
+    assert gas_capex.filter(stage="bill_costs")["calls"].item() == 1
+    assert gas_capex["peak_bytes"].is_null().all()
+
+    # without deduplication worker processes run each scenario on its own, as the serial executor does
+    with StageProfiler() as serial_profiler:
+        run_all_scenarios(scenario_runs, input_params, ts_params, deduplicate=False)
+    with StageProfiler() as parallel_profiler:
+        run_all_scenarios(scenario_runs, input_params, ts_params, executor="process", max_workers=2, deduplicate=False)
+    serial_calls = serial_profiler.to_df().select("scenario", "stage", "calls")
+    assert parallel_profiler.to_df().select("scenario", "stage", "calls").equals(serial_calls)
+
+    # runs outside run_all_scenarios aren't attributed to a scenario
+    with StageProfiler() as profiler:
+        run_model(scenario_runs["bau"], input_params, ts_params, engine="vectorized")
+    assert profiler.to_df()["scenario"].is_null().all()
+    assert "misc_capex_solve" in profiler.to_df()["stage"].to_list()
@@ -0,0 +1,82 @@
+## Switchbox
+## 2026-10-17
+
+import numpy as np
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from npa_howtopay.model import (
+    create_delta_df,
+    create_scenario_runs,
+    iter_absolute_values_dfs,
+    iter_all_scenarios,
+    iter_delta_dfs,
+    return_absolute_values_df,
+    run_all_scenarios,
+)
+from npa_howtopay.params import COMPARE_COLS, load_scenario_from_yaml, load_time_series_params_from_yaml
+from npa_howtopay.results import ScenarioResultCube, write_parquet_parts
+
+
+@pytest.fixture(scope="module")
+def results_dfs():
+    scenario_runs = create_scenario_runs(2025, 2035, ["gas", "electric"], ["capex", "opex"])
+    return run_all_scenarios(
+        scenario_runs, load_scenario_from_yaml("sample"), load_time_series_params_from_yaml("sample")
+    )
+
+
+def test_cube_matches_dataframe_helpers(results_dfs):
+    cube = ScenarioResultCube.from_results(results_dfs, COMPARE_COLS)
+    assert cube.shape == (len(results_dfs), 10, len(COMPARE_COLS))
+    assert cube.values[2, 3, 0] == results_dfs[cube.scenarios[2]][COMPARE_COLS[0]][3]
+
+    assert_frame_equal(cube.to_polars(), return_absolute_values_df(results_dfs, COMPARE_COLS))
+    assert_frame_equal(cube.delta().to_polars(), create_delta_df(results_dfs, COMPARE_COLS))
+
+    # the polars export shares the cube's memory
+    df = cube.to_polars()
+    assert np.shares_memory(df["gas_ratebase"].to_numpy(), cube.data)
+
+
+def test_cube_selection_and_validation(results_dfs):
+    cube = ScenarioResultCube.from_results(results_dfs, COMPARE_COLS)
+    subset = cube.sel(scenarios=["gas_opex", "bau"], years=[2030, 2026], metrics=["electric_ratebase"])
+    assert subset.shape == (2, 2, 1)
+    expected = results_dfs["gas_opex"].filter(pl.col("year") == 2030)["electric_ratebase"].item()
+    assert subset.values[0, 0, 0] == expected
+    np.testing.assert_array_equal(subset.metric("electric_ratebase"), subset.values[..., 0])
+
+    with pytest.raises(KeyError, match="nope"):
+        cube.sel(scenarios=["nope"])
+    with pytest.raises(ValueError, match="gas_nonconverts_bill_per_user"):
+        cube.sel(metrics=["gas_converts_bill_per_user"]).delta()
+    shifted = {**results_dfs, "bau": results_dfs["bau"].with_columns(pl.col("year") + 1)}
+    with pytest.raises(ValueError, match="different years"):
+        ScenarioResultCube.from_results(shifted, COMPARE_COLS)
+
+
+def test_streamed_deltas_match_in_memory_helpers(results_dfs, tmp_path):
+    scenario_runs = create_scenario_runs(2025, 2035, ["gas", "electric"], ["capex", "opex"])
+    stream = iter_all_scenarios(
+        scenario_runs, load_scenario_from_yaml("sample"), load_time_series_params_from_yaml("sample")
+    )
+    paths = write_parquet_parts(iter_delta_dfs(stream, COMPARE_COLS), str(tmp_path / "deltas"), frames_per_part=4)
+    assert len(paths) == 2  # six non-bau scenarios, four per part
+    streamed = pl.read_parquet(str(tmp_path / "deltas" / "*.parquet"))
+    assert_frame_equal(streamed, create_delta_df(results_dfs, COMPARE_COLS))
+    with pytest.raises(FileExistsError):
+        write_parquet_parts(iter_delta_dfs(results_dfs, COMPARE_COLS), str(tmp_path / "deltas"))
+
+    # scenarios arriving before bau are held until it does, or compared against a pinned bau
+    late_bau = [(name, df) for name, df in results_dfs.items() if name != "bau"] + [("bau", results_dfs["bau"])]
+    expected = create_delta_df(results_dfs, COMPARE_COLS)
+    assert_frame_equal(pl.concat(iter_delta_dfs(late_bau, COMPARE_COLS)), expected)
+    pinned = iter_delta_dfs(late_bau[:-1], COMPARE_COLS, bau_df=results_dfs["bau"])
+    assert_frame_equal(pl.concat(pinned), expected)
+    with pytest.raises(ValueError, match="bau"):
+        list(iter_delta_dfs(late_bau[:-1], COMPARE_COLS))
+
+    absolute = pl.concat(iter_absolute_values_dfs(iter(results_dfs.items()), COMPARE_COLS))
+    assert_frame_equal(absolute, return_absolute_values_df(results_dfs, COMPARE_COLS))
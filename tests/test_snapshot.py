@@ -0,0 +1,49 @@
+## Switchbox
+## 2026-10-17
+
+import os
+import shutil
+from pathlib import Path
+
+from npa_howtopay import snapshot
+from npa_howtopay.cache import run_key
+from npa_howtopay.params import (
+    ScenarioParams,
+    load_run_from_yaml,
+    load_scenario_from_yaml,
+    load_time_series_params_from_yaml,
+)
+
+SAMPLE_YAML = Path(snapshot.__file__).parent / "data" / "sample.yaml"
+
+
+def test_snapshot_matches_yaml_and_tracks_changes(tmp_path, monkeypatch):
+    yaml_path = str(tmp_path / "sample.yaml")
+    shutil.copy(SAMPLE_YAML, yaml_path)
+    snapshot_dir = str(tmp_path / "snapshots")
+    scenario_params = ScenarioParams(start_year=2025, end_year=2030, bau=True)
+    expected = run_key(scenario_params, load_scenario_from_yaml("sample"), load_time_series_params_from_yaml("sample"))
+    assert run_key(scenario_params, *load_run_from_yaml("sample")) == expected
+
+    # the first load compiles the snapshot, later ones read it without parsing the YAML
+    assert run_key(scenario_params, *snapshot.load_snapshot(yaml_path, snapshot_dir)) == expected
+    monkeypatch.setattr(snapshot, "_load_yaml_config", None)
+    assert run_key(scenario_params, *snapshot.load_snapshot(yaml_path, snapshot_dir)) == expected
+
+    # touching the file re-hashes it but reuses the snapshot
+    stat = os.stat(yaml_path)
+    os.utime(yaml_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert run_key(scenario_params, *snapshot.load_snapshot(yaml_path, snapshot_dir)) == expected
+    monkeypatch.undo()
+
+    # editing it compiles a new snapshot
+    with open(yaml_path) as f:
+        content = f.read()
+    with open(yaml_path, "w") as f:
+        f.write(content.replace("ror: 0.08  # gas utility", "ror: 0.09  # gas utility"))
+    input_params, _ = snapshot.load_snapshot(yaml_path, snapshot_dir)
+    assert input_params.gas.ror == 0.09
+
+    snapshot_paths = snapshot.compile_data_dir(str(tmp_path), snapshot_dir)
+    assert len(snapshot_paths) == 1
+    assert len([name for name in os.listdir(os.path.dirname(snapshot_paths[0])) if name != "index"]) == 2
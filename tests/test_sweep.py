@@ -0,0 +1,109 @@
+## Switchbox
+## 2026-10-17
+
+from statistics import NormalDist
+
+import numpy as np
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from npa_howtopay.model import create_scenario_runs
+from npa_howtopay.params import load_scenario_from_yaml, load_time_series_params_from_yaml
+from npa_howtopay.sweep import (
+    Normal,
+    Triangular,
+    Uniform,
+    apply_draw,
+    run_sweep,
+    sample_parameters,
+    sample_unit_hypercube,
+)
+
+
+def test_latin_hypercube_hits_every_stratum_once():
+    unit = sample_unit_hypercube(50, 3, method="lhs", seed=7)
+    assert unit.shape == (50, 3)
+    for dim in range(3):
+        assert sorted(np.floor(unit[:, dim] * 50).astype(int)) == list(range(50))
+    assert np.array_equal(unit, sample_unit_hypercube(50, 3, method="lhs", seed=7))
+    assert not np.array_equal(unit, sample_unit_hypercube(50, 3, method="lhs", seed=8))
+
+
+def test_sample_parameters():
+    samples = sample_parameters(
+        {
+            "shared.npa_install_costs_init": Uniform(10.0, 20.0),
+            "electric.hp_efficiency": Triangular(2.0, 3.0, 5.0),
+            "shared.cost_inflation_rate": Normal(0.03, 0.005),
+            "shared.npa_lifetime": Uniform(10, 20),
+        },
+        n_draws=20,
+        seed=1,
+    )
+    assert samples.columns == [
+        "draw_id",
+        "shared.npa_install_costs_init",
+        "electric.hp_efficiency",
+        "shared.cost_inflation_rate",
+        "shared.npa_lifetime",
+    ]
+    assert samples["shared.npa_install_costs_init"].is_between(10.0, 20.0).all()
+    assert samples["electric.hp_efficiency"].is_between(2.0, 5.0).all()
+    assert samples.schema["shared.npa_lifetime"] == pl.Int64
+
+    with pytest.raises(ValueError, match="has no field"):
+        sample_parameters({"gas.not_a_field": Uniform(0, 1)}, n_draws=2)
+    with pytest.raises(ValueError, match="must start with"):
+        sample_parameters({"hp_efficiency": Uniform(0, 1)}, n_draws=2)
+
+
+def test_normal_ppf_matches_statistics():
+    u = np.concatenate([np.linspace(0.0, 1.0, 1001), [1e-300, 1e-20, 1e-9, 0.075, 0.925, 1 - 1e-9]])
+    expected = [NormalDist(3.0, 0.5).inv_cdf(x) for x in np.clip(u, 1e-12, 1 - 1e-12)]
+    np.testing.assert_allclose(Normal(3.0, 0.5).ppf(u), expected, rtol=1e-15)
+
+
+def test_apply_draw_propagates_shared_values():
+    input_params = load_scenario_from_yaml("sample")
+    draw_params = apply_draw(input_params, {"shared.cost_inflation_rate": 0.1, "electric.hp_efficiency": 2.5})
+    assert draw_params.electric.hp_efficiency == 2.5
+    assert draw_params.gas.cost_inflation_rate == 0.1
+    assert draw_params.electric.cost_inflation_rate == 0.1
+    # the base params are left untouched
+    assert input_params.shared.cost_inflation_rate != 0.1
+
+
+def test_run_sweep():
+    scenario_runs = create_scenario_runs(2025, 2028, ["gas"], ["capex"])
+    input_params = load_scenario_from_yaml("sample")
+    ts_params = load_time_series_params_from_yaml("sample")
+    results = run_sweep(
+        {"shared.npa_install_costs_init": Uniform(10e3, 30e3)},
+        {"bau": scenario_runs["bau"], "gas_capex": scenario_runs["gas_capex"]},
+        input_params,
+        ts_params,
+        n_draws=3,
+        columns=["gas_ratebase"],
+        batch_size=2,
+    )
+    assert results.columns == ["draw_id", "shared.npa_install_costs_init", "scenario_id", "year", "gas_ratebase"]
+    assert results.height == 3 * 2 * 3
+    # npa install costs don't affect BAU, but do affect the gas capex ratebase
+    bau = results.filter(pl.col("scenario_id") == "bau", pl.col("year") == 2027)
+    capex = results.filter(pl.col("scenario_id") == "gas_capex", pl.col("year") == 2027)
+    assert bau["gas_ratebase"].n_unique() == 1
+    assert capex["gas_ratebase"].n_unique() == 3
+
+
+def test_run_sweep_engines_agree():
+    scenario_runs = create_scenario_runs(2025, 2030, ["gas", "electric"], ["capex"])
+    input_params = load_scenario_from_yaml("sample")
+    ts_params = load_time_series_params_from_yaml("sample")
+    distributions = {"electric.hp_efficiency": Normal(3.0, 0.3), "shared.npa_install_costs_init": Uniform(10e3, 30e3)}
+    loop, vectorized = (
+        run_sweep(distributions, scenario_runs, input_params, ts_params, n_draws=4, batch_size=3, engine=engine)
+        for engine in ("loop", "vectorized")
+    )
+    assert loop.height == 4 * len(scenario_runs) * 5
+    assert_frame_equal(vectorized, loop, check_exact=False, rel_tol=1e-9)